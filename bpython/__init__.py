@@ -21,10 +21,14 @@
 # THE SOFTWARE.
 
 import os.path
+import time
 
 __version__ = 'mercurial'
 package_dir = os.path.abspath(os.path.dirname(__file__))
 
+# When bpython started being imported, for the startup profile
+started = getattr(time, 'perf_counter', time.time)()
+
 
 def embed(locals_=None, args=None, banner=None):
     if not args: args = ['-i', '-q']
@@ -1,26 +1,29 @@
-import pydoc
 import sys
 
 from bpython.pager import page
 
-# Ugly monkeypatching
-pydoc.pager = page
-
 
 class _Helper(object):
+    """pydoc takes long to import, so it is only imported when help is
+    called the first time."""
 
     def __init__(self):
-        if hasattr(pydoc.Helper, "output"):
-            # See issue #228
-            self.helper = pydoc.Helper(sys.stdin, None)
-        else:
-            self.helper = pydoc.Helper(sys.stdin, sys.stdout)
+        self.helper = None
 
     def __repr__(self):
         return ("Type help() for interactive help, "
                 "or help(object) for help about object.")
 
     def __call__(self, *args, **kwargs):
+        if self.helper is None:
+            import pydoc
+            # Ugly monkeypatching
+            pydoc.pager = page
+            if hasattr(pydoc.Helper, "output"):
+                # See issue #228
+                self.helper = pydoc.Helper(sys.stdin, None)
+            else:
+                self.helper = pydoc.Helper(sys.stdin, sys.stdout)
         self.helper(*args, **kwargs)
 
 _help = _Helper()
@@ -29,8 +29,9 @@
 
     Defines the following attributes:
 
-    - PythonLexer: Pygment's Python lexer matching the hosting runtime's
-      Python version.
+    - PythonLexer: Create Pygment's Python lexer matching the hosting
+      runtime's Python version. pygments.lexers is imported on the first
+      call, as it takes long to import.
     - py3: True if the hosting Python runtime is of Python version 3 or later
 """
 
@@ -42,7 +43,10 @@ import six
 PY3 = six.PY3
 chr = six.int2byte
 
-if PY3:
-    from pygments.lexers import Python3Lexer as PythonLexer
-else:
-    from pygments.lexers import PythonLexer
+
+def PythonLexer(**options):
+    if PY3:
+        from pygments.lexers import Python3Lexer as lexer
+    else:
+        from pygments.lexers import PythonLexer as lexer
+    return lexer(**options)
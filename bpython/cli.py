@@ -67,7 +67,6 @@ from types import ModuleType
 
 # These are used for syntax highlighting
 from pygments import format
-from bpython.formatter import BPythonFormatter
 
 # This for completion
 from bpython.completion.completers import import_completer
@@ -81,14 +80,14 @@ from bpython.config.struct import Struct
 from bpython import translations
 from bpython.translations import _
 
-from bpython import repl
+from bpython import latency, repl
 from bpython.util import getpreferredencoding, debug, Dummy
 import bpython.config.args
 
 from bpython.interpreter import BPythonInterpreter, command_tokenize
 
 from bpython._py3compat import PythonLexer, PY3, chr
-from six.moves import map, xrange
+from six.moves import map, queue, xrange
 
 
 # --- module globals ---
@@ -268,6 +267,11 @@ class ListBox(object):
         self.index = -1
         self.v_items = []
         self.v_index = -1
+        self.page_stop = 0
+        self.sep = None
+        self.wl_summary = 1
+        self.summary_items = None
+        self.summary_key = None
         self.down = 0
         self.height_offset = 0
 
@@ -294,6 +298,7 @@ class ListBox(object):
         else:
             self.docstring = None
 
+    @latency.timed('listbox')
     def show(self):
         if self.docstring is not None and len(self.items) < 2:
             self.height_offset = self._show_topline() + 1
@@ -311,10 +316,8 @@ class ListBox(object):
         self.index = matches_iter.index
 
     def next_page(self, matches_iter):
-        if self.v_items[-1] == '...':
-            if matches_iter.is_wait:
-                self.v_index += 1
-            matches_iter.index += (len(self.v_items) - self.v_index -1)
+        if self.v_items and self.v_items[-1] == '...':
+            matches_iter.index = self.page_stop
             self.sync(matches_iter)
             self._prepare_v_items()
             self.v_index -= 1
@@ -356,6 +359,7 @@ class ListBox(object):
             _kwargs = self.topline[1][2]
             is_bound_method = self.topline[2]
             in_arg = self.topline[3]
+            positional_only = inspection.positional_only(self.topline[1])
             if PY3:
                 kwonly = self.topline[1][4]
                 kwonly_defaults = self.topline[1][5] or dict()
@@ -413,6 +417,8 @@ class ListBox(object):
                 if kw is not None:
                     self.addstr('=', punctuation_colpair)
                     self.addstr(kw, app.get_colpair('token'))
+                if k == positional_only - 1:
+                    self.addstr(', /', punctuation_colpair)
                 if k != len(args) - 1:
                     self.addstr(', ', punctuation_colpair)
 
@@ -592,42 +598,28 @@ class ListBox(object):
         self.rows += len(docstrings)
 
     def _prepare_v_items(self):
-        if not self.nosep:
-            self._trim_items()
-
-        self.v_items = []
-        rows = 0
-        cols = 0
-        wl = 1
-
-        v_index = self.index
-        # visible items (we'll append until we can't fit any more in)
-        for i, item in enumerate(self.items):
-            item = item[:self.max_w - 3]
-            self.v_items.append(item)
-            wl = max(len(item), wl)
-            cols = ((self.max_w - 2) // (wl + 1)) or 1
-            rows = len(self.v_items) // cols
-
-            if cols * rows < len(self.v_items):
-                rows += 1
-
-            if rows + self.height_offset - 1 >= self.max_h:
-                rows = self.max_h - (self.height_offset - 1)
-                if self.index < i - 1:
-                    del self.v_items[-1]
-                    self.v_items[-1] = '...'
-                    self.v_index = v_index
-                    break
-                else:
-                    v_index -= (len(self.v_items) - 3)
-                    self.v_items = ['...', self.items[i - 1], self.items[i]]
-                    continue
+        wl = self._get_width_summary()
+        cols = ((self.max_w - 2) // (wl + 1)) or 1
+        max_rows = max(self.max_h - self.height_offset, 1)
+        start, stop = self._get_page(cols * max_rows)
+
+        # visible items, only the current page is looked at
+        self.v_items = [self._trim_item(item)
+                        for item in self.items[start:stop]]
+        if start:
+            self.v_items.insert(0, '...')
+        if stop < len(self.items):
+            self.v_items.append('...')
+        if start <= self.index < stop:
+            self.v_index = self.index - start + (1 if start else 0)
         else:
-            rows += 1
-            self.v_index = v_index % (len(self.v_items) + 1)
+            self.v_index = -1
+        self.page_stop = stop
 
-        self.rows = rows
+        rows = len(self.v_items) // cols
+        if cols * rows < len(self.v_items):
+            rows += 1
+        self.rows = rows + 1
         self.cols = cols
         self.wl = wl + 1
 
@@ -639,14 +631,48 @@ class ListBox(object):
                 t = self.max_w
             self.w = t
 
-    def _trim_items(self):
-        if self.items:
-            sep = '.'
-            if os.path.sep in self.items[0]:
-                # Filename completion
-                sep = os.path.sep
-            if sep in self.items[0]:
-                self.items = [x.rstrip(sep).rsplit(sep)[-1] for x in self.items]
+    def _get_page(self, size):
+        """Return the bounds of the page of items that holds the current
+        index. Every page but the first starts with a '...' item and every
+        page but the last ends with one."""
+        n = len(self.items)
+        if n <= size:
+            return 0, n
+        first = max(size - 1, 1)
+        if self.index < first:
+            return 0, first
+        body = max(size - 2, 1)
+        start = first + (self.index - first) // body * body
+        if start - body >= first and n - (start - body) <= body + 1:
+            # The previous page is the last one and holds the index
+            start -= body
+        if n - start <= body + 1:
+            return start, n
+        return start, start + body
+
+    def _get_width_summary(self):
+        """Return the width of the widest item. It is computed once for every
+        list of matches."""
+        key = (self.max_w, self.nosep)
+        if self.summary_items is not self.items or self.summary_key != key:
+            self.sep = None
+            if not self.nosep and self.items:
+                sep = '.'
+                if os.path.sep in self.items[0]:
+                    # Filename completion
+                    sep = os.path.sep
+                if sep in self.items[0]:
+                    self.sep = sep
+            self.wl_summary = max([1] + [len(self._trim_item(item))
+                                         for item in self.items])
+            self.summary_items = self.items
+            self.summary_key = key
+        return self.wl_summary
+
+    def _trim_item(self, item):
+        if self.sep is not None:
+            item = item.rstrip(self.sep).rsplit(self.sep)[-1]
+        return item[:self.max_w - 3]
 
 class Editable(object):
     def __init__(self, scr, config):
@@ -868,6 +894,7 @@ class Editable(object):
             else:
                 self.scr.refresh()
 
+    @latency.timed('print_line')
     def print_line(self, s, clr=False, newline=False):
         """Chuck a line of text through the highlighter, move the cursor
         to the beginning of the line and output it to the screen."""
@@ -925,7 +952,7 @@ class Editable(object):
 
         self.scr.move(real_lineno,
                       len(self.ps1) if lineno == 0 else len(self.ps2))
-        line = format(tokens, BPythonFormatter(self.config.color_scheme))
+        line = format(tokens, self.formatter)
         for string in line.split('\x04'):
             self.echo(string)
 
@@ -1151,11 +1178,20 @@ class CLIRepl(repl.Repl, Editable):
         self.in_hist = False
         self.in_search_mode = None
         self.rl_indices = []
-        self.formatter = BPythonFormatter(config.color_scheme)
+        self._formatter = None
         self.interact = CLIInteraction(config, statusbar=app.statusbar)
 
         self.list_box = ListBox(app.newwin(1, 1, 1, 1), config, format_docstring=self.format_docstring)
 
+    @property
+    def formatter(self):
+        """The formatter is only created to highlight the first line, as
+        pygments' formatters take long to import."""
+        if self._formatter is None:
+            from bpython.formatter import BPythonFormatter
+            self._formatter = BPythonFormatter(self.config.color_scheme)
+        return self._formatter
+
     @property
     def current_line(self):
         """Return the current line."""
@@ -1174,6 +1210,12 @@ class CLIRepl(repl.Repl, Editable):
         self.matches_iter.reset()
         self.complete()
 
+    def p_key(self, key):
+        result = Editable.p_key(self, key)
+        if self.config.cli_latency_meter:
+            app.statusbar.show_meter(latency.recorder.format_last())
+        return result
+
     def accept_line(self):
         Editable.accept_line(self)
         self.rl_history.reset()
@@ -1716,6 +1758,7 @@ class Statusbar(Editable):
         self._s = config.statusbar_text
         self.c = color
         self.timer = 0
+        self.meter = ''
         self.settext(self._s, color)
 
     def size(self):
@@ -1759,6 +1802,22 @@ class Statusbar(Editable):
         self.timer = time.time() + n
         self.settext(s)
 
+    def show_meter(self, s):
+        """Show s right-aligned next to the permanent text, unless a message
+        is being displayed."""
+        self.meter = s
+        if time.time() >= self.timer:
+            self.settext(self._s)
+
+    def progress(self, done, total, s=''):
+        """Show s followed by a bar of how much of total is done, until the
+        next message or refresh()."""
+        count = ' %d/%d' % (done, total)
+        width = max(self.w - len(s) - len(count) - 3, 0)
+        filled = width * done // total if total else width
+        self.settext('%s[%s%s]%s' % (s, '#' * filled, ' ' * (width - filled),
+                                     count))
+
     def prompt(self, s=''):
         """Prompt the user for some input (with the optional prompt 's') and
         return the input text, then restore the statusbar to its original
@@ -1781,6 +1840,11 @@ class Statusbar(Editable):
         status window (e.g. when prompting)."""
 
         self.scr.erase()
+        if self.meter and not p and s is self._s:
+            # Right-align the latency meter if there is room left
+            width = self.w - len(s) - 2
+            if len(self.meter) <= width:
+                s = s + ' ' * (width - len(self.meter) + 1) + self.meter
         if len(s) >= self.w:
             s = s[:self.w - 1]
 
@@ -1812,6 +1876,10 @@ class Statusbar(Editable):
 class App(object):
     DO_RESIZE = False
 
+    # Milliseconds to wait for a key before calling idle() while work is
+    # running in the background
+    POLL_TIME = 200
+
     def __init__(self, scr, locals_, config):
         global app
         app = bpython.running = self
@@ -1819,10 +1887,19 @@ class App(object):
         self.scr = scr
         self.config = config
 
+        # Messages from other threads, shown by idle()
+        self.notifications = queue.Queue()
+        # Objects standing for work running in the background; while there
+        # are any, idle() is called even if no key is pressed
+        self.background = set()
+
         self.set_colors()
         main_win, status_win = self.init_wins()
+        latency.startup.lap('windows')
 
+        # The first Editable builds the key dispatch table
         self.statusbar = Statusbar(status_win, self.config, color=app.get_colpair('main'))
+        latency.startup.lap('statusbar and keys')
 
         if locals_ is None:
             sys.modules['__main__'] = ModuleType('__main__')
@@ -1831,6 +1908,7 @@ class App(object):
 
         self.clirepl = CLIRepl(main_win, self.interpreter, config)
         self.clirepl._C = self.colors
+        latency.startup.lap('interpreter and repl')
 
     def __enter__(self):
         if platform.system() != 'Windows':
@@ -1862,8 +1940,15 @@ class App(object):
             signal.signal(signal.SIGWINCH, self.old_sigwinch_handler)
             signal.signal(signal.SIGCONT, self.old_sigcont_handler)
 
-    def register_command(self, name, function=None, without_completion=False):
-        return self.clirepl.register_command(name, function, without_completion)
+    def register_command(self, name, function=None, without_completion=False,
+                         raw=False):
+        return self.clirepl.register_command(name, function, without_completion,
+                                             raw)
+
+    def notify_later(self, s):
+        """Show s on the statusbar as soon as the main thread is idle. Unlike
+        CLIInteraction.notify(), this is safe to call from any thread."""
+        self.notifications.put(s)
 
     def set_handler_on(self, ambiguous_keyname, function=None):
         from bpython.key.dispatch_table import dispatch_table
@@ -1916,7 +2001,10 @@ class App(object):
 
         """
 
-        if platform.system() != 'Windows':
+        if hasattr(curses, 'gethw'):
+            # There is no terminal to ask with bpython.screen
+            return curses.gethw()
+        elif platform.system() != 'Windows':
             h, w = struct.unpack(
                 "hhhh",
                 fcntl.ioctl(sys.__stdout__, termios.TIOCGWINSZ, "\000" * 8))[0:2]
@@ -1962,6 +2050,11 @@ class App(object):
                 app.statusbar.check()
         caller.check()
 
+        while not app.notifications.empty():
+            app.clirepl.interact.notify(app.notifications.get())
+        if app.background:
+            caller.scr.timeout(App.POLL_TIME)
+
         if App.DO_RESIZE:
             App.do_resize(caller)
 
@@ -2076,6 +2169,9 @@ class App(object):
             sys.path.insert(0, '')
             self.clirepl.startup()
 
+        if latency.startup.profiling:
+            latency.startup.stop_profile()
+            self.clirepl.write(latency.startup.format_report() + '\n')
         if banner is not None:
             self.clirepl.write(banner)
             self.clirepl.write('\n')
@@ -2097,14 +2193,17 @@ def main_curses(scr, args, config, interactive=True, locals_=None,
     Returns a tuple (exit value, output), where exit value is a tuple
     with arguments passed to SystemExit.
     """
+    latency.startup.lap('curses')
     with App(scr, locals_, config) as app:
         exit_value = app.run(args, interactive, banner)
         return (exit_value, app.stdout)
 
 
 def main(args=None, locals_=None, banner=None):
+    latency.startup.lap('imports')
     translations.init()
     config, options, exec_args = bpython.config.args.parse_and_load(bpython.config.config, args)
+    latency.startup.lap('arguments and config')
 
     (exit_value, output) = curses.wrapper(
         main_curses, exec_args, config, options.interactive, locals_,
@@ -66,6 +66,10 @@ class BPythonCompleter(rlcompleter.Completer):
         except TimeOutException:
             self.matches = []
 
+    def clear_cache(self):
+        """Forget cached matches that depend on the values of objects."""
+        get_item_completer.clear_cache()
+
     def import_complete(self, text, line):
         self.matches = import_completer.complete(text, line)
 
@@ -24,19 +24,59 @@
 # THE SOFTWARE.
 #
 
+import bisect
 import os
-from glob import glob
+
+from bpython.util import LRUCache, iter_directory
+
+
+# Maximal number of matches returned by `complete()`
+MAX_MATCHES = 500
+
+# Maps directories to ((mtime, inode), sorted list of (name, is_directory))
+directory_cache = LRUCache(64)
 
 
 def complete(text):
-    matches = []
     username = text.split(os.path.sep, 1)[0]
     user_dir = os.path.expanduser(username)
-    for filename in glob(os.path.expanduser(text + '*')):
-        if os.path.isdir(filename):
+    dirname, prefix = os.path.split(os.path.expanduser(text))
+    entries = list_directory(dirname or os.curdir)
+    # Like glob(), only list hidden files if asked for
+    show_hidden = prefix.startswith('.')
+
+    matches = []
+    start = bisect.bisect_left(entries, (prefix, ))
+    for (name, is_directory) in entries[start:]:
+        if not name.startswith(prefix) or len(matches) >= MAX_MATCHES:
+            break
+        if name.startswith('.') and not show_hidden:
+            continue
+        filename = os.path.join(dirname, name)
+        if is_directory:
             filename += os.path.sep
         if text.startswith('~'):
             filename = username + filename[len(user_dir):]
         matches.append(filename)
 
     return matches
+
+
+def list_directory(path):
+    """Return the sorted (name, is_directory) pairs of a directory. Listings
+    are cached until the mtime of the directory changes."""
+    try:
+        st = os.stat(path)
+    except EnvironmentError:
+        return []
+    key = os.path.abspath(path)
+    stamp = (st.st_mtime, st.st_ino)
+    cached = directory_cache.get(key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    try:
+        entries = sorted(iter_directory(path))
+    except EnvironmentError:
+        return []
+    directory_cache[key] = (stamp, entries)
+    return entries
@@ -2,34 +2,159 @@
 #coding: utf-8
 
 
-import collections
+import heapq
 import re
+import time
+from itertools import islice
 
-from six import PY3
+try:
+    from collections.abc import Mapping, Sequence
+except ImportError:
+    from collections import Mapping, Sequence
+
+from six import PY3, string_types
+from six.moves import range
+import bpython
+from bpython.completion import inspection
 from bpython.util import isolate, debug, getpreferredencoding
 
 
-@isolate
+# Maximal number of matches returned by `complete()`
+MAX_MATCHES = 500
+
+# Seconds the worker looks for matches before returning the ones found so far
+SCAN_TIME = 0.1
+
+# Maximal number of indices of a sequence that are tested one by one
+SCAN_INDICES = 100000
+
+# Maps expressions to (attr, matches) of queries that returned all matches
+_cache = dict()
+
+
+def clear_cache():
+    """Forget the matches of earlier queries. Has to be called whenever code
+    is run, as that might change the containers."""
+    _cache.clear()
+
+
+def in_background():
+    """Return whether code runs in the background, which might change the
+    containers at any time."""
+    return bool(getattr(bpython.running, 'background', None))
+
+
 def complete(expr, attr, locals_):
     if not expr:
         return []
+    if in_background():
+        return _complete(expr, attr, locals_)[0]
+    cached = _cache.get(expr)
+    if cached is not None and attr.startswith(cached[0]):
+        # Every match of attr also matches the shorter attr
+        pattern = compile_pattern(attr)
+        if pattern is None:
+            return []
+        return [word for word in cached[1] if pattern.search(word)]
+    matches, is_complete = _complete(expr, attr, locals_)
+    if is_complete and inspection.is_eval_safe_name(expr):
+        _cache[expr] = (attr, matches)
+    return matches
+
+
+@isolate
+def _complete(expr, attr, locals_):
+    """Return the first `MAX_MATCHES` sorted matches and whether these are all
+    of them."""
     try:
         obj = eval(expr, locals_)
     except Exception:
-        return []
-    else:
-        try:
-            pattern = re.compile(r'.*%s.*' % '.*'.join(list(attr)))
-            if isinstance(obj, collections.Mapping):
-                words = sorted(key_wrap(word) for word in obj.keys())
-                return [word for word in words if pattern.search(word)]
-            elif isinstance(obj, collections.Sequence):
-                words = (str(word) + ']' for word in range(len(obj)))
-                return [word for word in words if pattern.search(word)]
-            else:
-                return []
-        except (re.error, TypeError):
-            return []
+        return [], False
+    pattern = compile_pattern(attr)
+    if pattern is None:
+        return [], True
+    try:
+        if isinstance(obj, Mapping):
+            return complete_keys(obj, pattern)
+        elif isinstance(obj, Sequence):
+            return complete_indices(len(obj), attr, pattern)
+    except TypeError:
+        pass
+    return [], False
+
+
+def compile_pattern(attr):
+    try:
+        return re.compile(r'.*%s.*' % '.*'.join(list(attr)))
+    except re.error:
+        return None
+
+
+def search(words, pattern, state):
+    """Yield the words matching pattern until `SCAN_TIME` is over. The number
+    of matches and whether all words were searched are kept in `state`."""
+    deadline = time.time() + SCAN_TIME
+    for i, word in enumerate(words):
+        if not i % 1024 and time.time() > deadline:
+            return
+        if isinstance(word, string_types) and pattern.search(word):
+            state['found'] += 1
+            yield word
+    state['done'] = True
+
+
+def complete_keys(obj, pattern):
+    state = dict(found=0, done=False)
+    words = (key_wrap(key) for key in obj)
+    matches = heapq.nsmallest(MAX_MATCHES, search(words, pattern, state))
+    return matches, state['done'] and state['found'] <= MAX_MATCHES
+
+
+def complete_indices(length, attr, pattern):
+    """Complete the indices of a sequence of the given length. The indices
+    starting with the typed digits are computed directly, the others are only
+    looked for among a limited range of indices."""
+    digits = attr.rstrip(']')
+    if not digits:
+        stop = min(length, MAX_MATCHES)
+        return ['%d]' % i for i in range(stop)], stop == length
+    elif not digits.isdigit():
+        state = dict(found=0, done=False)
+        words = ('%d]' % i for i in range(length))
+        matches = list(islice(search(words, pattern, state), MAX_MATCHES))
+        return matches, state['done'] and state['found'] <= MAX_MATCHES
+
+    indices = list(islice(prefixed_indices(digits, length), MAX_MATCHES))
+    # Indices with less digits than typed can't match
+    start = 10 ** (len(digits) - 1)
+    stop = length
+    if len(indices) == MAX_MATCHES:
+        stop = indices[-1]
+    stop = min(stop, start + SCAN_INDICES)
+    state = dict(found=0, done=False)
+    words = ('%d]' % i for i in range(start, stop))
+    for word in islice(search(words, pattern, state), MAX_MATCHES):
+        indices.append(int(word[:-1]))
+    indices = sorted(set(indices))
+    is_complete = (state['done'] and stop == length and
+                   len(indices) <= MAX_MATCHES)
+    return ['%d]' % i for i in indices[:MAX_MATCHES]], is_complete
+
+
+def prefixed_indices(digits, length):
+    """Yield the indices below length that start with digits in increasing
+    order."""
+    if digits != '0' and digits.startswith('0'):
+        return
+    start = int(digits)
+    stop = start + 1
+    while start < length:
+        for i in range(start, min(stop, length)):
+            yield i
+        if not start:
+            return
+        start *= 10
+        stop *= 10
 
 
 def key_wrap(obj):
@@ -37,13 +162,13 @@ def key_wrap(obj):
         if isinstance(obj, str):
             return '"' + obj + '"]'
         elif isinstance(obj, bytes):
-            return 'b"' + obj.decode(getpreferredencoding()) + '"]'
+            return 'b"' + obj.decode(getpreferredencoding(), 'replace') + '"]'
         else:
             return obj
     else:
         if isinstance(obj, str):
             return '"' + obj + '"]'
         elif isinstance(obj, unicode):
-            return 'u"' + str(obj) + '"]'
+            return 'u"' + obj + '"]'
         else:
             return obj
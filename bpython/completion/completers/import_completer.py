@@ -22,9 +22,11 @@
 
 from __future__ import with_statement
 
-import imp
-import itertools
+import atexit
+import bisect
 import os
+import re
+import stat
 import sys
 import warnings
 try:
@@ -42,13 +44,79 @@ except ImportError:
         finally:
             warnings.filters = filters
 
+try:
+    from importlib.machinery import all_suffixes
+except ImportError:
+    import imp
+    def all_suffixes():
+        return [suffix[0] for suffix in imp.get_suffixes()]
+
+from bpython import latency
 from bpython._py3compat import PY3
+from bpython.config.struct import get_config_home
+from bpython.util import iter_directory
 from six import next
 
+
+# All suffixes of importable files, longest first so that e.g.
+# ".cpython-33m.so" is stripped instead of ".so"
+SUFFIXES = tuple(sorted(set(all_suffixes()), key=len, reverse=True))
+
+if not PY3:
+    _name = re.compile(r'[a-zA-Z_]\w*$')
+
+
+class ModuleIndex(object):
+    """An index of dotted module names, kept as one sorted list of name
+    segments per parent package. Adding a name costs O(log n) to find its
+    place and O(n) to insert it, where n is the number of its siblings;
+    looking up the children of a package that start with a given prefix
+    costs O(log n + k) for k results."""
+
+    def __init__(self):
+        self.children = dict()
+
+    def add(self, name):
+        parent, _, child = name.rpartition('.')
+        children = self.children.setdefault(parent, [])
+        i = bisect.bisect_left(children, child)
+        if i == len(children) or children[i] != child:
+            children.insert(i, child)
+
+    def clear(self):
+        self.children.clear()
+
+    def complete(self, name):
+        """Return all known module names that start with `name` and have no
+        further dot after it, in sorted order."""
+        parent, dot, prefix = name.rpartition('.')
+        children = self.children.get(parent, ())
+        matches = []
+        for i in range(bisect.bisect_left(children, prefix), len(children)):
+            child = children[i]
+            if not child.startswith(prefix):
+                break
+            matches.append(parent + dot + child)
+        return matches
+
+
 # The cached list of all known modules
 modules = dict()
-sorted_modules = []
+module_index = ModuleIndex()
 fully_loaded = False
+# Packages whose contents were not indexed yet, mapped to their directory
+unloaded_packages = dict()
+
+# The on-disk cache of directory listings: maps the absolute path of a
+# directory or zip archive to ((mtime, inode), entries), where entries is a
+# list of (name, filename, is_package) tuples as found by `find_modules()`.
+# It is loaded when a directory is first scanned, and saved at exit if it
+# changed.
+CACHE_VERSION = 4
+directory_cache = dict()
+cache_loaded = False
+cache_dirty = False
+visited_directories = set()
 
 
 def get_object(cw, line):
@@ -74,21 +142,14 @@ def get_object(cw, line):
                 # Will result in a SyntaxError
                 return None
 
+    load_package(cw.rpartition('.')[0])
     match_objects = list()
-    for name in sorted_modules:
-        if not (name == cw and name.find('.', len(cw)) == -1):
-            continue
+    if cw in modules:
+        name = cw
         try:
             obj = sys.modules[name]
-        except:
-            if modules[name].endswith('.pyc'):
-                f = modules[name][:-1]
-                if os.path.isfile(f):
-                    obj = f
-                else:
-                    obj = None
-            else:
-                obj = None
+        except KeyError:
+            obj = _get_source_file(modules[name])
         if completing_from:
             name = name[len(tokens[1]) + 1:]
             try:
@@ -121,6 +182,20 @@ def get_object(cw, line):
         return None
     return match_objects[0]
 
+def _get_source_file(filename):
+    """Return the Python source file of a module or package found by the
+    index, or None if there is none."""
+    if filename is None:
+        return None
+    if os.path.isdir(filename):
+        filename = os.path.join(filename, '__init__.py')
+    elif filename.endswith(('.pyc', '.pyo')):
+        filename = filename[:-1]
+    if filename.endswith('.py') and os.path.isfile(filename):
+        return filename
+    return None
+
+
 def complete(cw, line):
     """Construct a full list of possibly completions for imports."""
     if not cw:
@@ -144,10 +219,9 @@ def complete(cw, line):
                 # Will result in a SyntaxError
                 return None
 
+    load_package(cw.rpartition('.')[0])
     matches = list()
-    for name in sorted_modules:
-        if not (name.startswith(cw) and name.find('.', len(cw)) == -1):
-            continue
+    for name in module_index.complete(cw):
         if completing_from:
             name = name[len(tokens[1]) + 1:]
         matches.append(name)
@@ -176,78 +250,260 @@ def complete(cw, line):
     return matches
 
 
-def find_modules(path):
-    """Find all modules (and packages) for a given directory."""
-    if not os.path.isdir(path):
-        # Perhaps a zip file
+def get_cache_path():
+    """Return the path of the module cache file for the running Python
+    version and environment. Different versions have different suffixes
+    and standard libraries, and every virtualenv has packages of its own;
+    sharing a cache, each would drop the directories of the others."""
+    import hashlib
+
+    prefix = hashlib.sha1(sys.prefix.encode('utf-8')).hexdigest()[:8]
+    filename = 'modules-%d.%d-%s.cache' % (sys.version_info[:2] + (prefix, ))
+    return os.path.join(os.path.expanduser(get_config_home()), filename)
+
+
+def load_cache(path=None):
+    """Load the directory cache from disk. A missing or broken cache file
+    is not an error, everything will simply be rescanned."""
+    global cache_dirty, cache_loaded
+    import pickle
+
+    cache_loaded = True
+    if path is None:
+        path = get_cache_path()
+    try:
+        with open(path, 'rb') as f:
+            version, cache = pickle.load(f)
+    except Exception:
+        return
+    if version == CACHE_VERSION and isinstance(cache, dict):
+        directory_cache.update(cache)
+        cache_dirty = False
+
+
+def save_cache(path=None):
+    """Write the directory cache to disk if anything changed. Only the
+    directories that were visited by the last complete crawl (and the
+    packages below them) are kept, so entries of removed path entries do not
+    pile up."""
+    global cache_dirty
+
+    if not cache_dirty:
+        return
+    import pickle
+    import tempfile
+
+    if path is None:
+        path = get_cache_path()
+    if fully_loaded:
+        cache = dict((directory, entry)
+                     for (directory, entry) in directory_cache.items()
+                     if _is_below_visited(directory))
+    else:
+        # Exiting before the crawl finished, directories not visited yet
+        # are still of use
+        cache = directory_cache
+    dirname = os.path.dirname(path)
+    try:
+        if not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        fd, tmp_path = tempfile.mkstemp(dir=dirname)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump((CACHE_VERSION, cache), f,
+                            pickle.HIGHEST_PROTOCOL)
+            os.rename(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+    except EnvironmentError:
+        # Not being able to write the cache only costs time on the next
+        # start, so do not bother the user with it.
         return
+    cache_dirty = False
+
 
+def _is_below_visited(path):
+    while path not in visited_directories:
+        parent = os.path.dirname(path)
+        if parent == path:
+            return False
+        path = parent
+    return True
+
+
+def find_modules(path):
+    """Return a list of (name, filename, is_package) tuples for all modules
+    and packages directly inside the directory `path`. Packages are not
+    descended into, see `load_package()` for that. If `path` is a zip
+    archive (a zipped egg, wheel or zipapp), all modules inside of it are
+    returned with their full dotted names instead. The result is taken from
+    the directory cache if the mtime and inode of `path` did not change
+    since it was scanned the last time."""
+    global cache_dirty
+
+    if not cache_loaded:
+        load_cache()
+    path = os.path.abspath(path)
     try:
-        filenames = os.listdir(path)
+        st = os.stat(path)
     except EnvironmentError:
-        filenames = []
-    for name in filenames:
-        filename = name
-        if not any(name.endswith(suffix[0]) for suffix in imp.get_suffixes()):
-            # Possibly a package
-            if '.' in name:
+        return []
+    is_directory = stat.S_ISDIR(st.st_mode)
+    if not (is_directory or stat.S_ISREG(st.st_mode)):
+        return []
+
+    visited_directories.add(path)
+    key = (st.st_mtime, st.st_ino)
+    cached = directory_cache.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    if is_directory:
+        entries = list(_classify_directory(path))
+    else:
+        entries = list(_classify_archive(path))
+    directory_cache[path] = (key, entries)
+    cache_dirty = True
+    return entries
+
+
+def _is_identifier(name):
+    if PY3:
+        return name.isidentifier()
+    else:
+        return bool(_name.match(name))
+
+
+def _has_init(path):
+    return any(os.path.isfile(os.path.join(path, '__init__' + suffix))
+               for suffix in SUFFIXES)
+
+
+def _classify_directory(path):
+    """Find all modules and packages in a directory by looking at the file
+    names only. No files are opened and packages are not descended into."""
+    try:
+        for name, is_directory in iter_directory(path):
+            filename = name
+            if is_directory:
+                # A package, or on Python 3 possibly a namespace package
+                if (_is_identifier(name) and name != '__pycache__' and
+                        (PY3 or _has_init(os.path.join(path, name)))):
+                    yield name, filename, True
                 continue
-        elif os.path.isdir(os.path.join(path, name)):
-            # Unfortunately, CPython just crashes if there is a directory
-            # which ends with a python extension, so work around.
-            continue
-        for suffix in imp.get_suffixes():
-            if name.endswith(suffix[0]):
-                name = name[:-len(suffix[0])]
-                break
-        if PY3 and name == "badsyntax_pep3120":
-            # Workaround for issue #166
-            continue
+            for suffix in SUFFIXES:
+                if name.endswith(suffix):
+                    name = name[:-len(suffix)]
+                    break
+            else:
+                continue
+            if _is_identifier(name):
+                yield name, filename, False
+    except EnvironmentError:
+        return
+
+
+def _classify_archive(path):
+    """Find all modules and packages in a zip archive by looking at its
+    central directory only, i.e. without importing anything. Like zipimport,
+    only source and bytecode files are taken into account."""
+    import zipfile
+
+    try:
+        with catch_warnings():
+            warnings.simplefilter("ignore")
+            archive = zipfile.ZipFile(path)
         try:
-            with catch_warnings():
-                warnings.simplefilter("ignore", ImportWarning)
-                fo, pathname, _ = imp.find_module(name, [path])
-        except (ImportError, IOError, SyntaxError):
+            filenames = archive.namelist()
+        finally:
+            archive.close()
+    except (zipfile.BadZipfile, EnvironmentError, RuntimeError):
+        # Not a zip file (or a broken one)
+        return
+
+    suffixes = ('.py', '.pyc', '.pyo')
+    modules = dict()
+    packages = set()
+    for filename in filenames:
+        dirname, _, name = filename.rpartition('/')
+        name, ext = os.path.splitext(name)
+        if ext not in suffixes or not name or '.' in name:
             continue
-        except UnicodeEncodeError:
-            # Happens with Python 3 when there is a filename in some
-            # invalid encoding
+        if name == '__init__':
+            if dirname:
+                packages.add(dirname)
+        elif ext == '.py' or (dirname, name) not in modules:
+            modules[(dirname, name)] = filename
+
+    def is_importable(dirname):
+        # All parents of a module need to be packages.
+        while dirname:
+            if dirname not in packages or '.' in dirname:
+                return False
+            dirname = dirname.rpartition('/')[0]
+        return True
+
+    for dirname in sorted(packages):
+        if is_importable(dirname):
+            yield dirname.replace('/', '.'), dirname, False
+    for (dirname, name), filename in sorted(modules.items()):
+        if is_importable(dirname):
+            if dirname:
+                name = '%s.%s' % (dirname.replace('/', '.'), name)
+            yield name, filename, False
+
+
+def add_module(name, filename, is_package=False):
+    """Add a module to the index. The first module found with a given name
+    wins, as it does on import."""
+    if name in modules:
+        return
+    module_index.add(name)
+    modules[name] = filename
+    if is_package:
+        unloaded_packages[name] = filename
+
+
+def load_package(name):
+    """Add the contents of the package `name` and all of its parent packages
+    to the index, if that did not happen already."""
+    if not name:
+        return
+    package = None
+    for part in name.split('.'):
+        package = part if package is None else '%s.%s' % (package, part)
+        path = unloaded_packages.pop(package, None)
+        if path is None:
             continue
-        else:
-            if fo is not None:
-                fo.close()
-            else:
-                # Yay, package
-                for subname, filename in find_modules(pathname):
-                    if subname != '__init__':
-                        yield '%s.%s' % (name, subname), os.path.join(pathname, filename)
-            yield name, filename
+        for subname, filename, is_package in find_modules(path):
+            if subname != '__init__':
+                add_module('%s.%s' % (package, subname),
+                           os.path.join(path, filename), is_package)
 
 
 def find_all_modules(path=None):
     """Return a list with all modules in `path`, which should be a list of
-    directory names. If path is not given, sys.path will be used."""
-    global sorted_modules
-
-    i = itertools.repeat(None)
+    directory names. If path is not given, sys.path will be used. Only the
+    top level of every path entry is indexed, packages are indexed lazily
+    by `load_package()`."""
     if path is None:
-        d = dict(zip(sys.builtin_module_names, i))
-        modules.update(d)
+        for module in sys.builtin_module_names:
+            add_module(module, None)
         path = sys.path
 
     for p in path:
         if not p:
             p = os.curdir
-        for module, filename in find_modules(p):
+        for module, filename, is_package in find_modules(p):
             if not PY3 and not isinstance(module, unicode):
                 try:
                     module = module.decode(sys.getfilesystemencoding())
                 except UnicodeDecodeError:
                     # Not importable anyway, ignore it
                     continue
-            modules[module] = os.path.join(p, filename)
-            sorted_modules = sorted(modules)
-            yield
+            add_module(module, os.path.join(p, filename), is_package)
+        yield
 
 
 def find_coroutine():
@@ -257,9 +513,11 @@ def find_coroutine():
         return None
 
     try:
-        next(find_iterator)
+        with latency.span('find_coroutine'):
+            next(find_iterator)
     except StopIteration:
         fully_loaded = True
+        save_cache()
 
     return True
 
@@ -267,7 +525,12 @@ def find_coroutine():
 def reload():
     """Refresh the list of known modules."""
     modules.clear()
+    module_index.clear()
+    unloaded_packages.clear()
+    visited_directories.clear()
     for _ in find_all_modules():
         pass
+    save_cache()
 
+atexit.register(save_cache)
 find_iterator = find_all_modules()
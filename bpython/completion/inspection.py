@@ -22,21 +22,47 @@
 #
 
 from __future__ import with_statement
+import ast
 import inspect
+import io
 import keyword
-import pydoc
+import os
 import re
+import tokenize
 import types
+import weakref
 
 from pygments.token import Token
 
 from bpython._py3compat import PythonLexer, PY3
+from bpython.util import LRUCache
+from six import string_types
 
 
 if not PY3:
     _name = re.compile(r'[a-zA-Z_]\w*$')
 
 
+# Maps the file name of a module to (mtime, docstring)
+_moduledoc_cache = LRUCache(256)
+
+# Maps objects to (__doc__, pydoc.getdoc(obj))
+_doc_cache = weakref.WeakKeyDictionary()
+
+# Number of bytes of a module read at first when looking for its docstring
+MODULEDOC_HEAD_SIZE = 8192
+
+# Maps code objects to (defaults, kwdefaults, argspec). Builtins can't be
+# weakly referenced, their argspecs are kept in `_builtin_specs` instead.
+_argspec_cache = weakref.WeakKeyDictionary()
+
+# Maps modules and types to a dict of their builtins and their argspecs,
+# see `getbuiltinspec()`
+_builtin_specs = dict()
+
+_pydoc_signature = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*?)\((.*?)\)')
+
+
 class ObjSpec(list): pass
 
 
@@ -184,18 +210,11 @@ def fixlongargs(f, argspec):
     argspec[3] = values
 
 
-def getpydocspec(f, func):
-    try:
-        argspec = pydoc.getdoc(f)
-    except NameError:
-        return None
-
-    rx = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*?)\((.*?)\)')
-    s = rx.search(argspec)
-    if s is None:
-        return None
-
-    if not hasattr(f, '__name__') or s.groups()[0] != f.__name__:
+def _parsepydocspec(doc, name):
+    """Parse a signature in the first line of docstring `doc` for a
+    callable named `name`."""
+    s = _pydoc_signature.search(doc)
+    if s is None or s.group(1) != name:
         return None
 
     args = list()
@@ -203,9 +222,12 @@ def getpydocspec(f, func):
     varargs = varkwargs = None
     kwonly_args = list()
     kwonly_defaults = dict()
+    positional_only = 0
     for arg in s.group(2).split(','):
         arg = arg.strip()
-        if arg.startswith('**'):
+        if arg == '/':
+            positional_only = len(args)
+        elif arg.startswith('**'):
             varkwargs = arg[2:]
         elif arg.startswith('*'):
             varargs = arg[1:]
@@ -214,33 +236,258 @@ def getpydocspec(f, func):
             if varargs is not None:
                 kwonly_args.append(arg)
                 if default:
-                    kwonly_defaults[arg] = default
+                    kwonly_defaults[arg] = _Repr(default)
             else:
                 args.append(arg)
                 if default:
-                    defaults.append(default)
+                    defaults.append(_Repr(default))
 
-    return [func, (args, varargs, varkwargs, defaults,
-                   kwonly_args, kwonly_defaults)]
+    return [args, varargs, varkwargs, defaults, kwonly_args, kwonly_defaults,
+            {}, positional_only]
 
 
-def getargspec(func, f):
-    # Check if it's a real bound method or if it's implicitly calling __init__
-    # (i.e. FooClass(...) and not FooClass.__init__(...) -- the former would
-    # not take 'self', the latter would:
+def getpydocspec(f, func):
+    # pydoc takes long to import, and is only needed once a docstring or
+    # signature is shown
+    import pydoc
     try:
-        func_name = getattr(f, '__name__', None)
+        argspec = pydoc.getdoc(f)
+    except NameError:
+        return None
+
+    if not hasattr(f, '__name__'):
+        return None
+    argspec = _parsepydocspec(argspec, f.__name__)
+    if argspec is None:
+        return None
+    return [func, argspec]
+
+
+def _signaturespec(signature):
+    """Convert an `inspect.Signature` to the list returned by
+    `inspect.getfullargspec()`, followed by the number of positional-only
+    arguments."""
+    args = list()
+    defaults = list()
+    varargs = varkwargs = None
+    kwonly_args = list()
+    kwonly_defaults = dict()
+    positional_only = 0
+    for parameter in signature.parameters.values():
+        kind = parameter.kind
+        if kind == parameter.POSITIONAL_ONLY:
+            positional_only += 1
+        if kind == parameter.VAR_POSITIONAL:
+            varargs = parameter.name
+        elif kind == parameter.VAR_KEYWORD:
+            varkwargs = parameter.name
+        elif kind == parameter.KEYWORD_ONLY:
+            kwonly_args.append(parameter.name)
+            if parameter.default is not parameter.empty:
+                kwonly_defaults[parameter.name] = parameter.default
+        else:
+            args.append(parameter.name)
+            if parameter.default is not parameter.empty:
+                defaults.append(parameter.default)
+    return [args, varargs, varkwargs, tuple(defaults) or None,
+            kwonly_args, kwonly_defaults or None, {}, positional_only]
+
+
+def positional_only(argspec):
+    """Return the number of positional-only arguments of an argspec, which
+    come first in its args."""
+    return argspec[7] if len(argspec) > 7 else 0
+
+
+def _getbuiltinspec(f):
+    if hasattr(inspect, 'signature') and getattr(f, '__text_signature__',
+                                                 None):
+        try:
+            return _signaturespec(inspect.signature(f))
+        except (TypeError, ValueError):
+            pass
+
+    # No signature information, the docstring is the only hope
+    doc = getattr(f, '__doc__', None)
+    name = getattr(f, '__name__', None)
+    if not (doc and name):
+        return None
+    argspec = _parsepydocspec(doc, name)
+    if argspec is not None and inspect.ismethoddescriptor(f):
+        argspec[0].insert(0, 'obj')
+        if argspec[7]:
+            argspec[7] += 1
+    return argspec
+
+
+def _populate_builtin_specs(owner):
+    """Compute the argspecs of all builtin functions or method descriptors
+    of a module or type."""
+    specs = dict()
+    for member in list(vars(owner).values()):
+        if inspect.isbuiltin(member) or inspect.ismethoddescriptor(member):
+            try:
+                specs[member] = _getbuiltinspec(member)
+            except TypeError:
+                # Unhashable
+                pass
+    return specs
+
+
+def getbuiltinspec(f):
+    """Return the argspec of a builtin function or method descriptor. The
+    argspecs of all builtins of a module or type are computed at once when
+    the first one is asked for. Everything is taken from
+    `__text_signature__` or, as last resort, the first line of the
+    docstring. Neither case mutates the type of `f`."""
+    owner = getattr(f, '__objclass__', None)
+    if owner is None:
+        owner = getattr(f, '__self__', None)
+        if not isinstance(owner, types.ModuleType):
+            # A bound method, these are created on the fly
+            return _getbuiltinspec(f)
+    try:
+        specs = _builtin_specs[owner]
+    except KeyError:
+        specs = _builtin_specs[owner] = _populate_builtin_specs(owner)
     except TypeError:
+        return _getbuiltinspec(f)
+    try:
+        return specs[f]
+    except (KeyError, TypeError):
+        return _getbuiltinspec(f)
+
+
+def _hooks_attributes(metaclass):
+    """Return whether looking up attributes on the classes of `metaclass`
+    runs code of its own."""
+    return any('__getattr__' in vars(klass) or
+               '__getattribute__' in vars(klass)
+               for klass in inspect.getmro(metaclass)
+               if klass not in (type, object))
+
+
+def gettypespec(t):
+    """Return the argspec of calling the type `t`, from its signature or,
+    as last resort, the first line of its docstring. Unlike `getpydocspec()`
+    this looks nothing up on `t` that its metaclass could intercept, so
+    there is no need to mutate it."""
+    if hasattr(inspect, 'signature') and not _hooks_attributes(type(t)):
+        try:
+            return _signaturespec(inspect.signature(t))
+        except (TypeError, ValueError):
+            pass
+
+    doc = vars(t).get('__doc__')
+    name = vars(t).get('__name__', t.__name__)
+    if not (isinstance(doc, string_types) and name):
         return None
+    return _parsepydocspec(doc, name)
 
+
+def _find_docstring(source):
+    """Return the docstring of the module source `source`, which might be
+    truncated. Raise tokenize.TokenError if the docstring does not end in
+    the given source."""
+    readline = io.StringIO(source).readline
+    for token in tokenize.generate_tokens(readline):
+        token_type, value = token[0], token[1]
+        if token_type in (tokenize.COMMENT, tokenize.NL, tokenize.NEWLINE):
+            continue
+        elif token_type == tokenize.STRING:
+            try:
+                docstring = ast.literal_eval(value)
+            except (SyntaxError, ValueError):
+                return None
+            if isinstance(docstring, string_types):
+                return inspect.cleandoc(docstring)
+            return None
+        else:
+            return None
+    return None
+
+
+def getdoc(obj):
+    """Return `pydoc.getdoc(obj)`. The result is cached for objects that can
+    be weakly referenced, until their `__doc__` is replaced."""
+    import pydoc
+    doc = getattr(obj, '__doc__', None)
     try:
-        is_bound_method = ((inspect.ismethod(f) and f.im_self is not None)
-                           or (func_name == '__init__' and not
-        func.endswith('.__init__')))
-    except:
-        # if f is a method from a xmlrpclib.Server instance, func_name ==
-        # '__init__' throws xmlrpclib.Fault (see #202)
+        cached = _doc_cache.get(obj)
+    except TypeError:
+        return pydoc.getdoc(obj)
+    if cached is not None and cached[0] is doc:
+        return cached[1]
+    docstring = pydoc.getdoc(obj)
+    try:
+        _doc_cache[obj] = (doc, docstring)
+    except TypeError:
+        pass
+    return docstring
+
+
+def getmoduledoc(filename):
+    """Return the docstring of the Python source file `filename` without
+    importing it. Only the head of the file is read, and results are cached
+    by the file's mtime."""
+    try:
+        mtime = os.stat(filename).st_mtime
+    except EnvironmentError:
+        return None
+    cached = _moduledoc_cache.get(filename)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    docstring = None
+    size = MODULEDOC_HEAD_SIZE
+    try:
+        with open(filename, 'rb') as f:
+            data = f.read(size)
+            while True:
+                eof = len(data) < size
+                source = data.decode('utf-8', 'replace')
+                try:
+                    docstring = _find_docstring(source)
+                except tokenize.TokenError:
+                    if not eof:
+                        # The docstring is longer than what was read so far
+                        data += f.read(size)
+                        size *= 2
+                        continue
+                break
+    except (EnvironmentError, SyntaxError):
         return None
+
+    _moduledoc_cache[filename] = (mtime, docstring)
+    return docstring
+
+
+def _argspec_cache_key(f):
+    """Return (key, defaults, kwdefaults) for the argspec cache. Functions
+    and methods are keyed by their code object, which is shared by all
+    closures and bound methods of the same function. key is None if `f`
+    should not be cached."""
+    if isinstance(f, (types.FunctionType, types.MethodType)):
+        code = getattr(f, '__code__', None)
+        if isinstance(code, types.CodeType):
+            return (code, getattr(f, '__defaults__', None),
+                    getattr(f, '__kwdefaults__', None))
+    return None, None, None
+
+
+def _copy_argspec(argspec):
+    """Copy an argspec along with its lists and dicts, which callers may
+    change, but not the default values themselves."""
+    return [list(item) if isinstance(item, list) else
+            dict(item) if isinstance(item, dict) else item
+            for item in argspec]
+
+
+def _getargspec(func, f):
+    if inspect.isclass(f):
+        return gettypespec(f)
+    if inspect.isbuiltin(f) or inspect.ismethoddescriptor(f):
+        return getbuiltinspec(f)
     try:
         if PY3:
             argspec = inspect.getfullargspec(f)
@@ -249,18 +496,59 @@ def getargspec(func, f):
 
         argspec = list(argspec)
         fixlongargs(f, argspec)
-        argspec = [func, argspec, is_bound_method]
     except (TypeError, KeyError):
         with AttrCleaner(f):
             argspec = getpydocspec(f, func)
         if argspec is None:
             return None
-        if inspect.ismethoddescriptor(f):
-            argspec[1][0].insert(0, 'obj')
-        argspec.append(is_bound_method)
+        argspec = argspec[1]
     return argspec
 
 
+def getargspec(func, f):
+    # Check if it's a real bound method or if it's implicitly calling __init__
+    # (i.e. FooClass(...) and not FooClass.__init__(...) -- the former would
+    # not take 'self', the latter would:
+    try:
+        func_name = getattr(f, '__name__', None)
+    except TypeError:
+        return None
+
+    try:
+        is_bound_method = ((inspect.ismethod(f) and
+                            getattr(f, '__self__', None) is not None)
+                           or (func_name == '__init__' and not
+        func.endswith('.__init__')))
+    except:
+        # if f is a method from a xmlrpclib.Server instance, func_name ==
+        # '__init__' throws xmlrpclib.Fault (see #202)
+        return None
+
+    # Looking up the argspec means parsing the source of the function, so
+    # remember it for as long as the code object lives. The defaults are
+    # not part of the code object, so they are checked separately.
+    key, defaults, kwdefaults = _argspec_cache_key(f)
+    try:
+        cached = _argspec_cache.get(key) if key is not None else None
+    except TypeError:
+        # Unhashable or not weak referenceable
+        key = cached = None
+    if (cached is not None and cached[0] is defaults and
+            cached[1] is kwdefaults):
+        argspec = cached[2]
+    else:
+        argspec = _getargspec(func, f)
+        if key is not None:
+            try:
+                _argspec_cache[key] = (defaults, kwdefaults, argspec)
+            except TypeError:
+                pass
+
+    if argspec is None:
+        return None
+    return [func, _copy_argspec(argspec), is_bound_method]
+
+
 def getmembers(object, predicate=None):
     """Return all members of an object as (name, value) pairs sorted by name.
     Optionally, only return members that satisfy a given predicate."""
@@ -6,12 +6,13 @@ Module to handle command line argument parsing, for all front-ends.
 """
 
 from __future__ import with_statement
+import atexit
 import os
 import sys
 import code
 from optparse import OptionParser, OptionGroup
 
-from bpython import __version__
+from bpython import __version__, latency
 from bpython.config.struct import default_config_path, loadini
 from bpython.translations import _
 
@@ -74,6 +75,11 @@ def parse_and_load(config, args, extras=None, ignore_stdin=False):
                       help=_("Don't flush the output to stdout."))
     parser.add_option('--version', '-V', action='store_true',
                       help=_('Print version and exit.'))
+    parser.add_option('--trace', metavar='FILE',
+                      help=_('Write a trace of internal timings to FILE, '
+                             'in Chrome\'s trace event format.'))
+    parser.add_option('--profile-startup', action='store_true',
+                      help=_('Show how long the parts of the startup took.'))
 
     if extras is not None:
         extras_group = OptionGroup(parser, extras[0], extras[1])
@@ -98,8 +104,20 @@ def parse_and_load(config, args, extras=None, ignore_stdin=False):
         interpreter.runsource(sys.stdin.read())
         raise SystemExit
 
+    if options.profile_startup:
+        latency.startup.start_profile()
+
     loadini(config, options.config)
 
+    if options.trace:
+        try:
+            latency.recorder.start_trace(options.trace)
+        except EnvironmentError as e:
+            sys.stderr.write("Could not write trace to %s: %s\n" %
+                             (options.trace, e.strerror))
+            sys.exit(1)
+        atexit.register(latency.recorder.stop_trace)
+
     return config, options, args
 
 def exec_code(interpreter, args):
@@ -85,6 +85,7 @@ def _loadini(struct, configfile):
 
     struct.cli_trim_prompts = config.getboolean('cli',
                                                 'trim_prompts')
+    struct.cli_latency_meter = config.getboolean('cli', 'latency_meter')
     struct.complete_magic_methods = config.getboolean('general',
                                                       'complete_magic_methods')
     methods = config.get('general', 'magic_methods')
@@ -30,6 +30,8 @@ GEANY = re.compile(r'^geany')
 TEXTMATE = re.compile(r'^mate')
 SUBLIME = re.compile(r'^subl')
 
+OPTION = re.compile(r'\s*-(\w)\s*(\S+)\s+')
+
 is_emacs_client = lambda x: EMACS_CLIENT.match(x)
 is_emacs = lambda x: EMACS.match(x)
 is_nano = lambda x: NANO.match(x)
@@ -185,3 +187,32 @@ def is_dictproxy(obj):
     if hasattr(obj, '__class__') and hasattr(obj.__class__, '__name__'):
         return obj.__class__.__name__ == 'dictproxy'
     return False
+
+
+def format_size(size):
+    for unit in ('B', 'KiB', 'MiB'):
+        if abs(size) < 1024:
+            break
+        size /= 1024.0
+    else:
+        unit = 'GiB'
+    return ('%d %s' if unit == 'B' else '%.1f %s') % (size, unit)
+
+
+def parse_options(line, defaults):
+    """Split leading options like '-n 10' off the line of a raw command.
+    `defaults` maps the option letters to default values, whose types the
+    values given are converted to. Return the options and the rest of the
+    line. Raise CommandError on values that don't convert."""
+    options = dict(defaults)
+    while True:
+        match = OPTION.match(line)
+        if not match or match.group(1) not in options:
+            return options, line.strip()
+        (name, value) = match.groups()
+        try:
+            options[name] = type(defaults[name])(value)
+        except ValueError:
+            raise CommandError('-%s takes %s, not %r' % (
+                name, type(defaults[name]).__name__, value))
+        line = line[match.end():]
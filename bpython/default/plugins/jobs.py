@@ -0,0 +1,340 @@
+#!/usr/bin/env python
+#coding: utf-8
+
+import ctypes
+import linecache
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import timeit
+import traceback
+from collections import OrderedDict
+
+import bpython
+from bpython.completion.completers import get_item_completer
+from bpython.parallel import real_streams
+from bpython.util import _dumps, _loads
+from six import StringIO
+
+from plugins.helpers import parse_options
+
+
+__all__ = ['bg', 'jobs', 'wait', 'kill']
+
+
+# Characters of a statement shown in the job table
+STMT_WIDTH = 40
+
+# Seconds between checks for a key pressed while waiting for jobs
+WAIT_TIME = 0.1
+
+# Processes run on a copy of the namespace, so they have to be forked
+if hasattr(multiprocessing, 'get_context'):
+    processes = multiprocessing.get_context('fork')
+else:
+    processes = multiprocessing
+
+# Maps job numbers to all jobs of the session
+table = OrderedDict()
+
+
+class Job(object):
+    """A statement run in the background, on a thread sharing the REPL's
+    namespace or in a forked process working on a copy of it."""
+
+    def __init__(self, number, stmt, process):
+        self.number = number
+        self.stmt = stmt
+        self.process = process
+        self.filename = '<job-%d>' % (number, )
+        self.status = 'running'
+        self.output = StringIO()
+        self.result = None
+        self.error = None
+        self.started = timeit.default_timer()
+        self.finished = None
+        self.done = threading.Event()
+        # The thread running the statement, or waiting for the process
+        self.thread = None
+        self.child = None
+
+    def compile(self):
+        lines = self.stmt.splitlines(True)
+        linecache.cache[self.filename] = (len(self.stmt), None, lines,
+                                          self.filename)
+        try:
+            return compile(self.stmt, self.filename, 'eval'), True
+        except SyntaxError:
+            return compile(self.stmt, self.filename, 'exec'), False
+
+    def elapsed(self):
+        return (self.finished or timeit.default_timer()) - self.started
+
+    def finish(self, status, result=None, error=None):
+        if self.done.is_set():
+            return
+        self.status = status
+        self.result = result
+        self.error = error
+        self.finished = timeit.default_timer()
+        self.done.set()
+        app = bpython.running
+        app.notify_later('Job %d %s after %.1fs: %s' % (
+            self.number, status, self.elapsed(), short_stmt(self.stmt)))
+        app.background.discard(self)
+        # Completions of containers the job changed are out of date
+        get_item_completer.clear_cache()
+
+
+class JobStream(object):
+    """Wrap sys.stdout or sys.stderr to send what job threads write to
+    their jobs' output, and the rest to the wrapped stream."""
+
+    # Maps thread idents to the jobs they run
+    threads = dict()
+    # Number of jobs that need the streams wrapped, and the lock guarding
+    # it and the wrapping
+    users = 0
+    lock = threading.Lock()
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, s):
+        job = self.threads.get(threading.current_thread().ident)
+        if job is None:
+            self.stream.write(s)
+        else:
+            job.output.write(s)
+
+    def writelines(self, lines):
+        for s in lines:
+            self.write(s)
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+def capture_output():
+    """Wrap sys.stdout and sys.stderr, until release_output() has been
+    called as often as this."""
+    with JobStream.lock:
+        JobStream.users += 1
+        if not isinstance(sys.stdout, JobStream):
+            sys.stdout = JobStream(sys.stdout)
+        if not isinstance(sys.stderr, JobStream):
+            sys.stderr = JobStream(sys.stderr)
+
+
+def release_output():
+    with JobStream.lock:
+        JobStream.users -= 1
+        if JobStream.users:
+            return
+        # Streams replaced since are not ours to restore
+        if isinstance(sys.stdout, JobStream):
+            sys.stdout = sys.stdout.stream
+        if isinstance(sys.stderr, JobStream):
+            sys.stderr = sys.stderr.stream
+
+
+def short_stmt(stmt):
+    stmt = ' '.join(stmt.split())
+    if len(stmt) > STMT_WIDTH:
+        stmt = stmt[:STMT_WIDTH - 3] + '...'
+    return stmt
+
+
+def format_exception():
+    """Format the exception being handled, without the frame of the
+    function running the job."""
+    (exc_type, exc_value, tb) = sys.exc_info()
+    return ''.join(traceback.format_exception(exc_type, exc_value,
+                                              tb.tb_next))
+
+
+def run_thread(job, code, is_expression, namespace):
+    JobStream.threads[threading.current_thread().ident] = job
+    try:
+        if is_expression:
+            result = eval(code, namespace)
+        else:
+            exec(code, namespace)
+            result = None
+    except KeyboardInterrupt:
+        outcome = ('killed', None, None)
+    except BaseException:
+        outcome = ('failed', None, format_exception())
+    else:
+        outcome = ('done', result, None)
+    finally:
+        del JobStream.threads[threading.current_thread().ident]
+        release_output()
+    # Whoever waits for the job finds the streams as they were
+    job.finish(*outcome)
+
+
+def run_child(connection, code, is_expression, namespace):
+    # curses' handler would restore the terminal the parent still uses
+    # when the child is killed
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    sys.stdout = sys.stderr = output = StringIO()
+    try:
+        if is_expression:
+            result = eval(code, namespace)
+        else:
+            exec(code, namespace)
+            result = None
+    except BaseException:
+        message = ('failed', None, format_exception())
+    else:
+        message = ('done', result, None)
+    connection.send_bytes(_dumps(message + (output.getvalue(), )))
+    connection.close()
+
+
+def wait_child(job, connection):
+    try:
+        (status, result, error, output) = _loads(connection.recv_bytes())
+    except EOFError:
+        job.finish('killed' if job.status == 'killing' else 'failed',
+                   error='The process exited with %s.\n' % (
+                       job.child.exitcode, ))
+    else:
+        job.output.write(output)
+        job.finish(status, result, error)
+    finally:
+        connection.close()
+        job.child.join()
+
+
+def bg(line):
+    """Run a statement in the background: %bg [-p] stmt. It runs on a thread
+    in the REPL's namespace, or with -p in a forked process on a copy of
+    it."""
+    process = line.lstrip().startswith('-p ')
+    stmt = line.lstrip()[3:] if process else line.strip()
+    if not stmt:
+        print('Usage: %bg [-p] statement')
+        return
+    if process and not hasattr(os, 'fork'):
+        print('Processes need os.fork(), use a thread instead.')
+        return
+
+    job = Job(len(table) + 1, stmt, process)
+    code, is_expression = job.compile()
+    namespace = bpython.running.interpreter.locals
+    table[job.number] = job
+    bpython.running.background.add(job)
+    if process:
+        out, in_ = processes.Pipe(False)
+        job.child = processes.Process(
+            target=run_child, args=(in_, code, is_expression, namespace))
+        job.child.daemon = True
+        with real_streams():
+            job.child.start()
+        in_.close()
+        job.thread = threading.Thread(target=wait_child, args=(job, out))
+    else:
+        capture_output()
+        job.thread = threading.Thread(
+            target=run_thread, args=(job, code, is_expression, namespace))
+    job.thread.daemon = True
+    job.thread.start()
+    print('Job %d started.' % (job.number, ))
+
+
+def jobs():
+    """Show the table of background jobs."""
+    if not table:
+        print('No jobs.')
+        return
+    lines = ['%4s  %-8s  %-7s  %9s  %8s  %s' % (
+        'Job', 'Status', 'Runs on', 'Elapsed', 'Output', 'Statement')]
+    for job in table.values():
+        lines.append('%4d  %-8s  %-7s  %8.1fs  %8d  %s' % (
+            job.number, job.status, 'process' if job.process else 'thread',
+            job.elapsed(), len(job.output.getvalue()), short_stmt(job.stmt)))
+    print('\n'.join(lines))
+
+
+def find_jobs(numbers):
+    found = []
+    for number in numbers:
+        try:
+            found.append(table[int(number)])
+        except (ValueError, KeyError):
+            print('No job %s.' % (number, ))
+            return None
+    return found
+
+
+def wait_for(job, deadline):
+    """Wait for job to finish, unless the deadline passes or a key is
+    pressed first."""
+    scr = bpython.running.clirepl.scr
+    scr.nodelay(True)
+    try:
+        while not job.done.wait(WAIT_TIME):
+            if scr.getch() != -1:
+                return False
+            if deadline and timeit.default_timer() > deadline:
+                return False
+    finally:
+        scr.nodelay(False)
+    return True
+
+
+def wait(line=''):
+    """Wait for jobs to finish, and show their output and results: %wait
+    [-t timeout] [job ...]. Without jobs, wait for all of them. Pressing a
+    key stops waiting."""
+    options, line = parse_options(line + ' ', dict(t=0.0))
+    waiting = find_jobs(line.split()) if line else list(table.values())
+    if waiting is None:
+        return
+    deadline = options['t'] and timeit.default_timer() + options['t']
+    for job in waiting:
+        if not wait_for(job, deadline):
+            print('Job %d is still running.' % (job.number, ))
+            continue
+        print('Job %d %s after %.1fs: %s' % (job.number, job.status,
+                                             job.elapsed(), job.stmt))
+        output = job.output.getvalue()
+        if output:
+            sys.stdout.write(output if output.endswith('\n') else
+                             output + '\n')
+        if job.error:
+            sys.stdout.write(job.error)
+        elif job.result is not None:
+            print(repr(job.result))
+
+
+def kill(line):
+    """Stop jobs: %kill job ... A thread gets a KeyboardInterrupt raised,
+    which takes effect at its next Python instruction; a process is
+    terminated."""
+    killing = find_jobs(line.split())
+    if not killing:
+        if killing is not None:
+            print('Usage: %kill job ...')
+        return
+    for job in killing:
+        if job.done.is_set():
+            print('Job %d is not running.' % (job.number, ))
+        elif job.process:
+            job.status = 'killing'
+            job.child.terminate()
+        else:
+            set_async_exc = ctypes.pythonapi.PyThreadState_SetAsyncExc
+            found = set_async_exc(ctypes.c_ulong(job.thread.ident),
+                                  ctypes.py_object(KeyboardInterrupt))
+            if found > 1:
+                # More than one thread got the exception, take it back
+                set_async_exc(ctypes.c_ulong(job.thread.ident), None)
+                print('Could not kill job %d.' % (job.number, ))
+            elif not found:
+                # The thread ended since job.done was checked
+                print('Job %d is not running.' % (job.number, ))
@@ -0,0 +1,15 @@
+#!/usr/bin/env python
+#coding: utf-8
+
+from bpython.latency import recorder
+
+
+__all__ = ['show_latency', 'reset_latency']
+
+
+def show_latency():
+    print(recorder.format_report())
+
+
+def reset_latency():
+    recorder.clear()
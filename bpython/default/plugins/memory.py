@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+#coding: utf-8
+
+import linecache
+import os
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+import bpython
+from bpython.pager import page
+
+from plugins.helpers import format_size, parse_options
+
+
+__all__ = ['memit', 'heap', 'heap_stop']
+
+
+# Number of frames stored per allocation
+FRAMES = 1
+
+# Number of allocation sites shown
+LIMIT = 20
+
+# Ways tracemalloc can group allocations by
+GROUPINGS = ('lineno', 'filename', 'traceback')
+
+# Snapshot taken by the last %heap
+last_snapshot = None
+
+
+def take_snapshot():
+    """Take a snapshot without the allocations of tracemalloc and bpython
+    itself."""
+    return tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<unknown>'),
+        tracemalloc.Filter(False, os.path.join(bpython.package_dir, '*')),
+    ])
+
+
+def format_statistics(statistics, limit):
+    lines = []
+    for stat in statistics[:limit]:
+        lines.append(str(stat))
+        frame = stat.traceback[0]
+        source = linecache.getline(frame.filename, frame.lineno).strip()
+        if source:
+            lines.append('    ' + source)
+    if len(statistics) > limit:
+        lines.append('... and %d more' % (len(statistics) - limit, ))
+    return lines
+
+
+def unavailable():
+    if tracemalloc is None:
+        print('tracemalloc is not available on this version of Python.')
+        return True
+    return False
+
+
+def memit(line):
+    """Measure the memory a statement allocates: %memit [-l limit] stmt"""
+    if unavailable():
+        return
+    options, stmt = parse_options(line, dict(l=LIMIT))
+    if not stmt:
+        print('Usage: %memit [-l limit] statement')
+        return
+    code = compile(stmt, '<input>', 'exec')
+
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start(FRAMES)
+    if hasattr(tracemalloc, 'reset_peak'):
+        tracemalloc.reset_peak()
+    try:
+        before = take_snapshot()
+        start = tracemalloc.get_traced_memory()[0]
+        exec(code, bpython.running.interpreter.locals,
+             bpython.running.interpreter.locals)
+        current, peak = tracemalloc.get_traced_memory()
+        after = take_snapshot()
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+
+    lines = ['peak: %s, net: %s' % (format_size(peak - start),
+                                    format_size(current - start)), '']
+    statistics = [stat for stat in after.compare_to(before, 'lineno')
+                  if stat.size_diff]
+    lines.extend(format_statistics(statistics, options['l']))
+    page('\n'.join(lines) + '\n')
+
+
+def heap(line):
+    """Show where the memory allocated since tracing started went, and what
+    changed since the last %heap: %heap [-l limit] [-g lineno|filename|
+    traceback]"""
+    global last_snapshot
+
+    if unavailable():
+        return
+    options, _ = parse_options(line + ' ', dict(l=LIMIT, g='lineno'))
+    if options['g'] not in GROUPINGS:
+        print('Usage: %%heap [-l limit] [-g %s]' % ('|'.join(GROUPINGS), ))
+        return
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(FRAMES)
+        last_snapshot = None
+        print('Tracing allocations from now on, use %heap again to see '
+              'them, and %heap-stop to stop.')
+        return
+
+    snapshot = take_snapshot()
+    statistics = snapshot.statistics(options['g'])
+    current, peak = tracemalloc.get_traced_memory()
+    lines = ['traced: %s, peak: %s' % (format_size(current),
+                                       format_size(peak)),
+             '', 'Top allocation sites:']
+    lines.extend(format_statistics(statistics, options['l']))
+    if last_snapshot is not None:
+        lines.extend(['', 'Changes since the last %heap:'])
+        lines.extend(format_statistics(
+            [stat for stat in snapshot.compare_to(last_snapshot, options['g'])
+             if stat.size_diff], options['l']))
+    last_snapshot = snapshot
+    page('\n'.join(lines) + '\n')
+
+
+def heap_stop():
+    global last_snapshot
+
+    if unavailable():
+        return
+    tracemalloc.stop()
+    last_snapshot = None
@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+#coding: utf-8
+
+import gc
+import itertools
+import sys
+import timeit
+import types
+from collections import deque
+
+import bpython
+from bpython._internal import _help
+from bpython.pager import page
+from six.moves import builtins, reprlib
+
+from plugins.helpers import format_size, parse_options
+
+
+__all__ = ['who', 'whos']
+
+
+# Seconds the deep size of a single variable may take to compute
+DEEP_SIZE_TIME = 0.2
+
+# Objects shared by everything, whose size no variable should be charged
+# with, and whose referents lead all over the interpreter
+NOT_TRAVERSED = (type, types.ModuleType, types.FunctionType,
+                 types.BuiltinFunctionType, types.MethodType, types.CodeType,
+                 types.FrameType)
+
+SORT_KEYS = {
+    'name': lambda row: row[0],
+    'type': lambda row: (row[1], row[0]),
+    'size': lambda row: -row[2],
+    'deep': lambda row: -row[3],
+}
+
+# Characters of the data shown per variable
+DATA_WIDTH = 40
+
+short_repr = reprlib.Repr()
+short_repr.maxlevel = 2
+short_repr.maxstring = short_repr.maxother = DATA_WIDTH
+
+
+def numpy_array_size(obj):
+    """An ndarray's data is not an object of its own. Arrays owning their
+    data are charged with it, views with their header only and lead to the
+    object they view."""
+    if obj.base is None:
+        return sys.getsizeof(obj, 0) + obj.nbytes, []
+    return sys.getsizeof(obj, 0), [obj.base]
+
+
+def memoryview_size(obj):
+    return sys.getsizeof(obj, 0), [obj.obj] if hasattr(obj, 'obj') else []
+
+
+def mmap_size(obj):
+    return sys.getsizeof(obj, 0) + len(obj), []
+
+
+# Maps (module, type name) to functions returning the size of an object and
+# the objects it refers to, for objects gc.get_referents() is no good for.
+# Types are named to not import modules just to look their types up.
+handlers = {
+    ('numpy', 'ndarray'): numpy_array_size,
+    ('builtins', 'memoryview'): memoryview_size,
+    ('__builtin__', 'memoryview'): memoryview_size,
+    ('mmap', 'mmap'): mmap_size,
+}
+
+
+def size_and_referents(obj):
+    t = type(obj)
+    handler = handlers.get((t.__module__, t.__name__))
+    if handler is not None:
+        return handler(obj)
+    return sys.getsizeof(obj, 0), gc.get_referents(obj)
+
+
+def deep_size(obj, time_limit=DEEP_SIZE_TIME):
+    """Return the size of obj and all objects reachable from it, and whether
+    all of them were counted in time. Every object is counted once, and the
+    traversal is iterative, so neither cycles nor deep nesting matter."""
+    deadline = timeit.default_timer() + time_limit
+    seen = set([id(obj)])
+    pending = deque([obj])
+    total = 0
+    for count in itertools.count(1):
+        if not pending:
+            return total, True
+        # Checking the clock for every object would double the work
+        if count % 1000 == 0 and timeit.default_timer() > deadline:
+            return total, False
+        current = pending.pop()
+        size, referents = size_and_referents(current)
+        total += size
+        for referent in referents:
+            if (id(referent) not in seen and
+                    not isinstance(referent, NOT_TRAVERSED)):
+                seen.add(id(referent))
+                pending.append(referent)
+
+
+def user_variables(types_wanted):
+    """Return the variables of the REPL's namespace, without the hidden
+    ones, modules, builtins and help, and only of the named types if any are
+    given."""
+    namespace = bpython.running.interpreter.locals
+    for (name, value) in sorted(namespace.items()):
+        if name.startswith('_') or isinstance(value, types.ModuleType):
+            continue
+        if getattr(builtins, name, None) is value or value is _help:
+            continue
+        if types_wanted and type(value).__name__ not in types_wanted:
+            continue
+        yield name, value
+
+
+def who(line=''):
+    """List the variables of the REPL: %who [type ...]"""
+    names = [name for (name, _) in user_variables(line.split())]
+    if not names:
+        print('No variables.')
+        return
+    page('  '.join(names) + '\n')
+
+
+def short_data(value):
+    data = short_repr.repr(value)
+    if len(data) > DATA_WIDTH:
+        data = data[:DATA_WIDTH - 3] + '...'
+    return data
+
+
+def whos(line=''):
+    """List the variables of the REPL with their types and sizes: %whos
+    [-s name|type|size|deep] [type ...]"""
+    options, line = parse_options(line + ' ', dict(s='name'))
+    if options['s'] not in SORT_KEYS:
+        print('Unknown sort key %s, use one of: %s' % (
+            options['s'], ', '.join(sorted(SORT_KEYS))))
+        return
+
+    rows = []
+    for (name, value) in user_variables(line.split()):
+        size = sys.getsizeof(value, 0)
+        if isinstance(value, NOT_TRAVERSED):
+            deep, complete = size, True
+        else:
+            deep, complete = deep_size(value)
+        rows.append((name, type(value).__name__, size, deep, complete,
+                     short_data(value)))
+    if not rows:
+        print('No variables.')
+        return
+    rows.sort(key=SORT_KEYS[options['s']])
+
+    name_width = max(8, max(len(row[0]) for row in rows))
+    type_width = max(4, max(len(row[1]) for row in rows))
+    template = '%%-%ds  %%-%ds  %%10s  %%11s  %%s' % (name_width, type_width)
+    lines = [template % ('Variable', 'Type', 'Size', 'Deep size', 'Data'),
+             '-' * (name_width + type_width + 33)]
+    for (name, type_name, size, deep, complete, data) in rows:
+        lines.append(template % (name, type_name, format_size(size),
+                                 ('' if complete else '>') + format_size(deep),
+                                 data))
+    page('\n'.join(lines) + '\n')
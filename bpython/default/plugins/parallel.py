@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+#coding: utf-8
+
+import multiprocessing
+
+import bpython
+from bpython import parallel
+
+from plugins.helpers import parse_options
+
+
+__all__ = ['pmap']
+
+
+# Seconds between checks for Ctrl-C while waiting for results
+WAIT_TIME = 0.1
+
+CTRL_C = 3
+
+
+def split_expressions(line):
+    """Split line into the expressions of a function and an iterable, at the
+    first space where both parts compile."""
+    words = line.split(' ')
+    for i in range(1, len(words)):
+        func, iterable = ' '.join(words[:i]), ' '.join(words[i:])
+        try:
+            compile(func, '<input>', 'eval')
+            compile(iterable, '<input>', 'eval')
+        except SyntaxError:
+            continue
+        return func, iterable
+    return None
+
+
+def pmap(line):
+    """Map a function over an iterable on a pool of processes, and return
+    the results in order: %pmap [-n processes] [-c chunk size] func
+    iterable. Functions defined at the prompt work too. Ctrl-C cancels."""
+    options, line = parse_options(line, dict(n=0, c=0))
+    expressions = split_expressions(line)
+    if not expressions:
+        print('Usage: %pmap [-n processes] [-c chunk size] function iterable')
+        return
+    namespace = bpython.running.interpreter.locals
+    func = eval(expressions[0], namespace)
+    items = list(eval(expressions[1], namespace))
+
+    app = bpython.running
+    scr = app.clirepl.scr
+    pool, chunks = parallel.imap_chunks(func, items, options['n'],
+                                        options['c'])
+    collected = []
+    scr.nodelay(True)
+    try:
+        while len(collected) < len(items):
+            app.statusbar.progress(len(collected), len(items), '%pmap ')
+            try:
+                collected.extend(chunks.next(WAIT_TIME))
+            except multiprocessing.TimeoutError:
+                if scr.getch() == CTRL_C:
+                    raise KeyboardInterrupt()
+        pool.close()
+    except KeyboardInterrupt:
+        print('Cancelled after %d of %d items.' % (len(collected),
+                                                    len(items)))
+        return
+    finally:
+        scr.nodelay(False)
+        pool.terminate()
+        pool.join()
+        app.statusbar.refresh()
+    return collected
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+#coding: utf-8
+
+import cProfile
+import inspect
+import pstats
+import sys
+import timeit
+from collections import defaultdict
+
+import bpython
+from bpython.pager import page
+from six import StringIO
+
+from plugins.helpers import parse_options
+
+
+__all__ = ['prun', 'prun_callers', 'lprun']
+
+
+# Number of functions shown
+LIMIT = 30
+
+SORT_KEY = 'cumulative'
+
+# Statistics of the last profiled statement
+last_stats = None
+
+
+def format_stats(stats, method, *args):
+    stream = StringIO()
+    stats.stream = stream
+    getattr(stats, method)(*args)
+    return stream.getvalue()
+
+
+def prun(line):
+    """Profile a statement in the REPL's namespace: %prun [-s sort key]
+    [-l number of functions] [-D file for the stats] stmt"""
+    global last_stats
+
+    options, stmt = parse_options(line, dict(s=SORT_KEY, l=LIMIT, D=''))
+    if not stmt:
+        print('Usage: %prun [-s sort key] [-l limit] [-D file] statement')
+        return
+    if options['s'] not in pstats.Stats.sort_arg_dict_default:
+        print('Unknown sort key %s, use one of: %s' % (
+            options['s'], ', '.join(sorted(pstats.Stats.sort_arg_dict_default))))
+        return
+    # Report syntax errors before the profiler is started
+    code = compile(stmt, '<input>', 'exec')
+
+    namespace = bpython.running.interpreter.locals
+    profile = cProfile.Profile()
+    try:
+        profile.runctx(code, namespace, namespace)
+    finally:
+        last_stats = pstats.Stats(profile, stream=StringIO())
+        if options['D']:
+            last_stats.dump_stats(options['D'])
+            print('Profile written to %s' % (options['D'], ))
+        last_stats.sort_stats(options['s'])
+        page(format_stats(last_stats, 'print_stats', options['l']))
+
+
+def prun_callers(line):
+    """Show who called, and what was called by, the functions of the last
+    %prun matching the argument: a function of the REPL's namespace, or a
+    regular expression"""
+    if last_stats is None:
+        print('Nothing profiled yet, use %prun first.')
+        return
+    restriction = line.strip()
+    obj = bpython.running.interpreter.get_raw_object(restriction)
+    code = getattr(obj, '__code__', getattr(obj, 'func_code', None))
+    if code is not None:
+        restriction = '%s:%d\\(%s\\)' % (code.co_filename, code.co_firstlineno,
+                                        code.co_name)
+    args = (restriction, ) if restriction else ()
+    page(format_stats(last_stats, 'print_callers', *args) +
+         format_stats(last_stats, 'print_callees', *args))
+
+
+class LineProfiler(object):
+    """Time the lines of one code object with a trace function, which only
+    traces the frames running that code."""
+
+    def __init__(self, code):
+        self.code = code
+        self.hits = defaultdict(int)
+        self.times = defaultdict(float)
+        # Maps frames to the line they run and when it started
+        self.current = dict()
+        self.timer = timeit.default_timer
+
+    def trace(self, frame, event, arg):
+        if frame.f_code is self.code:
+            return self.trace_lines
+        return None
+
+    def trace_lines(self, frame, event, arg):
+        now = self.timer()
+        if event == 'line' or event == 'return':
+            current = self.current.pop(frame, None)
+            if current is not None:
+                self.times[current[0]] += now - current[1]
+        if event == 'line':
+            self.hits[frame.f_lineno] += 1
+            self.current[frame] = (frame.f_lineno, self.timer())
+        return self.trace_lines
+
+    def run(self, code, namespace):
+        previous = sys.gettrace()
+        sys.settrace(self.trace)
+        try:
+            exec(code, namespace, namespace)
+        finally:
+            sys.settrace(previous)
+
+    def format(self, lines, first_lineno):
+        total = sum(self.times.values())
+        out = ['Total time: %g s' % (total, ),
+               'File: %s' % (self.code.co_filename, ),
+               'Function: %s at line %d' % (self.code.co_name, first_lineno),
+               '',
+               '%6s %9s %12s %9s %7s  %s' % ('Line #', 'Hits', 'Time (us)',
+                                             'Per Hit', '% Time',
+                                             'Line Contents'),
+               '=' * 72]
+        for (lineno, line) in enumerate(lines, first_lineno):
+            line = line.rstrip('\n')
+            hits = self.hits.get(lineno)
+            if not hits:
+                out.append('%6d %9s %12s %9s %7s  %s' % (lineno, '', '', '',
+                                                         '', line))
+                continue
+            t = self.times[lineno] * 1e6
+            out.append('%6d %9d %12.1f %9.1f %7.1f  %s' % (
+                lineno, hits, t, t / hits,
+                100.0 * self.times[lineno] / total if total else 0.0, line))
+        return '\n'.join(out) + '\n'
+
+
+def lprun(line):
+    """Time the lines of a function while a statement runs: %lprun -f func
+    stmt"""
+    options, stmt = parse_options(line, dict(f=''))
+    if not options['f'] or not stmt:
+        print('Usage: %lprun -f function statement')
+        return
+    func = bpython.running.interpreter.get_raw_object(options['f'])
+    func = getattr(func, '__func__', func)
+    code = getattr(func, '__code__', getattr(func, 'func_code', None))
+    if code is None:
+        print('%s is not a Python function.' % (options['f'], ))
+        return
+    code_to_run = compile(stmt, '<input>', 'exec')
+
+    profiler = LineProfiler(code)
+    try:
+        profiler.run(code_to_run, bpython.running.interpreter.locals)
+    finally:
+        try:
+            lines, first_lineno = inspect.getsourcelines(func)
+        except (IOError, TypeError):
+            lines, first_lineno = [], code.co_firstlineno
+        page(profiler.format(lines, first_lineno))
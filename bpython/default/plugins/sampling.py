@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+#coding: utf-8
+
+import code
+import os
+import sys
+import threading
+import timeit
+from collections import defaultdict
+
+import bpython
+
+from plugins.helpers import parse_options
+
+
+__all__ = ['top', 'top_stop']
+
+
+# Samples taken per second
+RATE = 100.0
+
+# Seconds between updates of the live table
+REFRESH = 1.0
+
+# Number of functions shown
+LIMIT = 20
+
+# Frames of bpython and the code module running the REPL's input are left
+# out of the stacks
+HIDDEN_DIR = bpython.package_dir + os.sep
+HIDDEN_FILE = os.path.splitext(code.__file__)[0] + '.py'
+
+# Prefixes of the filenames of code run by bpython: the REPL's input and
+# background jobs
+INPUT_FILES = ('<input', '<job')
+
+# The running sampler
+sampler = None
+
+
+class Sampler(threading.Thread):
+    """Sample the stacks of all threads, but its own, RATE times a second
+    on a daemon thread, and count how often every stack was seen. Stacks are
+    tuples of code objects, from the outermost frame inwards, and only turned
+    into names when shown, so sampling stays cheap. Stacks run by bpython
+    start at the input it runs."""
+
+    def __init__(self, rate=RATE):
+        threading.Thread.__init__(self, name='bpython-sampler')
+        self.daemon = True
+        self.interval = 1.0 / rate
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        # Maps (thread name, stack) to the number of samples
+        self.counts = defaultdict(int)
+        self.samples = 0
+        self.hidden = dict()
+        self.started = timeit.default_timer()
+        self.busy = 0.0
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            start = timeit.default_timer()
+            self.sample()
+            self.busy += timeit.default_timer() - start
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+    def is_hidden(self, code):
+        hidden = self.hidden.get(code)
+        if hidden is None:
+            hidden = self.hidden[code] = (
+                code.co_filename.startswith(HIDDEN_DIR) or
+                code.co_filename == HIDDEN_FILE)
+        return hidden
+
+    def sample(self):
+        own = threading.current_thread().ident
+        names = dict((thread.ident, thread.name)
+                     for thread in threading.enumerate())
+        stacks = []
+        for (ident, frame) in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = []
+            while frame is not None and not self.is_hidden(frame.f_code):
+                stack.append(frame.f_code)
+                frame = frame.f_back
+            # Below bpython's frames, only the input it runs is of interest,
+            # not bpython itself waiting for keys or completing
+            if frame is not None and not (
+                    stack and stack[-1].co_filename.startswith(INPUT_FILES)):
+                continue
+            stack.reverse()
+            stacks.append((names.get(ident, str(ident)), tuple(stack)))
+        with self.lock:
+            for key in stacks:
+                self.counts[key] += 1
+            self.samples += 1
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.counts), self.samples
+
+    def overhead(self):
+        elapsed = timeit.default_timer() - self.started
+        return self.busy / elapsed if elapsed else 0.0
+
+
+def function_name(code):
+    return '%s (%s:%d)' % (code.co_name, os.path.basename(code.co_filename),
+                           code.co_firstlineno)
+
+
+def hot_functions(counts):
+    """Return the number of stacks sampled, and (self, total, code) for
+    every function seen, hottest first. Self counts the samples a function
+    was running in, total also those of the functions it called."""
+    own = defaultdict(int)
+    total = defaultdict(int)
+    stacks = 0
+    for ((_, stack), count) in counts.items():
+        stacks += count
+        own[stack[-1]] += count
+        # Recursive functions are counted once per stack
+        for code in set(stack):
+            total[code] += count
+    functions = sorted(((own[code], total[code], code) for code in total),
+                       key=lambda row: (row[0], row[1]), reverse=True)
+    return stacks, functions
+
+
+def format_table(limit, width):
+    counts, samples = sampler.snapshot()
+    stacks, functions = hot_functions(counts)
+    lines = ['%d samples at %g Hz, %d stacks, %d threads, overhead %.1f%%' % (
+        samples, 1.0 / sampler.interval, stacks,
+        len(set(name for (name, _) in counts)), sampler.overhead() * 100), '',
+        '%7s %7s  %s' % ('Self', 'Total', 'Function')]
+    for (own, total, code) in functions[:limit]:
+        lines.append('%6.1f%% %6.1f%%  %s' % (
+            100.0 * own / stacks, 100.0 * total / stacks, function_name(code)))
+    if not functions:
+        lines.append('No code running outside the REPL yet.')
+    return [line[:width - 1] for line in lines]
+
+
+def format_folded(counts):
+    """Format the stacks the way flamegraph.pl and speedscope read them:
+    one line per stack, with the frames separated by semicolons, followed
+    by the number of samples."""
+    lines = []
+    for ((name, stack), count) in counts.items():
+        frames = [name] + [function_name(code) for code in stack]
+        lines.append('%s %d' % (';'.join(frames), count))
+    return '\n'.join(sorted(lines)) + '\n'
+
+
+def show_live(limit, refresh):
+    """Show the hot functions on the whole screen, updating them every
+    `refresh` seconds until a key is pressed."""
+    app = bpython.running
+    h, w = app.gethw()
+    win = app.newwin(h - 1, w, 0, 0)
+    win.timeout(int(refresh * 1000))
+    try:
+        while True:
+            win.erase()
+            # Three lines of header and two of footer leave h - 6 rows of
+            # the window for functions
+            lines = format_table(max(min(limit, h - 6), 0), w)
+            lines.extend(['', 'Press any key to return.'])
+            for (y, line) in enumerate(lines[:h - 1]):
+                win.addstr(y, 0, line[:w - 1])
+            win.refresh()
+            if win.getch() != -1:
+                break
+    finally:
+        del win
+        app.clirepl.scr.touchwin()
+        app.clirepl.scr.refresh()
+
+
+def top(line):
+    """Sample what all threads are doing and show the hottest functions:
+    %top [-r samples per second] [-l limit] [-i refresh interval]
+    [-f file for the folded stacks]"""
+    global sampler
+
+    defaults = dict(r=RATE, l=LIMIT, i=REFRESH, f='')
+    options, _ = parse_options(line + ' ', defaults)
+    if options['r'] <= 0 or options['i'] <= 0:
+        print('The rate and the refresh interval have to be above 0.')
+        return
+    if sampler is None:
+        # Showing and writing samples has to wait for samples
+        if any(options[name] != defaults[name] for name in 'lif'):
+            print('Nothing sampled yet, start sampling with %top [-r '
+                  'samples per second] before using -l, -i or -f.')
+            return
+        sampler = Sampler(options['r'])
+        sampler.start()
+        print('Sampling at %g Hz, use %%top to see the hot functions and '
+              '%%top-stop to stop.' % (options['r'], ))
+        return
+    if options['f']:
+        with open(options['f'], 'w') as f:
+            f.write(format_folded(sampler.snapshot()[0]))
+        print('Folded stacks written to %s.' % (options['f'], ))
+        return
+    show_live(options['l'], options['i'])
+
+
+def top_stop():
+    global sampler
+
+    if sampler is not None:
+        sampler.stop()
+        sampler = None
@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+#coding: utf-8
+
+import gc
+import itertools
+import timeit as _timeit
+from collections import OrderedDict
+
+import bpython
+
+from plugins.helpers import parse_options
+
+
+__all__ = ['timeit', 'show_timings']
+
+
+# Number of times the loop is timed
+REPEAT = 7
+
+# Seconds a timed loop should take at least
+MIN_TIME = 0.2
+
+# Runs this many (scaled) median absolute deviations slower than the median
+# are outliers
+OUTLIER_THRESHOLD = 3.5
+
+TEMPLATE = """
+def inner(_it, _timer):
+    _t0 = _timer()
+    for _i in _it:
+%s
+    _t1 = _timer()
+    return _t1 - _t0
+"""
+
+# Maps statements to the results of all their timings
+results = OrderedDict()
+
+
+class Timing(object):
+    def __init__(self, number, times):
+        self.number = number
+        # Seconds per loop of every run
+        self.times = [t / number for t in times]
+        self.min = min(self.times)
+        self.median = median(self.times)
+        self.stdev = stdev(self.times)
+        self.outliers = outliers(self.times)
+
+    def __str__(self):
+        s = '%d loop%s, %d runs: min %s, median %s, stdev %s per loop' % (
+            self.number, 's' if self.number != 1 else '', len(self.times),
+            format_time(self.min), format_time(self.median),
+            format_time(self.stdev))
+        if self.outliers:
+            s += '\noutliers: ' + ', '.join(
+                'run %d (%s)' % (i + 1, format_time(self.times[i]))
+                for i in self.outliers)
+        return s
+
+
+def median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2.0
+
+
+def stdev(values):
+    if len(values) < 2:
+        return 0.0
+    mean = sum(values) / len(values)
+    return (sum((v - mean) ** 2 for v in values) / (len(values) - 1)) ** 0.5
+
+
+def outliers(values):
+    """Return the indices of the values far above the others, using the
+    median absolute deviation, which the outliers themselves hardly
+    change."""
+    m = median(values)
+    mad = 1.4826 * median([abs(v - m) for v in values])
+    if not mad:
+        return []
+    return [i for (i, v) in enumerate(values)
+            if (v - m) / mad > OUTLIER_THRESHOLD]
+
+
+def format_time(seconds):
+    for (unit, scale) in [('sec', 1.0), ('msec', 1e-3), ('usec', 1e-6)]:
+        if seconds >= scale:
+            break
+    else:
+        (unit, scale) = ('nsec', 1e-9)
+    return '%.3g %s' % (seconds / scale, unit)
+
+
+def compile_timer(stmt, namespace):
+    """Compile stmt once into a function timing a loop over it, with the
+    REPL's namespace as globals."""
+    # Report syntax errors in stmt itself
+    compile(stmt, '<timeit>', 'exec')
+    body = '\n'.join(' ' * 8 + line for line in stmt.splitlines())
+    code = compile(TEMPLATE % (body, ), '<timeit>', 'exec')
+    local_ns = dict()
+    exec(code, namespace, local_ns)
+    return local_ns['inner']
+
+
+def time_loop(inner, number):
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return inner(itertools.repeat(None, number), _timeit.default_timer)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def calibrate(inner):
+    """Return the number of loops that take at least MIN_TIME, and the
+    time they took."""
+    for i in itertools.count():
+        for factor in (1, 2, 5):
+            number = factor * 10 ** i
+            t = time_loop(inner, number)
+            if t >= MIN_TIME:
+                return number, t
+
+
+def timeit(line):
+    """Time a statement in the REPL's namespace: %timeit [-n N] [-r R]
+    stmt"""
+    options, stmt = parse_options(line, dict(n=0, r=REPEAT))
+    number, repeat = options['n'], max(options['r'], 1)
+    if not stmt:
+        print('Usage: %timeit [-n loops] [-r runs] statement')
+        return
+    inner = compile_timer(stmt, bpython.running.interpreter.locals)
+    if number:
+        times = []
+    else:
+        number, t = calibrate(inner)
+        times = [t]
+    while len(times) < repeat:
+        times.append(time_loop(inner, number))
+
+    timing = Timing(number, times)
+    previous = results.setdefault(stmt, [])
+    print(timing)
+    if previous:
+        change = (timing.median - previous[-1].median) / previous[-1].median
+        print('previous run: median %s (%+.1f%%)' % (
+            format_time(previous[-1].median), change * 100))
+    previous.append(timing)
+
+
+def show_timings():
+    """Show the medians of all the timings of this session."""
+    for (stmt, timings) in results.items():
+        print('%s\n    %s' % (stmt, ', '.join(format_time(timing.median)
+                                               for timing in timings)))
@@ -2,6 +2,9 @@
 #coding: utf-8
 
 import bpython
+# The plugins' directory only is on sys.path while this file runs, the
+# package's __path__ finds its modules afterwards
+import plugins
 
 
 def register_keys():
@@ -25,17 +28,46 @@ def register_keys():
         return ''
 
 
+def plugin(module, name):
+    """Return a command importing plugins.<module> only when it is first run,
+    so that the plugins and all they import don't slow the startup down."""
+    def command(*args):
+        import importlib
+        function = getattr(importlib.import_module('plugins.' + module), name)
+        return function(*args)
+    command.__name__ = name
+    return command
+
+
 def register_command():
-    from plugins.editing import (edit_object, edit_output, edit_output_history)
-    from plugins.introspection import (show_source, page, show_input, show_output)
+    register = bpython.running.register_command
 
-    bpython.running.register_command('%edit-object', edit_object)
-    # bpython.running.register_command('%edit-output', edit_output)
-    # bpython.running.register_command('%edit-output-history', edit_output_history)
-    bpython.running.register_command('%show-source', show_source)
-    bpython.running.register_command('%show-input', show_input)
-    bpython.running.register_command('%show-output', show_output)
-    bpython.running.register_command('%page', page)
+    register('%edit-object', plugin('editing', 'edit_object'))
+    # register('%edit-output', plugin('editing', 'edit_output'))
+    # register('%edit-output-history', plugin('editing', 'edit_output_history'))
+    register('%show-source', plugin('introspection', 'show_source'))
+    register('%show-input', plugin('introspection', 'show_input'))
+    register('%show-output', plugin('introspection', 'show_output'))
+    register('%page', plugin('introspection', 'page'))
+    register('%latency', plugin('latency', 'show_latency'))
+    register('%latency-reset', plugin('latency', 'reset_latency'))
+    register('%timeit', plugin('timing', 'timeit'), raw=True)
+    register('%timeit-history', plugin('timing', 'show_timings'))
+    register('%prun', plugin('profiling', 'prun'), raw=True)
+    register('%prun-callers', plugin('profiling', 'prun_callers'), raw=True)
+    register('%lprun', plugin('profiling', 'lprun'), raw=True)
+    register('%memit', plugin('memory', 'memit'), raw=True)
+    register('%heap', plugin('memory', 'heap'), raw=True)
+    register('%heap-stop', plugin('memory', 'heap_stop'))
+    register('%who', plugin('namespace', 'who'), raw=True)
+    register('%whos', plugin('namespace', 'whos'), raw=True)
+    register('%top', plugin('sampling', 'top'), raw=True)
+    register('%top-stop', plugin('sampling', 'top_stop'))
+    register('%bg', plugin('jobs', 'bg'), raw=True)
+    register('%jobs', plugin('jobs', 'jobs'))
+    register('%wait', plugin('jobs', 'wait'), raw=True)
+    register('%kill', plugin('jobs', 'kill'), raw=True)
+    register('%pmap', plugin('parallel', 'pmap'), raw=True)
 
     @bpython.running.register_command('p', without_completion=True)
     def p(s):
@@ -52,3 +84,4 @@ register_command()
 
 del register_keys
 del register_command
+del plugin
@@ -28,6 +28,8 @@ from pygments.formatter import Formatter
 from pygments.token import Keyword, Name, Comment, String, Error, \
      Number, Operator, Token, Whitespace, Literal, Punctuation
 
+from bpython.tokens import Command, Parenthesis
+
 """These format strings are pretty ugly.
 \x01 represents a colour marker, which
     can be proceded by one or two of
@@ -52,9 +54,6 @@ from pygments.token import Keyword, Name, Comment, String, Error, \
 
 """
 
-Parenthesis = Token.Punctuation.Parenthesis
-Command = Token.Command
-
 theme_map = {
     Command: 'command',
     Keyword: 'keyword',
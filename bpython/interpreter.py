@@ -28,15 +28,15 @@ import os
 import code
 import inspect
 import traceback
-import pydoc
 import keyword
+import linecache
 
-from pygments.token import Token
+from bpython import latency
 from bpython.completion import inspection
 from bpython.completion.completers import import_completer
 from bpython.util import getpreferredencoding, safe_eval, TimeOutException, debug, isolate
 from bpython.str_util import get_closure_words
-from bpython._py3compat import PythonLexer, PY3
+from bpython._py3compat import PY3
 from six import callable
 
 
@@ -60,23 +60,43 @@ class BPythonInterpreter(code.InteractiveInterpreter):
         traceback."""
 
         self.command_table = {}
+        # Commands that get the rest of the line as a string
+        self.raw_commands = set()
         self.encoding = encoding or sys.getdefaultencoding()
         self.syntaxerror_callback = None
+        # Number of inputs run so far
+        self.inputs = 0
         # Unfortunately code.InteractiveInterpreter is a classic class, so no super()
         code.InteractiveInterpreter.__init__(self, locals)
 
         self.locals['__command_table'] = self.command_table
 
-    if not PY3:
-
-        def runsource(self, source, filename='<input>', symbol='single',
-                      encode=True):
-            if encode:
-                source = '# coding: %s\n%s' % (self.encoding,
-                                               source.encode(self.encoding))
+    def runsource(self, source, filename=None, symbol='single', encode=True):
+        """Compile and run source, see code.InteractiveInterpreter. Without
+        a filename, the input gets one of its own, under which its source is
+        kept in linecache, for tracebacks and inspect.getsource(). Sources
+        of real files are left for linecache to read."""
+        if not PY3 and encode:
+            source = '# coding: %s\n%s' % (self.encoding,
+                                           source.encode(self.encoding))
+        if filename is not None:
             return code.InteractiveInterpreter.runsource(self, source,
                                                          filename, symbol)
 
+        filename = '<input-%d>' % (self.inputs + 1, )
+        lines = source.splitlines(True)
+        if lines and not lines[-1].endswith('\n'):
+            lines[-1] += '\n'
+        # An mtime of None keeps linecache.checkcache() from dropping it
+        linecache.cache[filename] = (len(source), None, lines, filename)
+        more = code.InteractiveInterpreter.runsource(self, source, filename,
+                                                     symbol)
+        if more:
+            del linecache.cache[filename]
+        else:
+            self.inputs += 1
+        return more
+
     def showsyntaxerror(self, filename=None):
         """Override the regular handler, the code's copied and pasted from
         code.py, as per showtraceback, but with the syntaxerror callback called
@@ -117,7 +137,7 @@ class BPythonInterpreter(code.InteractiveInterpreter):
             # Set the right lineno (encoding header adds an extra line)
             if not PY3:
                 for i, (filename, lineno, module, something) in enumerate(tblist):
-                    if filename == '<input>':
+                    if filename.startswith('<input'):
                         tblist[i] = (filename, lineno - 1, module, something)
 
             l = traceback.format_list(tblist)
@@ -135,14 +155,25 @@ class BPythonInterpreter(code.InteractiveInterpreter):
         for line in lines:
             self.write(line)
 
-    def register_command(self, name, function):
+    def register_command(self, name, function, raw=False):
         if name not in self.command_table:
             self.command_table[name] = function
+            if raw:
+                self.raw_commands.add(name)
             return True
         else:
             return False
 
+    def split_raw_command(self, line):
+        """Return the name of the command and the rest of the line if line
+        runs a raw command, else None."""
+        command_name, _, rest = line.strip(' ').partition(' ')
+        if command_name in self.raw_commands:
+            return command_name, rest.strip(' ')
+
     def is_commandline(self, line):
+        if self.split_raw_command(line):
+            return True
         try:
             if not PY3 and isinstance(line, unicode):
                 encoding = getpreferredencoding()
@@ -159,6 +190,10 @@ class BPythonInterpreter(code.InteractiveInterpreter):
                 return False
 
     def get_command_spec(self, line):
+        raw_command = self.split_raw_command(line)
+        if raw_command:
+            command_name = raw_command[0]
+            return [command_name, self.command_table[command_name]]
         try:
             if not PY3 and isinstance(line, unicode):
                 encoding = getpreferredencoding()
@@ -174,6 +209,20 @@ class BPythonInterpreter(code.InteractiveInterpreter):
                     return [command_name, self.command_table[command_name]]
 
     def runcommand(self, line):
+        raw_command = self.split_raw_command(line)
+        if raw_command:
+            (command_name, rest) = raw_command
+            try:
+                result = self.command_table[command_name](rest)
+            except SystemExit:
+                raise
+            except:
+                self.showtraceback()
+            else:
+                # Shown and bound to _, as if the call had been the input
+                if result is not None:
+                    sys.displayhook(result)
+            return
         try:
             if not PY3 and isinstance(line, unicode):
                 encoding = getpreferredencoding()
@@ -187,7 +236,7 @@ class BPythonInterpreter(code.InteractiveInterpreter):
                 command_name = words[0]
                 if command_name in self.command_table:
                     source = "__command_table['%s'](%s)" % (command_name, ','.join(words[1:]))
-                    self.runsource(source)
+                    self.runsource(source, '<command>')
 
     def get_object(self, name):
         try:
@@ -248,24 +297,11 @@ class BPythonInterpreter(code.InteractiveInterpreter):
                 spec.docstring = None
             else:
                 if isinstance(spec, inspection.ImpSpec) and isinstance(f, str):
-                    spec.docstring = None
-                    try:
-                        for token, value in PythonLexer().get_tokens(open(f).read()):
-                            if token == Token.Literal.String.Doc:
-                                spec.docstring = value.strip('"""').strip('r"""')
-                            elif token == Token.Keyword and value == "def":
-                                break
-                            elif token == Token.Keyword and value == "class":
-                                break
-                            else:
-                                pass
-                    except Exception:
-                        spec.docstring = None
-                    finally:
-                        spec[-1] = None
+                    spec.docstring = inspection.getmoduledoc(f)
+                    spec[-1] = None
                 else:
                     try:
-                        spec.docstring = pydoc.getdoc(f)
+                        spec.docstring = inspection.getdoc(f)
                     except IndexError:
                         spec.docstring = None
         return spec
@@ -312,13 +348,15 @@ class BPythonInterpreter(code.InteractiveInterpreter):
         else:
             self.runsource("import sys; sys.path.append('%s')" % default_dir, default_dir, 'exec', encode=False)
 
-        for filename in [startup, default_rc]:
+        for (filename, phase) in [(startup, 'PYTHONSTARTUP'),
+                                  (default_rc, 'default rc.py')]:
             if filename and os.path.isfile(filename):
                 with open(filename, 'r') as f:
                     if PY3:
                         self.runsource(f.read(), filename, 'exec')
                     else:
                         self.runsource(f.read(), filename, 'exec', encode=False)
+                latency.startup.lap(phase)
 
         if PY3:
             self.runsource("sys.path.pop(); sys.path.append('%s'); del sys" % config_dir, config_dir, 'exec')
@@ -333,5 +371,6 @@ class BPythonInterpreter(code.InteractiveInterpreter):
                         self.runsource(f.read(), filename, 'exec')
                     else:
                         self.runsource(f.read(), filename, 'exec', encode=False)
+                latency.startup.lap('user rc.py')
 
 
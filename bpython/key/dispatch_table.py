@@ -1,19 +1,19 @@
 #!/usr/bin/env python
 #coding: utf-8
 
-import curses
 import re
-import platform
-from bpython._py3compat import chr
+from bpython.key.keymap import load
 from bpython.repl import getpreferredencoding
-from six import b, binary_type, text_type
-from six.moves import filter, map, xrange
+from six import binary_type, text_type
 
 
 __all__ = ["dispatch_table", "CannotFindHandler"]
 
 
-BLANK = re.compile(b(' +'))
+BLANK = re.compile(' +')
+
+# The Editables having handlers of their own
+OWNERS = ('clirepl', 'statusbar')
 
 
 class CannotFindHandler(Exception):
@@ -24,184 +24,91 @@ class CannotFindHandler(Exception):
 
 
 class DispatchTable(object):
-    def __init__(self):
-        # self.keynames = []
-        self._keymap = {}
-        self._alias_keymap = {}
+    """Handlers of keys, for all Editables and for each kind of them.
+
+    Handlers are kept by keycode, and also compiled into one dict per owner
+    mapping the name curses gives a key to its handler, so that dispatching
+    a key is a single lookup."""
+
+    def __init__(self, keymap=None):
+        self.keymap = keymap if keymap is not None else load()
         self._dispatch_table = {}
-        self._repl_dispatch_table = {}
-        self._statusbar_dispatch_table = {}
-        self._populate()
+        self._owner_dispatch_tables = dict((owner, {}) for owner in OWNERS)
+        self._compiled = dict((owner, {}) for owner in OWNERS)
 
     def set_handler_on(self, ambiguous_keyname, function=None):
-        def inner(function):
-            if isinstance(ambiguous_keyname, list):
-                keynames = map(self._get_precise_keyname, filter(bool, ambiguous_keyname))
-                for keyname in keynames:
-                    self._dispatch_table[keyname] = function
-            elif isinstance(ambiguous_keyname, binary_type):
-                keynames = map(self._get_precise_keyname, filter(bool, BLANK.split(ambiguous_keyname)))
-                for keyname in keynames:
-                    self._dispatch_table[keyname] = function
-            elif isinstance(ambiguous_keyname, text_type):
-                keynames = map(self._get_precise_keyname, filter(bool, BLANK.split(b(ambiguous_keyname))))
-                for keyname in keynames:
-                    self._dispatch_table[keyname] = function
-            else:
-                raise(Exception("bad argument error"))
-        if function is None:
-            return inner
-        else:
-            inner(function)
+        return self._set_handler(None, ambiguous_keyname, function)
 
     def set_handler_on_clirepl(self, ambiguous_keyname, function=None):
-        def inner(function):
-            if isinstance(ambiguous_keyname, list):
-                keynames = map(self._get_precise_keyname, filter(bool, ambiguous_keyname))
-                for keyname in keynames:
-                    self._repl_dispatch_table[keyname] = function
-            elif isinstance(ambiguous_keyname, binary_type):
-                keynames = map(self._get_precise_keyname, filter(bool, BLANK.split(ambiguous_keyname)))
-                for keyname in keynames:
-                    self._repl_dispatch_table[keyname] = function
-            elif isinstance(ambiguous_keyname, text_type):
-                keynames = map(self._get_precise_keyname, filter(bool, BLANK.split(b(ambiguous_keyname))))
-                for keyname in keynames:
-                    self._repl_dispatch_table[keyname] = function
-            else:
-                raise(Exception("bad argument error"))
-        if function is None:
-            return inner
-        else:
-            inner(function)
+        return self._set_handler('clirepl', ambiguous_keyname, function)
 
     def set_handler_on_statusbar(self, ambiguous_keyname, function=None):
+        return self._set_handler('statusbar', ambiguous_keyname, function)
+
+    def _set_handler(self, owner, ambiguous_keyname, function):
         def inner(function):
-            if isinstance(ambiguous_keyname, list):
-                keynames = map(self._get_precise_keyname, filter(bool, ambiguous_keyname))
-                for keyname in keynames:
-                    self._statusbar_dispatch_table[keyname] = function
-            elif isinstance(ambiguous_keyname, binary_type):
-                keynames = map(self._get_precise_keyname, filter(bool, BLANK.split(ambiguous_keyname)))
-                for keyname in keynames:
-                    self._statusbar_dispatch_table[keyname] = function
-            elif isinstance(ambiguous_keyname, text_type):
-                keynames = map(self._get_precise_keyname, filter(bool, BLANK.split(b(ambiguous_keyname))))
-                for keyname in keynames:
-                    self._statusbar_dispatch_table[keyname] = function
-            else:
-                raise(Exception("bad argument error"))
+            for code in map(self.keymap.code, self._split(ambiguous_keyname)):
+                if owner is None:
+                    self._dispatch_table[code] = function
+                    # Handlers of an owner's own come first
+                    owners = [o for o in OWNERS
+                              if code not in self._owner_dispatch_tables[o]]
+                else:
+                    self._owner_dispatch_tables[owner][code] = function
+                    owners = [owner]
+                for o in owners:
+                    self._compiled[o][self.keymap.names[code]] = function
         if function is None:
             return inner
         else:
             inner(function)
 
+    def get_handlers_on(self, owner):
+        """Return the dict mapping keys, as the CLI gets them, to the
+        handlers of owner. It is kept up to date as handlers are set."""
+        return self._compiled[owner]
+
     def get_handler_on_clirepl(self, ambiguous_keyname):
-        keyname = self._get_precise_keyname(ambiguous_keyname)
-        if keyname in self._repl_dispatch_table:
-            return self._repl_dispatch_table[keyname]
-        elif keyname in self._dispatch_table:
-            return self._dispatch_table[keyname]
-        else:
-            raise(CannotFindHandler(ambiguous_keyname))
+        return self._get_handler('clirepl', ambiguous_keyname)
 
     def get_handler_on_statusbar(self, ambiguous_keyname):
-        keyname = self._get_precise_keyname(ambiguous_keyname)
-        if keyname in self._statusbar_dispatch_table:
-            return self._statusbar_dispatch_table[keyname]
-        elif keyname in self._dispatch_table:
-            return self._dispatch_table[keyname]
+        return self._get_handler('statusbar', ambiguous_keyname)
+
+    def _get_handler(self, owner, ambiguous_keyname):
+        code = self._get_code(ambiguous_keyname)
+        if code in self._owner_dispatch_tables[owner]:
+            return self._owner_dispatch_tables[owner][code]
+        elif code in self._dispatch_table:
+            return self._dispatch_table[code]
         else:
             raise(CannotFindHandler(ambiguous_keyname))
 
     def smart_match(self, ambiguous_keyname, str_or_list):
+        code = self._get_code(ambiguous_keyname)
         if isinstance(str_or_list, list):
-            keyname = self._get_precise_keyname(ambiguous_keyname)
-            matches = map(self._get_precise_keyname, str_or_list)
-            return keyname in matches
+            return code in map(self._get_code, str_or_list)
         else:
-            keyname = self._get_precise_keyname(ambiguous_keyname)
-            matches = self._get_precise_keyname(str_or_list)
-            return keyname == matches
-
-    def _get_precise_keyname(self, ambiguous_keyname):
-        if isinstance(ambiguous_keyname, text_type):
-            ambiguous_keyname = ambiguous_keyname.encode(getpreferredencoding())
-        if ambiguous_keyname in self._keymap:
-            return ambiguous_keyname
-        elif ambiguous_keyname in self._alias_keymap:
-            keyname = self._alias_keymap[ambiguous_keyname]
-            return self._get_precise_keyname(keyname)
+            return code == self._get_code(str_or_list)
+
+    def _get_code(self, ambiguous_keyname):
+        """Return the keycode of a name, or the name itself if it has
+        none."""
+        keyname = self._text(ambiguous_keyname)
+        return self.keymap.codes.get(keyname, keyname)
+
+    def _split(self, ambiguous_keyname):
+        if isinstance(ambiguous_keyname, list):
+            keynames = ambiguous_keyname
+        elif isinstance(ambiguous_keyname, (binary_type, text_type)):
+            keynames = BLANK.split(self._text(ambiguous_keyname))
         else:
-            #TODO need some warning for debugging
-            return ambiguous_keyname
-
-    def _populate(self):
-        #if curses already initialized, do nothing.
-        try:
-            curses.keyname(1)
-        except curses.error:
-            curses.initscr()
-
-        for i in xrange(curses.KEY_MAX):
-            if i < (curses.KEY_MIN - 1):
-                keyname = chr(i)
-                self._keymap[keyname] = i
-
-                long_keyname = curses.keyname(i)
-                self._alias_keymap[long_keyname] = keyname
-
-                if long_keyname.startswith(b("M-")):
-                    self._alias_keymap[long_keyname.replace(b("M-"), b("m-"), 1)] = keyname
-                    if long_keyname.startswith(b("M-^")):
-                        self._alias_keymap[long_keyname.replace(b("M-^"), b("M-C-"), 1)] = keyname
-                        self._alias_keymap[long_keyname.replace(b("M-^"), b("m-c-"), 1)] = keyname
-                        self._alias_keymap[long_keyname.replace(b("M-^"), b("m-c-"), 1).lower()] = keyname
-                elif long_keyname.startswith(b("^")):
-                    self._alias_keymap[long_keyname.replace(b("^"), b("C-"), 1)] = keyname
-                    self._alias_keymap[long_keyname.lower().replace(b("^"), b("C-"), 1)] = keyname
-                    self._alias_keymap[long_keyname.replace(b("^"), b("c-"), 1)] = keyname
-                    self._alias_keymap[long_keyname.lower().replace(b("^"), b("c-"), 1)] = keyname
-
-            else:
-                keyname = curses.keyname(i)
-                if keyname:
-                    self._keymap[keyname] = i
-
-            # self.keynames.append(keyname)
-
-        for k in self._keymap:
-            if k.startswith(b("KEY_F(")):
-                self._alias_keymap[k.lower()] = k
-                self._alias_keymap[k.replace(b("KEY_F("), b("F"), 1)[:-1]] = k
-                self._alias_keymap[k.replace(b("KEY_F("), b("f"), 1)[:-1]] = k
-            elif k.startswith(b("KEY_")):
-                self._alias_keymap[k.lower()] = k
-                self._alias_keymap[k.replace(b("KEY_"), b(""), 1)] = k
-                self._alias_keymap[k.replace(b("KEY_"), b(""), 1).lower()] = k
-
-        for i in xrange(12):
-            self._alias_keymap[b('S-F%s' % (i + 1))] = b('KEY_F(%s)' % (i + 13))
-            self._alias_keymap[b('s-f%s' % (i + 1))] = b('KEY_F(%s)' % (i + 13))
-
-        if platform.system() == 'Windows':
-            self._alias_keymap[b('C_BACK')] = chr(127)
-            self._alias_keymap[b('M-C_BACK')] = self._alias_keymap[b('M-') + curses.keyname(127)]
-            self._alias_keymap[b('M-C_BACK')] = self._alias_keymap[b('m-') + curses.keyname(127)]
-            self._alias_keymap[b('BACKSP')] = chr(8)
-            self._alias_keymap[b('M-BACKSP')] = self._alias_keymap[b('M-') + curses.keyname(8)]
-            self._alias_keymap[b('M-BACKSP')] = self._alias_keymap[b('m-') + curses.keyname(8)]
-        else:
-            self._alias_keymap[b('C_BACK')] = chr(8)
-            self._alias_keymap[b('M-C_BACK')] = self._alias_keymap[b('M-') + curses.keyname(8)]
-            self._alias_keymap[b('M-C_BACK')] = self._alias_keymap[b('m-') + curses.keyname(8)]
-            self._alias_keymap[b('BACKSP')] = chr(127)
-            self._alias_keymap[b('M-BACKSP')] = self._alias_keymap[b('M-') + curses.keyname(127)]
-            self._alias_keymap[b('M-BACKSP')] = self._alias_keymap[b('m-') + curses.keyname(127)]
-
-        self._alias_keymap[b('ESC')] = chr(27)
-        self._alias_keymap[b('M-ESC')] = self._alias_keymap[b('M-') + curses.keyname(27)]
-        self._alias_keymap[b('m-ESC')] = self._alias_keymap[b('M-') + curses.keyname(27)]
+            raise(Exception("bad argument error"))
+        return [self._text(keyname) for keyname in keynames if keyname]
+
+    def _text(self, keyname):
+        if isinstance(keyname, binary_type):
+            return keyname.decode(getpreferredencoding())
+        return keyname
 
 
 dispatch_table = DispatchTable()
@@ -1,12 +1,10 @@
 #!/usr/bin/env python
 #coding: utf-8
 
-from bpython.key.dispatch_table import (dispatch_table, CannotFindHandler)
+from bpython.key.dispatch_table import dispatch_table
+from bpython import latency
 
 import unicodedata
-import curses
-
-from six import u
 
 
 class Dispatcher(object):
@@ -17,29 +15,27 @@ class Dispatcher(object):
         self.yank_index = -2
         self.previous_key = ''
 
-        attr = "get_handler_on_%s" % owner.__class__.__name__.lower()
-        self.get_handler = getattr(dispatch_table, attr)
+        self.keymap = dispatch_table.keymap
+        self.handlers = dispatch_table.get_handlers_on(
+            owner.__class__.__name__.lower())
 
+    @latency.keystroke
     def run(self, key):
         if self.meta:
-            try:
-                key = u("M-") + u(curses.keyname(ord(key)))
-            except TypeError:
-                key = u("M-") + key
+            key = self.keymap.meta(key)
             self.meta = False
 
         if self.raw:
             result = self.do_self_insert(key)
             self.raw = False
         else:
-            try:
-                handler = self.get_handler(key)
+            handler = self.handlers.get(key)
+            if handler is not None:
                 result = handler(self)
-            except CannotFindHandler:
-                if len(key) == 1 and not unicodedata.category(key) == 'Cc':
-                    result = self.do_self_insert(key)
-                else:
-                    result = ''
+            elif len(key) == 1 and not unicodedata.category(key) == 'Cc':
+                result = self.do_self_insert(key)
+            else:
+                result = ''
 
         if not self.meta:
             self.previous_key = key
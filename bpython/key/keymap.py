@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+#coding: utf-8
+
+"""Compiled keymaps: every name a key goes by mapped to an integer keycode,
+so that looking a key up never has to follow aliases.
+
+Building a keymap asks curses for the names of all keys, which takes curses
+to be initialised and a few thousand calls, so keymaps are cached on disk,
+one file per terminal."""
+
+import curses
+import os
+import pickle
+import platform
+import re
+import sys
+import tempfile
+
+from bpython.config.struct import get_config_home
+from six import unichr
+from six.moves import xrange
+
+
+__all__ = ["Keymap", "load"]
+
+
+# Bump this whenever the names built by `build()` change
+CACHE_VERSION = 1
+
+# Curses and the platform a keymap was built with, whose names it holds
+CACHE_KEY = (CACHE_VERSION, tuple(getattr(curses, 'ncurses_version', ())),
+             platform.system())
+
+# Codes of keys with the meta bit set, for the keys below META
+META = 128
+
+
+class Keymap(object):
+    """Map the names of keys, and their aliases, to keycodes. Every keycode
+    has a canonical name, the one the CLI gets from curses for the key."""
+
+    def __init__(self, codes, names):
+        # Maps every name and alias to its keycode
+        self.codes = codes
+        # Maps keycodes to their canonical name
+        self.names = names
+        self.next_code = max(max(names), curses.KEY_MAX) + 1
+
+    def code(self, name):
+        """Return the keycode of name. Names curses doesn't know, like the
+        keys of other curses implementations, get new keycodes of their
+        own."""
+        code = self.codes.get(name)
+        if code is None:
+            code = self.codes[name] = self.next_code
+            self.names[code] = name
+            self.next_code += 1
+        return code
+
+    def meta(self, key):
+        """Return the name of key pressed with meta."""
+        code = self.codes.get(key)
+        if code is not None and code < META:
+            return self.names[code + META]
+        return "M-" + key
+
+
+def curses_keyname(code):
+    return curses.keyname(code).decode('ascii')
+
+
+def build(keyname=None):
+    """Build the keymap from the names curses gives the keys, and the
+    aliases bpython allows for them."""
+    if keyname is None:
+        # if curses already initialized, do nothing.
+        try:
+            curses.keyname(1)
+        except curses.error:
+            curses.initscr()
+        keyname = curses_keyname
+
+    names = {}
+    aliases = {}
+    for i in xrange(curses.KEY_MAX):
+        if i < (curses.KEY_MIN - 1):
+            long_keyname = keyname(i)
+            # The CLI gets characters as they are, but characters above
+            # ASCII are text and not keys pressed with meta
+            names[i] = unichr(i) if i < META else long_keyname
+            aliases[long_keyname] = i
+
+            if long_keyname.startswith("M-"):
+                aliases[long_keyname.replace("M-", "m-", 1)] = i
+                if long_keyname.startswith("M-^"):
+                    aliases[long_keyname.replace("M-^", "M-C-", 1)] = i
+                    aliases[long_keyname.replace("M-^", "m-c-", 1)] = i
+                    aliases[long_keyname.replace("M-^", "m-c-", 1).lower()] = i
+            elif long_keyname.startswith("^"):
+                aliases[long_keyname.replace("^", "C-", 1)] = i
+                aliases[long_keyname.lower().replace("^", "C-", 1)] = i
+                aliases[long_keyname.replace("^", "c-", 1)] = i
+                aliases[long_keyname.lower().replace("^", "c-", 1)] = i
+        else:
+            name = keyname(i)
+            if name:
+                names[i] = name
+
+    for (i, k) in names.items():
+        if k.startswith("KEY_F("):
+            aliases[k.lower()] = i
+            aliases[k.replace("KEY_F(", "F", 1)[:-1]] = i
+            aliases[k.replace("KEY_F(", "f", 1)[:-1]] = i
+        elif k.startswith("KEY_"):
+            aliases[k.lower()] = i
+            aliases[k.replace("KEY_", "", 1)] = i
+            aliases[k.replace("KEY_", "", 1).lower()] = i
+
+    for i in xrange(12):
+        if curses.KEY_F0 + i + 13 in names:
+            aliases['S-F%s' % (i + 1)] = curses.KEY_F0 + i + 13
+            aliases['s-f%s' % (i + 1)] = curses.KEY_F0 + i + 13
+
+    if platform.system() == 'Windows':
+        back, backsp = 127, 8
+    else:
+        back, backsp = 8, 127
+    for (name, i) in [('C_BACK', back), ('BACKSP', backsp), ('ESC', 27)]:
+        aliases[name] = i
+        aliases['M-' + name] = i + META
+    aliases['m-ESC'] = 27 + META
+
+    # Names of keys come before aliases looking the same
+    codes = aliases
+    codes.update((name, i) for (i, name) in names.items())
+    return Keymap(codes, names)
+
+
+def get_cache_path():
+    """Return the path of the keymap cache file for the terminal bpython
+    runs in."""
+    term = re.sub(r'[^\w.+-]', '_', os.environ.get('TERM', 'unknown'))
+    filename = 'keymap-%s-%d.cache' % (term, sys.version_info[0])
+    return os.path.join(os.path.expanduser(get_config_home()), filename)
+
+
+def load_cache(path=None):
+    """Load the keymap from disk. A missing, broken or outdated cache file
+    is not an error, it returns None."""
+    if path is None:
+        path = get_cache_path()
+    try:
+        with open(path, 'rb') as f:
+            key, codes, names = pickle.load(f)
+    except Exception:
+        return None
+    if key != CACHE_KEY:
+        return None
+    return Keymap(codes, names)
+
+
+def save_cache(keymap, path=None):
+    if path is None:
+        path = get_cache_path()
+    dirname = os.path.dirname(path)
+    try:
+        if not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        fd, tmp_path = tempfile.mkstemp(dir=dirname)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump((CACHE_KEY, keymap.codes, keymap.names), f,
+                            pickle.HIGHEST_PROTOCOL)
+            os.rename(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+    except EnvironmentError:
+        # Not being able to write the cache only costs time on the next
+        # start, so do not bother the user with it.
+        return
+
+
+def load(path=None):
+    """Return the keymap of the terminal, from the cache if there is one,
+    or built and cached."""
+    keymap = load_cache(path)
+    if keymap is None:
+        keymap = build()
+        save_cache(keymap, path)
+    return keymap
@@ -0,0 +1,345 @@
+#!/usr/bin/env python
+#coding: utf-8
+
+# The MIT License
+#
+# Copyright (c) 2009-2011 the bpython authors.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+"""Timing of the work done for every keystroke.
+
+Code is instrumented with the `timed()` decorator or the `span()` context
+manager. The durations of the last `HISTORY_SIZE` spans of every name are
+kept to compute percentiles, and the spans of the keystroke being handled
+are summed up to show where its time went. Spans can also be written to a
+file in Chrome's trace event format, to be viewed with chrome://tracing or
+Perfetto.
+
+Startup is timed too, phase by phase, from the import of the bpython package
+up to the first prompt, for --profile-startup."""
+
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque, OrderedDict
+
+import bpython
+from six.moves import builtins
+
+
+# Monotonic and precise where available
+clock = getattr(time, 'perf_counter', time.time)
+
+# Number of durations per span name percentiles are computed over
+HISTORY_SIZE = 1000
+
+# Name of the span covering the handling of a whole keystroke
+KEYSTROKE = 'key'
+
+# Number of the slowest imports shown in the startup profile
+STARTUP_IMPORTS = 10
+
+
+class Histogram(object):
+    """Rolling window of the last durations of a span."""
+
+    def __init__(self, size=HISTORY_SIZE):
+        self.samples = deque(maxlen=size)
+        self.count = 0
+
+    def add(self, duration):
+        self.samples.append(duration)
+        self.count += 1
+
+    def percentile(self, p):
+        if not self.samples:
+            return 0.0
+        samples = sorted(self.samples)
+        index = int(round(p / 100.0 * (len(samples) - 1)))
+        return samples[index]
+
+
+class Span(object):
+    __slots__ = ('recorder', 'name', 'start')
+
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self):
+        self.start = clock()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.recorder.add(self.name, clock() - self.start, self.start)
+
+
+class Keystroke(Span):
+    """The outermost span of a keystroke. Spans recorded while it is open
+    make up the breakdown of the keystroke."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        recorder = self.recorder
+        if not recorder.depth:
+            recorder.current = OrderedDict()
+        recorder.depth += 1
+        return Span.__enter__(self)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        recorder = self.recorder
+        duration = clock() - self.start
+        recorder.depth -= 1
+        if recorder.depth:
+            return
+        recorder.histogram(self.name).add(duration)
+        recorder.last = (duration, recorder.current)
+        recorder.current = None
+        recorder.keystrokes += 1
+        if recorder.tracer is not None:
+            recorder.tracer.add(self.name, self.start, duration)
+            recorder.tracer.flush()
+
+
+class Recorder(object):
+    def __init__(self):
+        self.histograms = OrderedDict()
+        # Nesting level of keystrokes, e.g. while prompting in the statusbar
+        self.depth = 0
+        # Maps span names to [total duration, count] for the current keystroke
+        self.current = None
+        # (duration, breakdown) of the last keystroke
+        self.last = None
+        self.keystrokes = 0
+        self.tracer = None
+
+    def span(self, name):
+        return Span(self, name)
+
+    def keystroke(self):
+        return Keystroke(self, KEYSTROKE)
+
+    def histogram(self, name):
+        try:
+            return self.histograms[name]
+        except KeyError:
+            histogram = self.histograms[name] = Histogram()
+            return histogram
+
+    def add(self, name, duration, start=None):
+        self.histogram(name).add(duration)
+        if self.tracer is not None and start is not None:
+            self.tracer.add(name, start, duration)
+        current = self.current
+        if current is not None:
+            try:
+                entry = current[name]
+            except KeyError:
+                current[name] = [duration, 1]
+            else:
+                entry[0] += duration
+                entry[1] += 1
+
+    def clear(self):
+        self.histograms.clear()
+        self.last = None
+
+    def trace(self, name, start, duration, **kwargs):
+        """Write an event to the trace only, e.g. for work done in another
+        process."""
+        if self.tracer is not None:
+            self.tracer.add(name, start, duration, **kwargs)
+
+    def start_trace(self, filename):
+        self.stop_trace()
+        self.tracer = TraceWriter(open(filename, 'w'))
+
+    def stop_trace(self):
+        if self.tracer is not None:
+            self.tracer.close()
+            self.tracer = None
+
+    def format_last(self):
+        """Return a one line breakdown of the last keystroke."""
+        if self.last is None:
+            return ''
+        duration, breakdown = self.last
+        parts = ['%s %.1fms' % (KEYSTROKE, duration * 1000)]
+        for (name, (total, count)) in breakdown.items():
+            if count > 1:
+                parts.append('%s %.1f/%d' % (name, total * 1000, count))
+            else:
+                parts.append('%s %.1f' % (name, total * 1000))
+        return ' '.join(parts)
+
+    def format_report(self):
+        """Return the percentiles of all spans as a table."""
+        lines = ['%-24s %8s %8s %8s %8s' % ('span (ms)', 'count', 'p50',
+                                             'p95', 'p99')]
+        for (name, histogram) in self.histograms.items():
+            lines.append('%-24s %8d %8.2f %8.2f %8.2f' % (
+                name, histogram.count, histogram.percentile(50) * 1000,
+                histogram.percentile(95) * 1000,
+                histogram.percentile(99) * 1000))
+        if self.last is not None:
+            lines.append('')
+            lines.append('last: ' + self.format_last())
+        return '\n'.join(lines)
+
+
+class TraceWriter(object):
+    """Write spans as complete ("X") events of Chrome's trace event format.
+    Events are written as they come, and a trace that is cut off still
+    loads, as the closing bracket of the array is optional."""
+
+    def __init__(self, f):
+        self.f = f
+        # Forked processes must not write into the parent's trace
+        self.pid = os.getpid()
+        self.first = True
+        self.f.write('[')
+        self.write(dict(name='process_name', ph='M', pid=self.pid,
+                        args=dict(name='bpython')))
+
+    def write(self, event):
+        if os.getpid() != self.pid:
+            return
+        if self.first:
+            self.first = False
+        else:
+            self.f.write(',\n')
+        self.f.write(json.dumps(event))
+
+    def add(self, name, start, duration, pid=None, tid=None, args=None):
+        event = dict(name=name, cat='bpython', ph='X', ts=start * 1e6,
+                     dur=duration * 1e6, pid=pid or self.pid,
+                     tid=tid or threading.current_thread().ident)
+        if args:
+            event['args'] = args
+        self.write(event)
+
+    def flush(self):
+        if os.getpid() == self.pid:
+            self.f.flush()
+
+    def close(self):
+        if os.getpid() == self.pid:
+            self.f.write(']\n')
+        self.f.close()
+
+
+class Startup(object):
+    """The phases of startup, each ended by a call of lap(), and when
+    profiling, the imports done during them. Imports of modules not loaded
+    yet are timed by wrapping __import__, and only the outermost ones count,
+    so that every import is charged with the ones it causes."""
+
+    def __init__(self):
+        self.phases = []
+        self.last = bpython.started
+        self.imports = None
+        self.depth = 0
+        self.original_import = None
+
+    def lap(self, name):
+        """End the phase called name, which began where the last one ended,
+        or with the import of bpython."""
+        now = clock()
+        self.phases.append((name, now - self.last))
+        recorder.add('startup: ' + name, now - self.last, self.last)
+        self.last = now
+
+    @property
+    def profiling(self):
+        return self.imports is not None
+
+    def start_profile(self):
+        self.imports = OrderedDict()
+        self.original_import = builtins.__import__
+        builtins.__import__ = self.timed_import
+
+    def stop_profile(self):
+        if self.original_import is not None:
+            builtins.__import__ = self.original_import
+            self.original_import = None
+
+    def timed_import(self, name, *args, **kwargs):
+        if name in sys.modules or self.depth:
+            self.depth += 1
+            try:
+                return self.original_import(name, *args, **kwargs)
+            finally:
+                self.depth -= 1
+        start = clock()
+        self.depth += 1
+        try:
+            return self.original_import(name, *args, **kwargs)
+        finally:
+            self.depth -= 1
+            self.imports[name] = self.imports.get(name, 0) + clock() - start
+
+    def format_report(self):
+        """Return the time of every phase, and the slowest imports since
+        profiling started."""
+        total = sum(duration for (_, duration) in self.phases)
+        lines = ['Startup took %.1f ms:' % (total * 1000, )]
+        for (name, duration) in self.phases:
+            lines.append('%8.1f ms  %s' % (duration * 1000, name))
+        if self.imports:
+            lines.append('Slowest imports after the arguments were parsed:')
+            slowest = sorted(self.imports.items(), key=lambda item: item[1],
+                             reverse=True)
+            for (name, duration) in slowest[:STARTUP_IMPORTS]:
+                lines.append('%8.1f ms  %s' % (duration * 1000, name))
+        return '\n'.join(lines)
+
+
+recorder = Recorder()
+startup = Startup()
+
+
+def span(name):
+    """Time a block of code as a span called name."""
+    return recorder.span(name)
+
+
+def timed(name):
+    """Decorator timing every call of the function as a span called name."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with recorder.span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def keystroke(func):
+    """Decorator marking a function as handling a whole keystroke."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with recorder.keystroke():
+            return func(*args, **kwargs)
+    return wrapper
@@ -27,14 +27,9 @@
 import curses
 import errno
 import os
-import pydoc
 import subprocess
 import sys
 
-import pygments
-from pygments.formatters import TerminalFormatter
-from pygments.lexers import PythonLexer
-
 from bpython._py3compat import PY3
 
 
@@ -48,6 +43,7 @@ def get_pager_command():
 
 def page_internal(data):
     """A more than dumb pager function."""
+    import pydoc
     if hasattr(pydoc, 'ttypager'):
         pydoc.ttypager(data)
     else:
@@ -57,6 +53,10 @@ def page_internal(data):
 def page(data, use_internal=False, use_hilight=False):
     command = get_pager_command()
     if use_hilight:
+        # pygments takes long to import, and is rarely needed here
+        import pygments
+        from pygments.formatters import TerminalFormatter
+        from pygments.lexers import PythonLexer
         data = pygments.format(
                 PythonLexer(encoding=sys.__stdout__.encoding).get_tokens(data),
                 TerminalFormatter(encoding=sys.__stdout__.encoding)
@@ -71,7 +71,11 @@ def page(data, use_internal=False, use_hilight=False):
         curses.endwin()
         try:
             popen = subprocess.Popen(command, stdin=subprocess.PIPE)
-            popen.stdin.write(data)
+            if PY3 and isinstance(data, str):
+                popen.stdin.write(data.encode(sys.__stdout__.encoding or
+                                              'utf-8', 'replace'))
+            else:
+                popen.stdin.write(data)
             popen.stdin.close()
         except OSError as e:
             if e.errno == errno.ENOENT:
@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+#coding: utf-8
+
+# The MIT License
+#
+# Copyright (c) 2009-2011 the bpython authors.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+"""Mapping functions defined at the prompt over iterables on other processes.
+
+Functions are pickled by reference, so the ones defined in the REPL, whose
+module is bpython's `__main__`, cannot be loaded by other processes. Here
+they are shipped as their marshalled code, along with the globals their
+code refers to, and rebuilt by the workers. Functions of other modules and
+all other values are pickled as usual.
+"""
+
+import marshal
+import multiprocessing
+import os
+import pickle
+import signal
+import sys
+import types
+from contextlib import contextmanager
+
+from six.moves import builtins
+
+
+# Chunks every worker gets when no chunk size is given
+CHUNKS_PER_PROCESS = 4
+
+# The function the worker maps, set by init_worker()
+worker_function = None
+
+
+def code_names(code):
+    """Return the names the code and the code nested in it refer to."""
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= code_names(const)
+    return names
+
+
+def is_interactive(value):
+    return (isinstance(value, types.FunctionType) and
+            value.__module__ == '__main__')
+
+
+def dump_value(value, namespace):
+    if isinstance(value, types.ModuleType):
+        return ('module', value.__name__)
+    if not is_interactive(value):
+        return ('value', value)
+    dump_globals(value, namespace)
+    closure = []
+    for cell in value.__closure__ or ():
+        try:
+            closure.append(dump_value(cell.cell_contents, namespace))
+        except ValueError:
+            # An empty cell, of a variable not assigned yet
+            closure.append(('empty', ))
+    return ('function', marshal.dumps(value.__code__), value.__name__,
+            value.__defaults__, tuple(closure),
+            getattr(value, '__kwdefaults__', None),
+            dump_attributes(value.__dict__, namespace),
+            dump_attributes(getattr(value, '__annotations__', {}), namespace))
+
+
+def is_picklable(entry):
+    if entry[0] != 'value':
+        return True
+    try:
+        pickle.dumps(entry[1], pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        return False
+    return True
+
+
+def dump_attributes(attributes, namespace):
+    """Dump the attributes or annotations of a function, leaving out those
+    that don't pickle, as running the function hardly ever needs them."""
+    dumped = dict()
+    for (name, value) in attributes.items():
+        entry = dump_value(value, namespace)
+        if is_picklable(entry):
+            dumped[name] = entry
+    return dumped
+
+
+def dump_globals(func, namespace):
+    for name in code_names(func.__code__):
+        if name in namespace or name not in func.__globals__:
+            continue
+        # Taken before dumping, for functions referring to each other
+        namespace[name] = None
+        entry = dump_value(func.__globals__[name], namespace)
+        if not is_picklable(entry):
+            # Attribute names are among the names of the code too, so this
+            # might not be needed at all; if it is, the function raises a
+            # NameError
+            del namespace[name]
+            continue
+        namespace[name] = entry
+
+
+def dump_function(func):
+    """Return a picklable description of func, from which load_function()
+    rebuilds it."""
+    namespace = dict()
+    return dump_value(func, namespace), namespace
+
+
+def make_cell(value):
+    return (lambda: value).__closure__[0]
+
+
+def load_value(entry, namespace):
+    kind = entry[0]
+    if kind == 'module':
+        __import__(entry[1])
+        return sys.modules[entry[1]]
+    if kind == 'function':
+        (_, code, name, defaults, closure, kwdefaults, attributes,
+         annotations) = entry
+        cells = tuple(make_cell(load_value(cell, namespace))
+                      for cell in closure)
+        func = types.FunctionType(marshal.loads(code), namespace, name,
+                                  defaults, cells or None)
+        if kwdefaults:
+            func.__kwdefaults__ = kwdefaults
+        for (attribute, value) in attributes.items():
+            setattr(func, attribute, load_value(value, namespace))
+        if annotations:
+            func.__annotations__ = dict(
+                (key, load_value(value, namespace))
+                for (key, value) in annotations.items())
+        return func
+    if kind == 'empty':
+        return None
+    return entry[1]
+
+
+def load_function(data):
+    """Rebuild the function dump_function() described. Its globals are a
+    new namespace, holding what it refers to."""
+    (entry, entries) = data
+    namespace = {'__name__': '__main__', '__builtins__': builtins}
+    for (name, value) in entries.items():
+        namespace[name] = load_value(value, namespace)
+    return load_value(entry, namespace)
+
+
+def init_worker(data):
+    global worker_function
+
+    # curses' handler would restore the terminal the parent still uses when
+    # the pool is terminated, and cancelling is up to the parent
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Output would end up all over the screen
+    sys.stdout = sys.stderr = open(os.devnull, 'w')
+    worker_function = load_function(data)
+
+
+def call_chunk(chunk):
+    return [worker_function(item) for item in chunk]
+
+
+@contextmanager
+def real_streams():
+    """Put the real standard streams back while starting processes:
+    multiprocessing closes stdin in the children, which bpython's fake one
+    does not support, and whatever goes wrong before the children redirect
+    their output must not end up on the screen."""
+    streams = (sys.stdin, sys.stdout, sys.stderr)
+    sys.stdin, sys.stdout, sys.stderr = (sys.__stdin__, sys.__stdout__,
+                                         sys.__stderr__)
+    try:
+        yield
+    finally:
+        sys.stdin, sys.stdout, sys.stderr = streams
+
+
+def chunk_size(items, processes):
+    chunks = processes * CHUNKS_PER_PROCESS
+    return max(1, (items + chunks - 1) // chunks)
+
+
+def imap_chunks(func, items, processes=None, chunksize=None):
+    """Start a pool of processes applying func to all items, sent to them
+    in chunks. Return the pool, and an iterator over the lists of results
+    of the chunks, in the order of the items. Its next() takes a timeout,
+    unlike the one Pool.imap() returns for chunks of more than one item."""
+    processes = processes or multiprocessing.cpu_count()
+    chunksize = chunksize or chunk_size(len(items), processes)
+    chunks = [items[i:i + chunksize] for i in range(0, len(items), chunksize)]
+    with real_streams():
+        pool = multiprocessing.Pool(processes, init_worker,
+                                    (dump_function(func), ))
+    return pool, pool.imap(call_chunk, chunks)
@@ -29,8 +29,8 @@ import itertools
 import re
 
 from bpython._py3compat import PythonLexer
-from bpython.formatter import Parenthesis
-from bpython import str_util
+from bpython.tokens import Parenthesis
+from bpython import latency, str_util
 from pygments.token import Token
 
 from six.moves import xrange
@@ -59,6 +59,7 @@ class ReplParser(object):
     def reprint_line(self, *args):
         return self.repl.reprint_line(*args)
 
+    @latency.timed('tokenize')
     def tokenize(self, s, newline=False):
         """Tokenize a line of code."""
 
@@ -33,12 +33,13 @@ from itertools import takewhile
 
 from pygments.token import Token
 
+from bpython import latency
 from bpython.completion import inspection
 from bpython.completion.completer import BPythonCompleter
 from bpython.parser import ReplParser
 from bpython.history import History
 
-from bpython.util import getpreferredencoding, debug, TimeOutException
+from bpython.util import getpreferredencoding, debug, TimeOutException, LRUCache
 from bpython._py3compat import PythonLexer, PY3
 
 
@@ -173,6 +174,7 @@ class Repl(object):
         self.matches = []
         self.matches_iter = MatchesIterator()
         self.argspec = None
+        self.docstring_cache = LRUCache(32)
         self.list_win_visible = False
         self._C = {}
         self.interact = Interaction(self.config)
@@ -189,11 +191,15 @@ class Repl(object):
                                  getpreferredencoding() or "ascii")
 
 
-    def register_command(self, name, function=None, without_completion=False):
+    def register_command(self, name, function=None, without_completion=False,
+                         raw=False):
+        """Register a command. Its arguments are evaluated as expressions,
+        unless it is raw, in which case it gets the rest of the line as a
+        string."""
         def inner(function, name=name):
             if not name:
                 name = function.__name__.replace('_', '-')
-            if self.interp.register_command(name, function) and not without_completion:
+            if self.interp.register_command(name, function, raw) and not without_completion:
                 name += " "
                 self.completer.register_command(name)
 
@@ -270,6 +276,7 @@ class Repl(object):
     def get_object(self, name):
         return self.interp.get_object(name)
 
+    @latency.timed('argspec')
     def set_argspec(self):
         """Check if an unclosed parenthesis exists, then attempt to get the
         argspec() for it. On success, update self.argspec and return True,
@@ -293,6 +300,7 @@ class Repl(object):
 
         return obj
 
+    @latency.timed('complete')
     def complete(self, tab=False):
         """Construct a full list of possible completions and construct and
         display them in a window. Also check if there's an available argspec
@@ -365,7 +373,9 @@ class Repl(object):
             matches = self.completer.matches
 
         if not e and self.argspec and isinstance(self.argspec, inspection.ArgSpec):
-            matches.extend(name + '=' for name in self.argspec[1][0]
+            keywords = self.argspec[1][0][
+                inspection.positional_only(self.argspec[1]):]
+            matches.extend(name + '=' for name in keywords
                            if isinstance(name, basestring) and name.startswith(current_word))
             if PY3:
                 matches.extend(name + '=' for name in self.argspec[1][4]
@@ -390,21 +400,32 @@ class Repl(object):
 
     def format_docstring(self, docstring, width, height):
         """Take a string and try to format it into a sane list of strings to be
-        put into the suggestion box."""
-        lines = docstring.split('\n')
+        put into the suggestion box. Only the lines that fit into `height` are
+        wrapped and the result is cached."""
+        # Docstrings are keyed by identity, hashing them would take as long
+        # as their length. inspection.getdoc() returns the same string for
+        # an object every time, so this caches the layout per object. The
+        # docstring is kept along to make sure its id is not reused.
+        key = (id(docstring), width, height)
+        cached = self.docstring_cache.get(key)
+        if cached is not None and cached[0] is docstring:
+            return cached[1]
         out = []
         i = 0
-        for line in lines:
+        for line in _iter_lines(docstring):
             i += 1
             if not line.strip():
                 out.append('\n')
-            for block in textwrap.wrap(line, width):
+            for block in _wrap_head(line, width, height - i + 1):
                 out.append('  ' + block + '\n')
                 if i >= height:
+                    self.docstring_cache[key] = (docstring, out)
                     return out
                 i += 1
-                # Drop the last newline
-        out[-1] = out[-1].rstrip()
+        if out:
+            # Drop the last newline
+            out[-1] = out[-1].rstrip()
+        self.docstring_cache[key] = (docstring, out)
         return out
 
     def next_indentation(self):
@@ -507,14 +528,19 @@ class Repl(object):
             else:
                 self.rl_history.append(s)
 
+        # Running code might change the objects matches were cached for
+        self.completer.clear_cache()
+
         if len(self.buffer) == 1:
             line = self.buffer[0]
             if self.interp.is_commandline(line) and not self.is_assignment_statement:
-                result = self.interp.runcommand(line)
+                with latency.span('runcommand'):
+                    result = self.interp.runcommand(line)
                 self.buffer = []
                 return result
 
-        more = self.interp.runsource('\n'.join(self.buffer))
+        with latency.span('runsource'):
+            more = self.interp.runsource('\n'.join(self.buffer))
 
         if not more:
             self.buffer = []
@@ -558,6 +584,31 @@ class Repl(object):
         """See the flush() method docstring."""
 
 
+def _iter_lines(s):
+    """Iterate over the lines of `s` like `s.split('\\n')`, but lazily."""
+    start = 0
+    while True:
+        end = s.find('\n', start)
+        if end == -1:
+            yield s[start:]
+            return
+        yield s[start:end]
+        start = end + 1
+
+
+def _wrap_head(line, width, count):
+    """Return at least the first `count` blocks of `textwrap.wrap(line,
+    width)`, without wrapping all of an overlong line."""
+    count = max(count, 1)
+    head_size = (count + 2) * width
+    if len(line) > head_size:
+        # Cutting off the line only changes the last two blocks
+        blocks = textwrap.wrap(line[:head_size], width)
+        if len(blocks) > count + 1:
+            return blocks[:count]
+    return textwrap.wrap(line, width)
+
+
 def next_indentation(line, tab_length):
     """Given a code line, return the indentation of the next line."""
     line = line.expandtabs(tab_length)
@@ -0,0 +1,529 @@
+#!/usr/bin/env python
+#coding: utf-8
+
+# The MIT License
+#
+# Copyright (c) 2009-2011 the bpython authors.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+"""An in-memory stand-in for the curses module.
+
+It implements the part of the curses API the CLI uses, so that bpython can
+run without a terminal, e.g. to test or benchmark rendering. Keystrokes are
+fed to the screen in advance, and every call of a window method, every cell
+changed on the screen and an estimate of the bytes a terminal would have
+been sent are counted.
+
+`install()` has to be called before bpython.cli is imported:
+
+    from bpython import screen
+    screen.install(24, 80).feed('1 + 1\\n')
+    from bpython import cli
+"""
+
+from __future__ import with_statement
+
+import curses as _curses
+import functools
+import re
+import sys
+import unicodedata
+from collections import deque, Counter
+
+from six import integer_types, string_types
+
+from bpython.util import getpreferredencoding
+
+
+error = _curses.error
+
+for _name in dir(_curses):
+    if _name.startswith(('A_', 'COLOR_', 'KEY_')):
+        globals()[_name] = getattr(_curses, _name)
+
+# Maps key codes to the names keyname() returns for them
+_keynames = dict()
+for _name in dir(_curses):
+    if _name.startswith('KEY_') and _name not in ('KEY_MIN', 'KEY_MAX'):
+        _match = re.match(r'KEY_F(\d+)$', _name)
+        if _match:
+            _keynames[getattr(_curses, _name)] = 'KEY_F(%s)' % _match.groups()
+        else:
+            _keynames.setdefault(getattr(_curses, _name), _name)
+
+# Escape sequences to estimate the bytes sent to a terminal
+_MOVE = '\x1b[%d;%dH'
+_ATTRIBUTES = '\x1b[%dm'
+
+BLANK = (' ', 0)
+
+
+class EndOfInput(Exception):
+    """Raised when a key is read after all keys fed to the screen were."""
+
+
+class Screen(object):
+    """The terminal: the keys to be read and what is shown on it."""
+
+    def __init__(self, rows=24, columns=80):
+        self.rows = rows
+        self.columns = columns
+        # What the terminal shows, and what it will show after doupdate()
+        self.physical = [[BLANK] * columns for _ in range(rows)]
+        self.virtual = [[BLANK] * columns for _ in range(rows)]
+        self.cursor = (0, 0)
+        self.repaint = False
+        self.input = deque()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.calls = Counter()
+        self.updates = 0
+        self.cells = 0
+        self.bytes = 0
+
+    def stats(self):
+        return dict(calls=sum(self.calls.values()), updates=self.updates,
+                    cells=self.cells, bytes=self.bytes)
+
+    def feed(self, keys):
+        """Queue keys to be read. `keys` is a string or a list of strings,
+        where names of special keys like 'KEY_UP' stand for the key."""
+        if isinstance(keys, string_types):
+            keys = [keys]
+        for key in keys:
+            if key in _key_codes:
+                self.input.append(_key_codes[key])
+            else:
+                if not isinstance(key, bytes):
+                    key = key.encode(getpreferredencoding())
+                self.input.extend(bytearray(key))
+
+    def read(self, window):
+        """Return the code of the next key, or None if there is none and the
+        window doesn't wait for keys."""
+        # A \x00 is pushed back by App.idle() to poll for keys; once those
+        # are all that is left, the input has been used up.
+        if not any(self.input):
+            if window.delay == 0:
+                return None
+            raise EndOfInput()
+        return self.input.popleft()
+
+    def unread(self, code):
+        self.input.appendleft(code)
+
+    def update(self):
+        """Bring the terminal up to date with the virtual screen."""
+        self.updates += 1
+        position = None
+        attributes = 0
+        for (y, (new, old)) in enumerate(zip(self.virtual, self.physical)):
+            for (x, cell) in enumerate(new):
+                if cell == old[x] and not self.repaint:
+                    continue
+                self.cells += 1
+                (ch, attr) = cell
+                if not ch:
+                    # Right half of a wide character
+                    continue
+                if position != (y, x):
+                    self.bytes += len(_MOVE % (y + 1, x + 1))
+                if attr != attributes:
+                    self.bytes += len(_ATTRIBUTES % (attr, ))
+                    attributes = attr
+                self.bytes += len(ch.encode('utf-8'))
+                position = (y, x + _width(ch))
+            self.physical[y] = list(new)
+        self.repaint = False
+
+    def lines(self):
+        """Return the text on the terminal, line by line."""
+        return [''.join(ch for (ch, _) in line).rstrip()
+                for line in self.physical]
+
+
+def _count(func):
+    @functools.wraps(func)
+    def wrapper(self, *args):
+        self.screen.calls[func.__name__] += 1
+        return func(self, *args)
+    return wrapper
+
+
+def _width(ch):
+    if unicodedata.east_asian_width(ch[0]) in ('W', 'F'):
+        return 2
+    return 1
+
+
+class Window(object):
+    def __init__(self, screen, nlines, ncols, begin_y, begin_x):
+        self.screen = screen
+        self.h = nlines or screen.rows - begin_y
+        self.w = ncols or screen.columns - begin_x
+        self.begin_y = begin_y
+        self.begin_x = begin_x
+        self.y = self.x = 0
+        self.attr = 0
+        self.background = BLANK
+        self.cells = [[BLANK] * self.w for _ in range(self.h)]
+        self.touched = set(range(self.h))
+        self.is_scrollok = False
+        self.clearok = False
+        # Milliseconds to wait for a key, -1 waits forever
+        self.delay = -1
+
+    def _put(self, ch, attr):
+        if ch == '\n':
+            self._clear_line(self.y, self.x)
+            self._newline()
+            return
+        elif ch == '\r':
+            self.x = 0
+            return
+        elif ch == '\b':
+            self.x = max(self.x - 1, 0)
+            return
+        elif ch == '\t':
+            for _ in range(8 - self.x % 8):
+                self._put(' ', attr)
+            return
+        elif ch < ' ' or ch == '\x7f':
+            for c in _keyname(ord(ch)):
+                self._put(c, attr)
+            return
+        elif unicodedata.combining(ch) and self.x:
+            (previous, previous_attr) = self.cells[self.y][self.x - 1]
+            self.cells[self.y][self.x - 1] = (previous + ch, previous_attr)
+            return
+
+        width = _width(ch)
+        if self.x + width > self.w:
+            self._clear_line(self.y, self.x)
+            self._newline()
+        line = self.cells[self.y]
+        line[self.x] = (ch, attr or self.background[1])
+        if width == 2:
+            line[self.x + 1] = ('', attr or self.background[1])
+        self.touched.add(self.y)
+        self.x += width
+        if self.x >= self.w:
+            self._newline()
+
+    def _newline(self):
+        self.x = 0
+        if self.y + 1 < self.h:
+            self.y += 1
+        elif self.is_scrollok:
+            self.cells.pop(0)
+            self.cells.append([self.background] * self.w)
+            self.touched.update(range(self.h))
+        else:
+            self.x = self.w - 1
+            raise error('addwstr() returned ERR')
+
+    def _clear_line(self, y, x):
+        self.cells[y][x:] = [self.background] * (self.w - x)
+        self.touched.add(y)
+
+    def _check(self, y, x):
+        if not (0 <= y < self.h and 0 <= x < self.w):
+            raise error('wmove() returned ERR')
+
+    @_count
+    def addstr(self, *args):
+        if isinstance(args[0], integer_types):
+            (y, x) = args[:2]
+            self._check(y, x)
+            (self.y, self.x) = (y, x)
+            args = args[2:]
+        s = args[0]
+        attr = args[1] if len(args) > 1 else self.attr
+        if isinstance(s, bytes):
+            s = s.decode(getpreferredencoding(), 'replace')
+        for ch in s:
+            self._put(ch, attr)
+
+    @_count
+    def attron(self, attr):
+        self.attr |= attr
+
+    @_count
+    def bkgd(self, ch, attr=0):
+        old = self.background
+        self.background = (ch, attr)
+        for line in self.cells:
+            for (x, cell) in enumerate(line):
+                if cell == old:
+                    line[x] = self.background
+        self.touched.update(range(self.h))
+
+    @_count
+    def border(self):
+        attr = self.attr or self.background[1]
+        for y in range(self.h):
+            self.cells[y][0] = self.cells[y][-1] = ('|', attr)
+        self.cells[0] = [('-', attr)] * self.w
+        self.cells[-1] = [('-', attr)] * self.w
+        for (y, x) in [(0, 0), (0, -1), (-1, 0), (-1, -1)]:
+            self.cells[y][x] = ('+', attr)
+        self.touched.update(range(self.h))
+
+    @_count
+    def clear(self):
+        self.erase()
+        self.clearok = True
+
+    @_count
+    def clrtoeol(self):
+        self._clear_line(self.y, self.x)
+
+    @_count
+    def cursyncup(self):
+        pass
+
+    @_count
+    def delch(self, *args):
+        if args:
+            self._check(*args)
+            (self.y, self.x) = args
+        line = self.cells[self.y]
+        del line[self.x]
+        line.append(self.background)
+        self.touched.add(self.y)
+
+    @_count
+    def erase(self):
+        self.cells = [[self.background] * self.w for _ in range(self.h)]
+        self.touched.update(range(self.h))
+        self.y = self.x = 0
+
+    @_count
+    def getbegyx(self):
+        return (self.begin_y, self.begin_x)
+
+    @_count
+    def getmaxyx(self):
+        return (self.h, self.w)
+
+    @_count
+    def getyx(self):
+        return (self.y, self.x)
+
+    @_count
+    def getch(self):
+        if self.touched:
+            self.refresh()
+        code = self.screen.read(self)
+        return -1 if code is None else code
+
+    @_count
+    def getkey(self):
+        if self.touched:
+            self.refresh()
+        code = self.screen.read(self)
+        if code is None:
+            raise error('no input')
+        elif code >= KEY_MIN:
+            return _keynames.get(code, '')
+        return chr(code)
+
+    @_count
+    def keypad(self, flag):
+        pass
+
+    @_count
+    def move(self, y, x):
+        self._check(y, x)
+        (self.y, self.x) = (y, x)
+
+    @_count
+    def mvwin(self, y, x):
+        if (y < 0 or x < 0 or y + self.h > self.screen.rows or
+                x + self.w > self.screen.columns):
+            raise error('mvwin() returned ERR')
+        (self.begin_y, self.begin_x) = (y, x)
+        self.touched.update(range(self.h))
+
+    @_count
+    def nodelay(self, flag):
+        self.delay = 0 if flag else -1
+
+    @_count
+    def noutrefresh(self):
+        screen = self.screen
+        for y in self.touched:
+            row = self.begin_y + y
+            if 0 <= row < screen.rows:
+                line = screen.virtual[row]
+                line[self.begin_x:self.begin_x + self.w] = self.cells[y]
+                del line[screen.columns:]
+        self.touched.clear()
+        screen.cursor = (self.begin_y + self.y, self.begin_x + self.x)
+        if self.clearok:
+            screen.repaint = True
+            self.clearok = False
+
+    @_count
+    def redrawwin(self):
+        for y in range(self.begin_y, min(self.begin_y + self.h,
+                                         self.screen.rows)):
+            line = self.screen.physical[y]
+            line[self.begin_x:self.begin_x + self.w] = [None] * self.w
+            del line[self.screen.columns:]
+        self.touched.update(range(self.h))
+
+    @_count
+    def refresh(self):
+        self.noutrefresh()
+        self.screen.update()
+
+    @_count
+    def resize(self, nlines, ncols):
+        for line in self.cells:
+            line[ncols:] = []
+            line.extend([self.background] * (ncols - len(line)))
+        self.cells[nlines:] = []
+        self.cells.extend([self.background] * ncols
+                          for _ in range(nlines - len(self.cells)))
+        (self.h, self.w) = (nlines, ncols)
+        self.y = min(self.y, nlines - 1)
+        self.x = min(self.x, ncols - 1)
+        self.touched = set(range(nlines))
+
+    @_count
+    def scrollok(self, flag):
+        self.is_scrollok = flag
+
+    @_count
+    def timeout(self, delay):
+        self.delay = delay
+
+    @_count
+    def touchwin(self):
+        self.touched.update(range(self.h))
+
+
+_key_codes = dict((name, code) for (code, name) in _keynames.items())
+
+screen = None
+
+
+def _keyname(k):
+    if k < 32:
+        return '^' + chr(k + 64)
+    elif k == 127:
+        return '^?'
+    elif k < 128:
+        return chr(k)
+    elif k < 256:
+        return 'M-' + _keyname(k - 128)
+    return _keynames.get(k, '')
+
+
+def keyname(k):
+    if k < 0:
+        raise ValueError('invalid key number')
+    return _keyname(k).encode('ascii')
+
+
+def install(rows=24, columns=80):
+    """Make this module stand in for curses, with a new screen of the given
+    size, and return the screen."""
+    global screen
+    screen = Screen(rows, columns)
+    this = sys.modules[__name__]
+    sys.modules['curses'] = this
+    for (name, module) in list(sys.modules.items()):
+        if name.startswith('bpython') and getattr(module, 'curses', None) is _curses:
+            module.curses = this
+    return screen
+
+
+def uninstall():
+    this = sys.modules[__name__]
+    sys.modules['curses'] = _curses
+    for (name, module) in list(sys.modules.items()):
+        if name.startswith('bpython') and getattr(module, 'curses', None) is this:
+            module.curses = _curses
+
+
+def initscr():
+    global screen
+    if screen is None:
+        screen = Screen()
+    return Window(screen, screen.rows, screen.columns, 0, 0)
+
+
+def newwin(nlines, ncols, begin_y=0, begin_x=0):
+    return Window(screen, nlines, ncols, begin_y, begin_x)
+
+
+def gethw():
+    return (screen.rows, screen.columns)
+
+
+def wrapper(func, *args, **kwargs):
+    try:
+        return func(initscr(), *args, **kwargs)
+    finally:
+        endwin()
+
+
+def doupdate():
+    screen.update()
+
+
+def endwin():
+    # The next update redraws the whole screen
+    if screen is not None:
+        screen.repaint = True
+
+
+def ungetch(ch):
+    if not isinstance(ch, integer_types):
+        ch = ord(ch)
+    screen.unread(ch)
+
+
+def color_pair(n):
+    return n << 8
+
+
+def erasechar():
+    return b'\x7f'
+
+
+def raw(flag=True):
+    pass
+
+
+def init_pair(pair, fg, bg):
+    pass
+
+
+def start_color():
+    pass
+
+
+def use_default_colors():
+    pass
@@ -0,0 +1,404 @@
+#!/usr/bin/env python
+#coding: utf-8
+
+"""Replay scripted sessions against bpython and measure how long every
+keystroke takes.
+
+Each scenario starts bpython with --trace, feeds it a list of keystrokes and
+reads the per key timings back from the trace. bpython runs either in a
+pseudo terminal, or with --backend=screen on the in-memory screen of
+bpython.screen, which needs no terminal and also counts what is drawn. The
+results are written as JSON, so that runs on different commits can be
+compared:
+
+    python -m bpython.test.benchmark -o before.json
+    python -m bpython.test.benchmark -o after.json --compare before.json
+"""
+
+from __future__ import print_function, with_statement
+
+import errno
+import json
+import os
+import pty
+import select
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import textwrap
+import time
+from optparse import OptionParser
+
+from six.moves import configparser
+
+from bpython.test.test_crashers import set_win_size
+
+# Seconds without output after which a keystroke counts as handled
+QUIET_TIME = 0.05
+
+# Seconds to wait at most for a keystroke to be handled
+KEY_TIMEOUT = 10
+
+# Keys as sent by a vt100 in keypad transmit mode, which curses enables
+UP = '\x1bOA'
+BACKSPACE = '\x7f'
+
+# Keys as fed to bpython.screen
+SCREEN_KEYS = {UP: 'KEY_UP'}
+
+# C-u C-d, exit on an empty line
+EXIT = '\x15\x04'
+
+# Size of the in-memory screen
+ROWS = 25
+COLUMNS = 80
+
+
+class Scenario(object):
+    """A session to replay.
+
+    `startup` is run through PYTHONSTARTUP before the first prompt,
+    `keys` are written one by one (a string of several characters is
+    written at once, like a paste), `config` is added to the config file and
+    `files` maps file names in the scenario's directory to their contents.
+    The next key is sent once there was no output for `quiet_time` seconds,
+    which has to be longer than the slowest work done without drawing
+    anything, or keys pile up and are handled as a paste.
+    """
+
+    def __init__(self, name, keys, startup='', config='', files=None,
+                 quiet_time=QUIET_TIME):
+        self.name = name
+        self.keys = keys
+        self.startup = textwrap.dedent(startup)
+        self.config = textwrap.dedent(config)
+        self.files = files or dict()
+        self.quiet_time = quiet_time
+
+    @property
+    def pasted(self):
+        return any(len(key) > 1 and key not in SCREEN_KEYS
+                   for key in self.keys)
+
+
+def typed(s):
+    return list(s)
+
+
+def history_file():
+    return '\n'.join('spam_%d = %d' % (i, i) for i in range(100000)) + '\n'
+
+
+def pasted_block():
+    lines = ['def spam_%d(x):' % (i, ) + '\n    return x + %d\n' % (i, )
+             for i in range(100)]
+    return ''.join(lines) + '\n'
+
+
+SCENARIOS = [
+    Scenario('large_namespace',
+             typed('spam_1') + ['\t'] + [BACKSPACE] * 4 + typed('2345('),
+             startup="""\
+             globals().update(('spam_%d' % i, i) for i in range(20000))
+             """),
+    Scenario('history',
+             [UP] * 30 + typed('spam'),
+             config="""\
+             [general]
+             hist_file = %(dir)s/history
+             hist_length = 200000
+             """,
+             files={'history': history_file()}),
+    Scenario('dict_keys',
+             typed('d["key99') + [BACKSPACE] * 3,
+             startup="""\
+             d = dict(('key%d' % i, i) for i in range(1000000))
+             """,
+             quiet_time=0.5),
+    Scenario('paste',
+             [pasted_block()],
+             config="""\
+             [general]
+             paste_time = 0.02
+             """),
+    Scenario('print_output',
+             typed('for i in range(20000): print(i)') + ['\r', '\r']),
+]
+
+
+def write_config(path, scenario, backend):
+    """Write the test config, updated by the scenario's options, to path."""
+    overrides = path + '.in'
+    with open(overrides, 'w') as f:
+        f.write(scenario.config % dict(dir=os.path.dirname(path)))
+    config = configparser.ConfigParser()
+    config.read([os.path.join(os.path.dirname(__file__), 'test.config'),
+                 overrides])
+    if backend == 'screen' and not scenario.pasted:
+        # Keys are read as fast as a paste from the in-memory screen
+        config.set('general', 'paste_time', '-1')
+    with open(path, 'w') as f:
+        config.write(f)
+
+
+def read_until_quiet(fd, quiet_time=QUIET_TIME, timeout=KEY_TIMEOUT):
+    """Read from fd until there was no output for quiet_time seconds."""
+    data = []
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        ready = select.select([fd], [], [], quiet_time)[0]
+        if not ready:
+            break
+        try:
+            chunk = os.read(fd, 65536)
+        except OSError as e:
+            if e.errno == errno.EIO:
+                # The child is gone
+                break
+            raise
+        if not chunk:
+            break
+        data.append(chunk)
+    return b''.join(data)
+
+
+def wait_for_prompt(fd, timeout=60):
+    data = b''
+    deadline = time.time() + timeout
+    while b'>>> ' not in data and time.time() < deadline:
+        data += read_until_quiet(fd, 0.5, timeout)
+    return data
+
+
+def spawn(args, env, rows=25, columns=80):
+    pid, fd = pty.fork()
+    if not pid:
+        set_win_size(sys.stdin.fileno(), rows, columns)
+        os.execve(sys.executable, [sys.executable] + args, env)
+    return pid, fd
+
+
+def wait(pid, fd, timeout=10):
+    """Wait for the child to exit, and kill it if it doesn't. Returns its
+    resource usage."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        # Keep reading, the child might block on a full pty otherwise
+        read_until_quiet(fd, 0.1)
+        (waited, _, rusage) = os.wait4(pid, os.WNOHANG)
+        if waited:
+            return rusage
+    os.kill(pid, signal.SIGKILL)
+    return os.wait4(pid, 0)[2]
+
+
+def run_in_pty(scenario, args, env):
+    """Return the startup time and the resource usage of bpython run in a
+    pseudo terminal."""
+    env = dict(os.environ, TERM='vt100', **env)
+    start = time.time()
+    pid, fd = spawn(['-m', 'bpython.cli'] + args, env)
+    wait_for_prompt(fd)
+    startup_time = time.time() - start
+
+    for key in scenario.keys:
+        os.write(fd, key.encode('utf-8'))
+        read_until_quiet(fd, scenario.quiet_time)
+    os.write(fd, EXIT.encode('ascii'))
+    try:
+        rusage = wait(pid, fd)
+    finally:
+        os.close(fd)
+    return startup_time, rusage, None
+
+
+def run_on_screen(scenario, args, env):
+    """Return the startup time, the resource usage and the screen's counts
+    of bpython run on an in-memory screen in a child process."""
+    (read, write) = os.pipe()
+    pid = os.fork()
+    if not pid:
+        os.close(read)
+        status = 1
+        try:
+            os.environ.update(env)
+            result = run_screen_child(scenario, args)
+            with os.fdopen(write, 'w') as f:
+                json.dump(result, f)
+            status = 0
+        finally:
+            os._exit(status)
+
+    os.close(write)
+    with os.fdopen(read) as f:
+        data = f.read()
+    rusage = os.wait4(pid, 0)[2]
+    if not data:
+        raise RuntimeError('scenario %s failed' % (scenario.name, ))
+    result = json.loads(data)
+    return result['startup'], rusage, result['screen']
+
+
+def run_screen_child(scenario, args):
+    from bpython import screen
+    terminal = screen.install(ROWS, COLUMNS)
+    terminal.feed([SCREEN_KEYS.get(key, key) for key in scenario.keys])
+    terminal.feed(EXIT)
+
+    from bpython import cli, latency, translations
+    from bpython.config.args import parse_and_load
+    from bpython.config.struct import Struct
+    translations.init()
+    config, options, exec_args = parse_and_load(Struct(), args,
+                                                ignore_stdin=True)
+
+    start = time.time()
+    startup = []
+    read = terminal.read
+
+    def timed_read(window):
+        if not startup:
+            startup.append(time.time() - start)
+            terminal.reset_stats()
+        return read(window)
+    terminal.read = timed_read
+
+    try:
+        screen.wrapper(cli.main_curses, exec_args, config, True)
+    except screen.EndOfInput:
+        pass
+    latency.recorder.stop_trace()
+    return dict(startup=startup[0], screen=terminal.stats())
+
+
+def run_scenario(scenario, backend):
+    directory = tempfile.mkdtemp()
+    try:
+        for (name, contents) in scenario.files.items():
+            with open(os.path.join(directory, name), 'w') as f:
+                f.write(contents)
+        config = os.path.join(directory, 'config')
+        write_config(config, scenario, backend)
+        startup = os.path.join(directory, 'startup.py')
+        with open(startup, 'w') as f:
+            f.write(scenario.startup)
+        trace = os.path.join(directory, 'trace.json')
+
+        env = dict(PYTHONSTARTUP=startup, XDG_CONFIG_HOME=directory)
+        args = ['--config', config, '--trace', trace]
+        run = run_on_screen if backend == 'screen' else run_in_pty
+        startup_time, rusage, screen = run(scenario, args, env)
+
+        with open(trace) as f:
+            data = f.read()
+        if not data.rstrip().endswith(']'):
+            data += ']'
+        events = json.loads(data)
+    finally:
+        shutil.rmtree(directory)
+
+    result = summarize(events, startup_time,
+                       rusage.ru_utime + rusage.ru_stime)
+    if screen is not None:
+        result['screen'] = screen
+    return result
+
+
+def percentile(samples, p):
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[int(round(p / 100.0 * (len(samples) - 1)))]
+
+
+def distribution(samples):
+    return dict(count=len(samples),
+                mean=sum(samples) / len(samples) if samples else 0.0,
+                p50=percentile(samples, 50),
+                p95=percentile(samples, 95),
+                p99=percentile(samples, 99),
+                max=max(samples) if samples else 0.0)
+
+
+def summarize(events, startup_time, cpu_time):
+    """Turn trace events into latency distributions in milliseconds."""
+    spans = dict()
+    for event in events:
+        if event.get('ph') == 'X':
+            spans.setdefault(event['name'], []).append(event['dur'] / 1000.0)
+    keys = spans.pop('key', [])
+    return dict(keys=distribution(keys),
+                spans=dict((name, distribution(samples))
+                           for (name, samples) in spans.items()),
+                startup=startup_time * 1000,
+                cpu=cpu_time * 1000)
+
+
+def git_revision():
+    try:
+        output = subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=open(os.devnull, 'w'))
+    except (EnvironmentError, subprocess.CalledProcessError):
+        return None
+    return output.decode('ascii').strip()
+
+
+def compare(old, new):
+    print('%-20s %10s %10s %10s %10s %10s %10s' % (
+        'scenario', 'p95 (ms)', 'before', 'cpu (ms)', 'before', 'bytes',
+        'before'))
+    for (name, result) in sorted(new['scenarios'].items()):
+        before = old['scenarios'].get(name)
+        if before is None:
+            continue
+        line = '%-20s %10.2f %10.2f %10.0f %10.0f' % (
+            name, result['keys']['p95'], before['keys']['p95'],
+            result['cpu'], before['cpu'])
+        if 'screen' in result and 'screen' in before:
+            line += ' %10d %10d' % (result['screen']['bytes'],
+                                    before['screen']['bytes'])
+        print(line)
+
+
+def main(args=None):
+    parser = OptionParser(usage='Usage: %prog [options] [scenario ...]')
+    parser.add_option('--output', '-o', metavar='FILE',
+                      help='Write the results as JSON to FILE.')
+    parser.add_option('--compare', '-c', metavar='FILE',
+                      help='Compare the results to those in FILE.')
+    parser.add_option('--backend', choices=['pty', 'screen'], default='pty',
+                      help='Run bpython in a pseudo terminal (pty) or on '
+                           'an in-memory screen (screen).')
+    options, names = parser.parse_args(args)
+
+    scenarios = [scenario for scenario in SCENARIOS
+                 if not names or scenario.name in names]
+    results = dict(revision=git_revision(),
+                   python=sys.version.split()[0],
+                   backend=options.backend,
+                   scenarios=dict())
+    for scenario in scenarios:
+        result = run_scenario(scenario, options.backend)
+        results['scenarios'][scenario.name] = result
+        keys = result['keys']
+        line = ('%-20s %4d keys  p50 %7.2fms  p95 %7.2fms  max %7.2fms  '
+                'cpu %6.0fms' % (scenario.name, keys['count'], keys['p50'],
+                                 keys['p95'], keys['max'], result['cpu']))
+        if 'screen' in result:
+            line += '  %d bytes' % (result['screen']['bytes'], )
+        print(line)
+
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if options.compare:
+        with open(options.compare) as f:
+            compare(json.load(f), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""A stand-in for the running CLI, for testing the default plugins. They are
+imported as `plugins.X` and find the REPL through `bpython.running`."""
+
+import os
+import sys
+from contextlib import contextmanager
+
+import bpython
+from bpython.config.struct import Struct
+from bpython.interpreter import BPythonInterpreter
+from six import StringIO
+
+
+PLUGINS_PATH = os.path.join(os.path.dirname(bpython.__file__), 'default')
+
+
+class FakeApp(object):
+    POLL_TIME = 10
+
+    def __init__(self, namespace=None):
+        self.config = Struct()
+        self.config.editor = ''
+        self.config.highlight_show_source = False
+        self.interpreter = BPythonInterpreter(namespace or {})
+        self.background = set()
+        self.notifications = []
+
+    def notify_later(self, s):
+        self.notifications.append(s)
+
+
+def install(namespace=None):
+    """Make a new FakeApp the running app and the default plugins
+    importable. Return the app."""
+    if PLUGINS_PATH not in sys.path:
+        sys.path.insert(0, PLUGINS_PATH)
+    app = bpython.running = FakeApp(namespace)
+    return app
+
+
+def uninstall():
+    bpython.running = None
+
+
+@contextmanager
+def captured_stdout():
+    """Collect what is printed in the StringIO yielded."""
+    stdout = sys.stdout
+    sys.stdout = output = StringIO()
+    try:
+        yield output
+    finally:
+        sys.stdout = stdout
@@ -0,0 +1,62 @@
+import textwrap
+import unittest
+
+from bpython import repl
+from bpython.util import LRUCache
+
+
+class FakeRepl(object):
+    format_docstring = repl.Repl.__dict__['format_docstring']
+
+    def __init__(self):
+        self.docstring_cache = LRUCache(32)
+
+
+class TestFormatDocstring(unittest.TestCase):
+    def setUp(self):
+        self.repl = FakeRepl()
+
+    def test_short_docstring(self):
+        self.assertEqual(self.repl.format_docstring('Spam.\n\nEggs.', 20, 10),
+                         ['  Spam.\n', '\n', '  Eggs.'])
+
+    def test_wrapped(self):
+        out = self.repl.format_docstring('spam ' * 10, 20, 10)
+        self.assertEqual(out, ['  ' + block + '\n' for block in
+                               textwrap.wrap('spam ' * 10, 20)[:-1]] +
+                         ['  spam spam'])
+
+    def test_height(self):
+        docstring = '\n'.join('line %d' % (i, ) for i in range(100))
+        out = self.repl.format_docstring(docstring, 20, 5)
+        self.assertTrue(0 < len(out) <= 5)
+        self.assertEqual(out, ['  line %d\n' % (i, ) for i in range(len(out))])
+
+    def test_cached_by_identity(self):
+        docstring = 'Spam.'
+        first = self.repl.format_docstring(docstring, 20, 10)
+        self.assertTrue(self.repl.format_docstring(docstring, 20, 10) is first)
+        self.assertFalse(self.repl.format_docstring(docstring, 30, 10) is
+                         first)
+        other = ''.join(['Sp', 'am.'])
+        self.assertEqual(self.repl.format_docstring(other, 20, 10), first)
+
+
+class TestWrapHead(unittest.TestCase):
+    def test_short_line(self):
+        self.assertEqual(repl._wrap_head('spam eggs', 20, 3), ['spam eggs'])
+
+    def test_overlong_line(self):
+        line = ' '.join('word%d' % (i, ) for i in range(1000))
+        blocks = repl._wrap_head(line, 30, 3)
+        self.assertTrue(len(blocks) >= 3)
+        self.assertEqual(blocks[:3], textwrap.wrap(line, 30)[:3])
+
+    def test_at_least_one_block(self):
+        line = 'spam ' * 100
+        self.assertEqual(repl._wrap_head(line, 20, 0)[:1],
+                         textwrap.wrap(line, 20)[:1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from bpython.completion.completers import file_completer
+
+
+def touch(*path):
+    with open(os.path.join(*path), 'w'):
+        pass
+
+
+class TestFileCompletion(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        touch(self.path, 'spam')
+        touch(self.path, '.hidden')
+        os.mkdir(os.path.join(self.path, 'eggs'))
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def complete(self, text):
+        return file_completer.complete(os.path.join(self.path, text))
+
+    def test_complete(self):
+        self.assertEqual(self.complete(''),
+                         [os.path.join(self.path, 'eggs') + os.path.sep,
+                          os.path.join(self.path, 'spam')])
+        self.assertEqual(self.complete('s'), [os.path.join(self.path, 'spam')])
+        self.assertEqual(self.complete('x'), [])
+
+    def test_hidden(self):
+        self.assertEqual(self.complete('.'),
+                         [os.path.join(self.path, '.hidden')])
+
+    def test_changed_directory(self):
+        self.assertEqual(len(self.complete('s')), 1)
+        touch(self.path, 'sausage')
+        # Make sure the mtime changes on file systems with coarse timestamps
+        st = os.stat(self.path)
+        os.utime(self.path, (st.st_atime, st.st_mtime + 1))
+        self.assertEqual(len(self.complete('s')), 2)
+
+    def test_max_matches(self):
+        for i in range(file_completer.MAX_MATCHES + 10):
+            touch(self.path, 'bacon%d' % (i, ))
+        self.assertEqual(len(self.complete('b')), file_completer.MAX_MATCHES)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import zipfile
+
+from bpython._py3compat import PY3
+from bpython.completion.completers import import_completer
+
+
+def touch(*path):
+    with open(os.path.join(*path), 'w'):
+        pass
+
+
+class TestModuleIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = import_completer.ModuleIndex()
+        for name in ['zlib', 'os', 'os.path', 'json', 'json.decoder',
+                     'json.encoder', 'json.tool', 'jsonschema', 'os']:
+            self.index.add(name)
+
+    def test_top_level(self):
+        self.assertEqual(self.index.complete('js'), ['json', 'jsonschema'])
+        self.assertEqual(self.index.complete('x'), [])
+
+    def test_submodules(self):
+        self.assertEqual(self.index.complete('json.'),
+                         ['json.decoder', 'json.encoder', 'json.tool'])
+        self.assertEqual(self.index.complete('json.d'), ['json.decoder'])
+        self.assertEqual(self.index.complete('zlib.'), [])
+
+    def test_no_duplicates(self):
+        self.assertEqual(self.index.complete('o'), ['os'])
+
+
+class TestModuleCache(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        touch(self.path, 'spam.py')
+        os.mkdir(os.path.join(self.path, 'eggs'))
+        touch(self.path, 'eggs', '__init__.py')
+        touch(self.path, 'eggs', 'bacon.py')
+        self.cache_path = os.path.join(self.path, 'cache', 'modules.cache')
+        self.saved_cache = dict(import_completer.directory_cache)
+        import_completer.directory_cache.clear()
+
+    def tearDown(self):
+        import_completer.directory_cache.clear()
+        import_completer.directory_cache.update(self.saved_cache)
+        # Keep the temporary directories out of the cache saved at exit
+        import_completer.cache_dirty = False
+        shutil.rmtree(self.path)
+
+    def find_modules(self, path):
+        return dict((name, (filename, is_package)) for
+                    (name, filename, is_package) in
+                    import_completer.find_modules(path))
+
+    def test_find_modules(self):
+        modules = self.find_modules(self.path)
+        self.assertEqual(modules, {'spam': ('spam.py', False),
+                                   'eggs': ('eggs', True)})
+
+    def test_load_package(self):
+        saved = (dict(import_completer.modules),
+                 dict(import_completer.unloaded_packages),
+                 import_completer.module_index)
+        import_completer.module_index = import_completer.ModuleIndex()
+        try:
+            for _ in import_completer.find_all_modules([self.path]):
+                pass
+            self.assertEqual(import_completer.module_index.complete('eggs.'),
+                             [])
+            self.assertEqual(import_completer.complete('eggs.', 'import eggs.'),
+                             ['eggs.bacon'])
+        finally:
+            for mapping, old in zip((import_completer.modules,
+                                     import_completer.unloaded_packages),
+                                    saved):
+                mapping.clear()
+                mapping.update(old)
+            import_completer.module_index = saved[2]
+
+    def test_directory_without_init(self):
+        os.mkdir(os.path.join(self.path, 'data'))
+        modules = self.find_modules(self.path)
+        # Only Python 3 imports it, as a namespace package
+        self.assertEqual('data' in modules, PY3)
+
+    def test_cache_roundtrip(self):
+        list(import_completer.find_modules(self.path))
+        import_completer.cache_dirty = True
+        import_completer.save_cache(self.cache_path)
+        self.assertTrue(os.path.isfile(self.cache_path))
+
+        import_completer.directory_cache.clear()
+        import_completer.load_cache(self.cache_path)
+        self.assertTrue(os.path.abspath(self.path) in
+                        import_completer.directory_cache)
+
+    def test_cache_saved_before_crawl_finished(self):
+        list(import_completer.find_modules(self.path))
+        import_completer.directory_cache['/not/visited'] = ((0, 0), [])
+        import_completer.cache_dirty = True
+        import_completer.save_cache(self.cache_path)
+        self.assertFalse(import_completer.cache_dirty)
+
+        import_completer.directory_cache.clear()
+        import_completer.load_cache(self.cache_path)
+        self.assertTrue('/not/visited' in import_completer.directory_cache)
+
+    def test_cache_per_environment(self):
+        path = import_completer.get_cache_path()
+        self.assertEqual(import_completer.get_cache_path(), path)
+        prefix = sys.prefix
+        sys.prefix = os.path.join(self.path, 'venv')
+        try:
+            other = import_completer.get_cache_path()
+        finally:
+            sys.prefix = prefix
+        self.assertNotEqual(other, path)
+        self.assertEqual(os.path.dirname(other), os.path.dirname(path))
+
+    def test_unchanged_directory_is_not_rescanned(self):
+        list(import_completer.find_modules(self.path))
+        classify = import_completer._classify_directory
+        import_completer._classify_directory = None
+        try:
+            modules = self.find_modules(self.path)
+        finally:
+            import_completer._classify_directory = classify
+        self.assertEqual(set(modules), set(['spam', 'eggs']))
+
+    def test_find_modules_in_archive(self):
+        archive_path = os.path.join(self.path, 'bundle.egg')
+        archive = zipfile.ZipFile(archive_path, 'w')
+        for name in ['ham.py', 'pkg/__init__.py', 'pkg/sub.pyc',
+                     'pkg/sub.py', 'data/notapackage.py',
+                     'EGG-INFO/PKG-INFO']:
+            archive.writestr(name, '')
+        archive.close()
+
+        modules = self.find_modules(archive_path)
+        self.assertEqual(set(modules), set(['ham', 'pkg', 'pkg.sub']))
+        self.assertEqual(modules['pkg.sub'], ('pkg/sub.py', False))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,10 @@
+import os
+import pydoc
+import shutil
+import tempfile
 import unittest
 
-from bpython import inspection
+from bpython.completion import inspection
 
 class TestInspection(unittest.TestCase):
     def test_is_callable(self):
@@ -59,5 +63,137 @@ class TestInspection(unittest.TestCase):
         self.assertEqual(repr(defaults[0]), "23")
         self.assertEqual(repr(defaults[1]), "'yay'")
 
+    def test_getargspec_cached(self):
+        def spam(eggs=23):
+            pass
+
+        first = inspection.getargspec("spam", spam)
+        self.assertTrue(spam.__code__ in inspection._argspec_cache)
+        second = inspection.getargspec("spam", spam)
+        self.assertEqual(first, second)
+        self.assertFalse(first[1] is second[1])
+
+    def test_getargspec_cache_is_not_shared(self):
+        def spam(eggs, bacon=23, *args, **kwargs):
+            pass
+
+        first = inspection.getargspec("spam", spam)
+        first[1][0].append('ham')
+        first[1][3].append(42)
+        second = inspection.getargspec("spam", spam)
+        self.assertEqual(second[1][0], ['eggs', 'bacon'])
+        self.assertEqual(len(second[1][3]), 1)
+
+    def test_getargspec_cache_checks_defaults(self):
+        def spam(eggs=23):
+            pass
+
+        inspection.getargspec("spam", spam)
+        spam.__defaults__ = (42, )
+        defaults = inspection.getargspec("spam", spam)[1][3]
+        self.assertEqual(repr(defaults[0]), "42")
+
+    def test_getdoc_cache_checks_doc(self):
+        def spam():
+            """eggs"""
+
+        self.assertEqual(inspection.getdoc(spam), "eggs")
+        spam.__doc__ = "bacon"
+        self.assertEqual(inspection.getdoc(spam), "bacon")
+        self.assertEqual(inspection.getdoc([]), pydoc.getdoc([]))
+
+
+class TestBuiltinSpec(unittest.TestCase):
+    def test_builtin_function(self):
+        argspec = inspection.getargspec('len', len)[1]
+        self.assertEqual(argspec[0], ['obj'])
+        self.assertEqual(inspection.positional_only(argspec), 1)
+
+    def test_keyword_only(self):
+        argspec = inspection.getargspec('sorted', sorted)[1]
+        self.assertEqual(argspec[0], ['iterable'])
+        self.assertEqual(argspec[4], ['key', 'reverse'])
+        self.assertEqual(argspec[5], {'key': None, 'reverse': False})
+
+    def test_method_descriptor(self):
+        argspec = inspection.getargspec('str.join', str.join)[1]
+        self.assertEqual(argspec[0], ['self', 'iterable'])
+        self.assertEqual(inspection.positional_only(argspec), 2)
+        self.assertTrue(str.join in inspection._builtin_specs[str])
+
+    def test_docstring_signature(self):
+        argspec = inspection._parsepydocspec(
+            'spam(a, b, /, c=1, *d, e=2)\n\nEggs.', 'spam')
+        self.assertEqual(argspec[0], ['a', 'b', 'c'])
+        self.assertEqual(repr(argspec[3][0]), '1')
+        self.assertEqual(argspec[1], 'd')
+        self.assertEqual(argspec[4], ['e'])
+        self.assertEqual(inspection.positional_only(argspec), 2)
+        self.assertEqual(inspection._parsepydocspec('eggs(a)', 'spam'), None)
+
+    def test_type(self):
+        class Spam(object):
+            def __new__(cls, eggs, bacon=23):
+                pass
+
+        argspec = inspection.getargspec('Spam', Spam)[1]
+        self.assertEqual(argspec[0], ['eggs', 'bacon'])
+        self.assertEqual(argspec[3], (23, ))
+
+    def test_builtin_type(self):
+        argspec = inspection.getargspec('int', int)
+        self.assertNotEqual(argspec, None)
+        self.assertFalse(argspec[2])
+
+    def test_type_is_not_mutated(self):
+        lookups = []
+
+        class Meta(type):
+            def __getattr__(cls, name):
+                lookups.append(name)
+                raise AttributeError(name)
+
+        Spam = Meta('Spam', (object, ), {'__doc__': 'Spam(eggs)'})
+        attributes = dict(vars(Meta))
+        argspec = inspection.getargspec('Spam', Spam)[1]
+        self.assertEqual(argspec[0], ['eggs'])
+        self.assertEqual(lookups, [])
+        self.assertEqual(dict(vars(Meta)), attributes)
+
+
+class TestModuleDoc(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def write_module(self, source):
+        filename = os.path.join(self.path, 'spam.py')
+        with open(filename, 'w') as f:
+            f.write(source)
+        return filename
+
+    def test_docstring(self):
+        filename = self.write_module('#!/usr/bin/env python\n'
+                                     '# comment\n\n'
+                                     '"""Spam.\n\n    Eggs.\n"""\n'
+                                     'import os\n')
+        self.assertEqual(inspection.getmoduledoc(filename), 'Spam.\n\nEggs.')
+
+    def test_no_docstring(self):
+        filename = self.write_module('import os\n"""Not a docstring"""\n')
+        self.assertEqual(inspection.getmoduledoc(filename), None)
+
+    def test_long_docstring(self):
+        docstring = 'x' * (3 * inspection.MODULEDOC_HEAD_SIZE)
+        filename = self.write_module('"""%s"""\n' % (docstring, ))
+        self.assertEqual(inspection.getmoduledoc(filename), docstring)
+
+    def test_missing_file(self):
+        filename = os.path.join(self.path, 'missing.py')
+        self.assertEqual(inspection.getmoduledoc(filename), None)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,95 @@
+import inspect
+import linecache
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from bpython.interpreter import BPythonInterpreter
+
+
+class TestCommands(unittest.TestCase):
+    def setUp(self):
+        self.interp = BPythonInterpreter({'x': 42})
+        self.calls = []
+        self.interp.register_command('%spam', self.calls.append)
+        self.interp.register_command('%eggs', self.calls.append, raw=True)
+
+    def test_command(self):
+        self.interp.runcommand('%spam x')
+        self.assertEqual(self.calls, [42])
+
+    def test_raw_command(self):
+        line = '%eggs  x = [i for i in "a b"]  '
+        self.assertTrue(self.interp.is_commandline(line))
+        self.assertEqual(self.interp.get_command_spec(line)[0], '%eggs')
+        self.interp.runcommand(line)
+        self.assertEqual(self.calls, ['x = [i for i in "a b"]'])
+
+    def test_not_a_command(self):
+        self.assertFalse(self.interp.is_commandline('%eggsx = 1'))
+
+    def test_commands_are_not_inputs(self):
+        self.interp.runcommand('%spam x')
+        self.interp.runcommand('%eggs spam')
+        self.assertEqual(self.interp.inputs, 0)
+
+    def test_raw_command_result(self):
+        self.interp.register_command('%ham', lambda line: [line] * 2,
+                                     raw=True)
+        shown = []
+        displayhook = sys.displayhook
+        sys.displayhook = shown.append
+        try:
+            self.interp.runcommand('%ham spam')
+            self.interp.runcommand('%eggs spam')
+        finally:
+            sys.displayhook = displayhook
+        # Commands returning None show nothing
+        self.assertEqual(shown, [['spam', 'spam']])
+
+    def test_raw_command_error(self):
+        errors = []
+        self.interp.write = errors.append
+        self.interp.register_command('%fail', lambda line: 1 / 0, raw=True)
+        self.interp.runcommand('%fail spam')
+        self.assertTrue(errors[-1].startswith('ZeroDivisionError'))
+
+
+class TestSource(unittest.TestCase):
+    def test_getsource(self):
+        interp = BPythonInterpreter({})
+        interp.runsource('def spam():')
+        interp.runsource('def spam():\n    return 42\n')
+        interp.runsource('def eggs(): pass\n')
+        spam = interp.locals['spam']
+        eggs = interp.locals['eggs']
+        self.assertEqual(inspect.getsource(spam),
+                         'def spam():\n    return 42\n')
+        self.assertNotEqual(spam.__code__.co_filename,
+                            eggs.__code__.co_filename)
+
+    def test_files_are_not_cached(self):
+        path = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(path, 'rc.py')
+            with open(filename, 'w') as f:
+                f.write('def spam():\n    pass\n')
+            interp = BPythonInterpreter({})
+            with open(filename) as f:
+                interp.runsource(f.read(), filename, 'exec')
+            self.assertFalse(filename in linecache.cache)
+            self.assertEqual(interp.inputs, 0)
+            # Changes to the file are seen
+            with open(filename, 'w') as f:
+                f.write('def spam():\n    return 42\n')
+            self.assertEqual(inspect.getsource(interp.locals['spam']),
+                             'def spam():\n    return 42\n')
+        finally:
+            linecache.checkcache()
+            shutil.rmtree(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+
+import bpython
+from bpython.completion.completers import get_item_completer
+from six import PY3
+
+
+def indices(words):
+    return [int(word[:-1]) for word in words]
+
+
+class TestItemCompletion(unittest.TestCase):
+    def setUp(self):
+        get_item_completer.clear_cache()
+
+    def tearDown(self):
+        get_item_completer.clear_cache()
+
+    def complete_indices(self, length, attr):
+        pattern = get_item_completer.compile_pattern(attr)
+        return get_item_completer.complete_indices(length, attr, pattern)
+
+    def test_complete_indices(self):
+        for attr in ['', '1', '05', '12]', '0']:
+            pattern = get_item_completer.compile_pattern(attr)
+            expected = [i for i in range(3000)
+                        if pattern.search('%d]' % (i, ))]
+            matches, is_complete = self.complete_indices(3000, attr)
+            self.assertEqual(indices(matches),
+                             expected[:get_item_completer.MAX_MATCHES])
+            self.assertEqual(is_complete,
+                             len(expected) <= get_item_completer.MAX_MATCHES)
+
+    def test_complete_indices_of_huge_sequence(self):
+        matches, is_complete = self.complete_indices(10 ** 9, '123456')
+        self.assertFalse(is_complete)
+        self.assertEqual(indices(matches)[:3], [123456, 1234560, 1234561])
+
+    def test_complete_keys(self):
+        obj = dict(('spam%d' % (i, ), i) for i in range(1000))
+        obj[42] = 'not a string'
+        pattern = get_item_completer.compile_pattern('spam99')
+        matches, is_complete = get_item_completer.complete_keys(obj, pattern)
+        self.assertTrue(is_complete)
+        self.assertEqual(matches, sorted('"%s"]' % (key, ) for key in obj
+                                         if isinstance(key, str) and
+                                         pattern.search(key)))
+        self.assertTrue('"spam990"]' in matches)
+
+    def test_complete_keys_is_bounded(self):
+        obj = dict(('spam%d' % (i, ), i) for i in range(1000))
+        pattern = get_item_completer.compile_pattern('')
+        matches, is_complete = get_item_completer.complete_keys(obj, pattern)
+        self.assertFalse(is_complete)
+        self.assertEqual(len(matches), get_item_completer.MAX_MATCHES)
+        self.assertEqual(matches, sorted(matches))
+
+    def test_cache(self):
+        locals_ = dict(spam={'eggs': 1, 'bacon': 2})
+        self.assertEqual(get_item_completer.complete('spam', 'e', locals_),
+                         ['"eggs"]'])
+        locals_['spam'] = {}
+        self.assertEqual(get_item_completer.complete('spam', 'eg', locals_),
+                         ['"eggs"]'])
+        get_item_completer.clear_cache()
+        self.assertEqual(get_item_completer.complete('spam', 'eg', locals_),
+                         [])
+
+    def test_no_cache_while_running_in_background(self):
+        class App(object):
+            background = set(['job'])
+
+        locals_ = dict(spam={'eggs': 1})
+        running = bpython.running
+        bpython.running = App()
+        try:
+            self.assertEqual(get_item_completer.complete('spam', 'e', locals_),
+                             ['"eggs"]'])
+            locals_['spam']['eel'] = 2
+            self.assertEqual(get_item_completer.complete('spam', 'e', locals_),
+                             ['"eel"]', '"eggs"]'])
+        finally:
+            bpython.running = running
+        self.assertFalse('spam' in get_item_completer._cache)
+
+    def test_undecodable_bytes_key(self):
+        if not PY3:
+            return
+        word = get_item_completer.key_wrap(b'\xff\xfe')
+        self.assertTrue(word.startswith('b"') and word.endswith('"]'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,210 @@
+import os
+import sys
+import unittest
+
+from bpython import cli, screen
+from bpython.test import fake_app
+from six.moves import queue
+
+fake_app.install()
+from plugins import jobs
+fake_app.uninstall()
+
+
+# Seconds to wait at most for a job that should finish at once
+TIMEOUT = 10
+
+
+class TestJobs(unittest.TestCase):
+    def setUp(self):
+        self.app = fake_app.install({'spinning': True})
+        self.namespace = self.app.interpreter.locals
+
+    def tearDown(self):
+        # Let jobs left running end
+        self.namespace['spinning'] = False
+        for job in jobs.table.values():
+            job.done.wait(TIMEOUT)
+        jobs.table.clear()
+        fake_app.uninstall()
+
+    def run_command(self, command, *args):
+        with fake_app.captured_stdout() as output:
+            command(*args)
+        return output.getvalue()
+
+    def start(self, line):
+        output = self.run_command(jobs.bg, line)
+        job = jobs.table[len(jobs.table)]
+        self.assertEqual(output, 'Job %d started.\n' % (job.number, ))
+        return job
+
+    def finish(self, line):
+        job = self.start(line)
+        self.assertTrue(job.done.wait(TIMEOUT))
+        return job
+
+    def test_statement(self):
+        job = self.finish('spam = 6 * 7')
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(self.namespace['spam'], 42)
+        self.assertEqual(job.result, None)
+
+    def test_expression(self):
+        job = self.finish('6 * 7')
+        self.assertEqual((job.status, job.result), ('done', 42))
+
+    def test_lifetime(self):
+        job = self.start('while spinning: pass')
+        self.assertEqual(job.status, 'running')
+        self.assertEqual(self.app.background, set([job]))
+        self.namespace['spinning'] = False
+        self.assertTrue(job.done.wait(TIMEOUT))
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(self.app.background, set())
+        self.assertTrue(job.finished >= job.started)
+        self.assertEqual(len(self.app.notifications), 1)
+        self.assertTrue(self.app.notifications[0].startswith(
+            'Job 1 done after '))
+        self.assertTrue(self.app.notifications[0].endswith(
+            ': while spinning: pass'))
+
+    def test_failure(self):
+        job = self.finish('1 / 0')
+        self.assertEqual(job.status, 'failed')
+        self.assertTrue(job.error.startswith('Traceback'))
+        self.assertTrue(job.error.splitlines()[-1].startswith(
+            'ZeroDivisionError'))
+        # The traceback starts at the statement
+        self.assertTrue('File "<job-1>", line 1' in job.error)
+        self.assertFalse('run_thread' in job.error)
+
+    def test_output(self):
+        stdout, stderr = sys.stdout, sys.stderr
+        with fake_app.captured_stdout() as output:
+            jobs.bg('import sys; print("spam"); sys.stderr.write("eggs\\n")')
+            job = jobs.table[1]
+            self.assertTrue(job.done.wait(TIMEOUT))
+            print('ham')
+            # Once the last job ended, the streams are the REPL's again
+            self.assertTrue(sys.stdout is output)
+        self.assertEqual(job.output.getvalue(), 'spam\neggs\n')
+        self.assertEqual(output.getvalue(), 'Job 1 started.\nham\n')
+        self.assertTrue(sys.stdout is stdout)
+        self.assertTrue(sys.stderr is stderr)
+        self.assertEqual(jobs.JobStream.users, 0)
+
+    def test_output_of_several_jobs(self):
+        with fake_app.captured_stdout() as output:
+            jobs.bg('while spinning: pass')
+            jobs.bg('print("spam")')
+            (first, second) = jobs.table.values()
+            self.assertTrue(second.done.wait(TIMEOUT))
+            # The first job still writes to its own output
+            self.assertTrue(isinstance(sys.stdout, jobs.JobStream))
+            self.namespace['spinning'] = False
+            self.assertTrue(first.done.wait(TIMEOUT))
+            self.assertTrue(sys.stdout is output)
+        self.assertEqual(second.output.getvalue(), 'spam\n')
+
+    def test_kill(self):
+        job = self.start('while spinning: pass')
+        self.assertEqual(self.run_command(jobs.kill, '1'), '')
+        self.assertTrue(job.done.wait(TIMEOUT))
+        self.assertEqual(job.status, 'killed')
+        self.assertEqual(self.run_command(jobs.kill, '1'),
+                         'Job 1 is not running.\n')
+
+    def test_kill_usage(self):
+        self.assertEqual(self.run_command(jobs.kill, ''),
+                         'Usage: %kill job ...\n')
+        self.assertEqual(self.run_command(jobs.kill, '3'), 'No job 3.\n')
+
+    def test_jobs(self):
+        self.assertEqual(self.run_command(jobs.jobs), 'No jobs.\n')
+        self.finish('print("spam")')
+        lines = self.run_command(jobs.jobs).splitlines()
+        self.assertEqual(lines[0].split(), ['Job', 'Status', 'Runs', 'on',
+                                            'Elapsed', 'Output',
+                                            'Statement'])
+        self.assertEqual(lines[1].split()[:3], ['1', 'done', 'thread'])
+        self.assertEqual(lines[1].split()[4:], ['5', 'print("spam")'])
+
+    def test_wait(self):
+        screen.install()
+        self.app.clirepl = lambda: None
+        self.app.clirepl.scr = screen.initscr()
+        try:
+            self.finish('print("spam"); 6 * 7')
+            self.finish('6 * 7')
+            lines = self.run_command(jobs.wait).splitlines()
+        finally:
+            screen.uninstall()
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[0].startswith('Job 1 done after '))
+        # Statements have no result to show
+        self.assertEqual(lines[1], 'spam')
+        self.assertTrue(lines[2].startswith('Job 2 done after '))
+        self.assertEqual(lines[3], '42')
+
+    @unittest.skipIf(not hasattr(os, 'fork'), 'needs os.fork()')
+    def test_process(self):
+        job = self.finish('-p print("spam"); spam = 42')
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(job.output.getvalue(), 'spam\n')
+        # Processes work on a copy of the namespace
+        self.assertFalse('spam' in self.namespace)
+
+
+class FakeCaller(object):
+    paste_mode = False
+
+    def __init__(self):
+        self.scr = screen.initscr()
+
+    def check(self):
+        pass
+
+
+class TestNotifyLater(unittest.TestCase):
+    """App.idle() shows what other threads notify, and polls for it while
+    work runs in the background."""
+
+    notify_later = cli.App.__dict__['notify_later']
+
+    def setUp(self):
+        screen.install()
+        self.app = cli.app
+        cli.app = self
+        self.notifications = queue.Queue()
+        self.background = set()
+        self.shown = []
+        self.clirepl = lambda: None
+        self.clirepl.interact = lambda: None
+        self.clirepl.interact.notify = self.shown.append
+        self.statusbar = FakeCaller()
+        self.caller = FakeCaller()
+
+    def tearDown(self):
+        cli.app = self.app
+        screen.uninstall()
+
+    def test_notifications(self):
+        self.notify_later('spam')
+        self.notify_later('eggs')
+        self.assertEqual(self.shown, [])
+        cli.App.idle(self.caller)
+        self.assertEqual(self.shown, ['spam', 'eggs'])
+        cli.App.idle(self.caller)
+        self.assertEqual(self.shown, ['spam', 'eggs'])
+
+    def test_polling(self):
+        cli.App.idle(self.caller)
+        self.assertEqual(self.caller.scr.delay, -1)
+        self.background.add('job')
+        cli.App.idle(self.caller)
+        self.assertEqual(self.caller.scr.delay, cli.App.POLL_TIME)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import curses
+import os
+import shutil
+import tempfile
+import unittest
+
+from bpython import screen
+from bpython.key import keymap
+
+
+def keyname(code):
+    return screen.keyname(code).decode('ascii')
+
+
+class TestKeymap(unittest.TestCase):
+    def setUp(self):
+        self.keymap = keymap.build(keyname)
+
+    def test_characters(self):
+        self.assertEqual(self.keymap.codes['a'], ord('a'))
+        self.assertEqual(self.keymap.names[1], '\x01')
+        self.assertEqual(self.keymap.names[226], 'M-b')
+        self.assertFalse(u'\xe2' in self.keymap.codes)
+
+    def test_aliases(self):
+        codes = self.keymap.codes
+        for name in ['C-a', 'c-a', 'C-A', '^A']:
+            self.assertEqual(codes[name], 1)
+        for name in ['M-^A', 'M-C-A', 'm-c-a']:
+            self.assertEqual(codes[name], 129)
+        self.assertEqual(codes['M-b'], 226)
+        self.assertEqual(codes['m-b'], 226)
+        self.assertEqual(codes['F2'], curses.KEY_F0 + 2)
+        self.assertEqual(codes['S-F1'], curses.KEY_F0 + 13)
+        self.assertEqual(codes['up'], curses.KEY_UP)
+        self.assertEqual(codes['ESC'], 27)
+        self.assertEqual(codes['M-ESC'], 27 + 128)
+
+    def test_meta(self):
+        self.assertEqual(self.keymap.meta('b'), 'M-b')
+        self.assertEqual(self.keymap.meta('\x7f'), 'M-^?')
+        self.assertEqual(self.keymap.meta('KEY_UP'), 'M-KEY_UP')
+
+    def test_unknown_names(self):
+        code = self.keymap.code('PADENTER')
+        self.assertTrue(code > curses.KEY_MAX)
+        self.assertEqual(self.keymap.code('PADENTER'), code)
+        self.assertEqual(self.keymap.names[code], 'PADENTER')
+        self.assertNotEqual(self.keymap.code('PADPLUS'), code)
+
+
+class TestKeymapCache(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.cache_path = os.path.join(self.path, 'cache', 'keymap.cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_cache_roundtrip(self):
+        built = keymap.build(keyname)
+        keymap.save_cache(built, self.cache_path)
+        loaded = keymap.load_cache(self.cache_path)
+        self.assertEqual(loaded.codes, built.codes)
+        self.assertEqual(loaded.names, built.names)
+
+    def test_missing_cache(self):
+        self.assertEqual(keymap.load_cache(self.cache_path), None)
+
+
+if __name__ == '__main__':
+    unittest.main()
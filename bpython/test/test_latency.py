@@ -0,0 +1,97 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from bpython import latency
+
+
+class TestRecorder(unittest.TestCase):
+    def setUp(self):
+        self.recorder = latency.Recorder()
+
+    def test_span(self):
+        with self.recorder.span('spam'):
+            pass
+        self.assertEqual(self.recorder.histograms['spam'].count, 1)
+        self.assertEqual(self.recorder.last, None)
+
+    def test_keystroke(self):
+        with self.recorder.keystroke():
+            for _ in range(3):
+                with self.recorder.span('spam'):
+                    pass
+            with self.recorder.keystroke():
+                with self.recorder.span('eggs'):
+                    pass
+        self.assertEqual(self.recorder.keystrokes, 1)
+        duration, breakdown = self.recorder.last
+        self.assertEqual(list(breakdown), ['spam', 'eggs'])
+        self.assertEqual(breakdown['spam'][1], 3)
+        self.assertTrue(self.recorder.format_last().startswith('key '))
+
+    def test_keystroke_exception(self):
+        try:
+            with self.recorder.keystroke():
+                raise ValueError
+        except ValueError:
+            pass
+        self.assertEqual(self.recorder.depth, 0)
+        self.assertEqual(self.recorder.keystrokes, 1)
+
+
+class TestTrace(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.filename = os.path.join(self.path, 'trace.json')
+        self.recorder = latency.Recorder()
+        self.recorder.start_trace(self.filename)
+
+    def tearDown(self):
+        self.recorder.stop_trace()
+        shutil.rmtree(self.path)
+
+    def load(self):
+        with open(self.filename) as f:
+            return json.load(f)
+
+    def test_trace(self):
+        with self.recorder.keystroke():
+            with self.recorder.span('spam'):
+                pass
+        self.recorder.trace('eggs', 0, 0.5, pid=42)
+        self.recorder.stop_trace()
+
+        events = self.load()
+        self.assertEqual([event['name'] for event in events],
+                         ['process_name', 'spam', 'key', 'eggs'])
+        spam, key, eggs = events[1:]
+        self.assertTrue(key['ts'] <= spam['ts'])
+        self.assertTrue(key['dur'] >= spam['dur'])
+        self.assertEqual((eggs['pid'], eggs['dur']), (42, 0.5e6))
+
+    def test_incomplete_trace(self):
+        with self.recorder.keystroke():
+            pass
+        with open(self.filename) as f:
+            events = json.loads(f.read() + ']')
+        self.assertEqual(events[-1]['name'], 'key')
+
+
+class TestHistogram(unittest.TestCase):
+    def test_percentile(self):
+        histogram = latency.Histogram(size=100)
+        for i in range(200):
+            histogram.add(i)
+        self.assertEqual(histogram.count, 200)
+        self.assertEqual(histogram.percentile(0), 100)
+        self.assertEqual(histogram.percentile(50), 150)
+        self.assertEqual(histogram.percentile(100), 199)
+
+    def test_empty(self):
+        self.assertEqual(latency.Histogram().percentile(99), 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+
+from bpython import cli, repl
+
+
+def make_list_box(items, rows=4, width=20):
+    list_box = cli.ListBox(None, None)
+    list_box.items = items
+    list_box.max_w = width
+    list_box.max_h = rows + 1
+    list_box.height_offset = 1
+    # Nothing to draw on
+    list_box._show_v_items = lambda: None
+    return list_box
+
+
+class TestGetPage(unittest.TestCase):
+    def pages(self, n, size):
+        list_box = make_list_box(['item%d' % (i, ) for i in range(n)])
+        pages = []
+        for index in [-1] + list(range(n)):
+            list_box.index = index
+            start, stop = list_box._get_page(size)
+            if index >= 0:
+                self.assertTrue(start <= index < stop)
+            # Items and '...' markers fit into the page
+            markers = (1 if start else 0) + (1 if stop < n else 0)
+            self.assertTrue(stop - start + markers <= max(size, 3))
+            if (start, stop) not in pages:
+                pages.append((start, stop))
+        return pages
+
+    def test_short_list(self):
+        self.assertEqual(self.pages(5, 8), [(0, 5)])
+        self.assertEqual(self.pages(8, 8), [(0, 8)])
+
+    def test_no_index(self):
+        list_box = make_list_box(['item%d' % (i, ) for i in range(20)])
+        list_box.index = -1
+        self.assertEqual(list_box._get_page(8), (0, 7))
+
+    def test_pages_tile_the_list(self):
+        for n in [9, 10, 13, 14, 15, 30, 31]:
+            pages = self.pages(n, 8)
+            self.assertEqual(pages[0][0], 0)
+            self.assertEqual(pages[-1][1], n)
+            for (previous, page) in zip(pages, pages[1:]):
+                self.assertEqual(previous[1], page[0])
+
+    def test_last_page(self):
+        # The last page takes up to one item more, as it needs no marker
+        self.assertEqual(self.pages(13, 8), [(0, 7), (7, 13)])
+        self.assertEqual(self.pages(14, 8), [(0, 7), (7, 14)])
+        self.assertEqual(self.pages(15, 8), [(0, 7), (7, 13), (13, 15)])
+
+    def test_tiny_page(self):
+        self.assertEqual(self.pages(4, 1)[0], (0, 1))
+
+
+class TestNextPage(unittest.TestCase):
+    def setUp(self):
+        self.matches_iter = repl.MatchesIterator()
+
+    def test_single_page(self):
+        list_box = make_list_box(['spam', 'eggs'])
+        list_box.sync(self.matches_iter)
+        list_box._prepare_v_items()
+        self.assertEqual(list_box.v_items, ['spam', 'eggs'])
+        list_box.next_page(self.matches_iter)
+        self.assertEqual(self.matches_iter.index, -1)
+        self.assertFalse(self.matches_iter.is_wait)
+
+    def test_several_pages(self):
+        items = ['item%02d' % (i, ) for i in range(40)]
+        list_box = make_list_box(items, rows=2, width=24)
+        list_box.sync(self.matches_iter)
+        list_box._prepare_v_items()
+        self.assertEqual(list_box.v_items[-1], '...')
+
+        seen = list(list_box.v_items[:-1])
+        while list_box.v_items[-1] == '...':
+            list_box.next_page(self.matches_iter)
+            self.assertTrue(self.matches_iter.is_wait)
+            self.assertEqual(list_box.v_items[0], '...')
+            self.assertEqual(list_box.v_items[1],
+                             items[self.matches_iter.index])
+            seen.extend(item for item in list_box.v_items if item != '...')
+        self.assertEqual(seen, items)
+
+        # The last page has nothing after it
+        index = self.matches_iter.index
+        list_box.next_page(self.matches_iter)
+        self.assertEqual(self.matches_iter.index, index)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import unittest
+
+from bpython.test import fake_app
+
+fake_app.install()
+from plugins import memory
+from plugins.helpers import format_size
+fake_app.uninstall()
+
+tracemalloc = memory.tracemalloc
+
+
+class TestFormatSize(unittest.TestCase):
+    def test_units(self):
+        self.assertEqual(format_size(10), '10 B')
+        self.assertEqual(format_size(1536), '1.5 KiB')
+        self.assertEqual(format_size(-3 * 1024 ** 2), '-3.0 MiB')
+        self.assertEqual(format_size(5 * 1024 ** 3), '5.0 GiB')
+
+
+@unittest.skipIf(tracemalloc is None, 'tracemalloc is not available')
+class TestMemory(unittest.TestCase):
+    def setUp(self):
+        self.app = fake_app.install()
+        self.pages = []
+        self.page = memory.page
+        memory.page = self.pages.append
+
+    def tearDown(self):
+        memory.page = self.page
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        memory.last_snapshot = None
+        fake_app.uninstall()
+
+    def run_input(self, source):
+        self.app.interpreter.runsource(source, symbol='exec')
+
+    def test_memit(self):
+        memory.memit('-l 5 spam = [None] * 100000')
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertEqual(len(self.app.interpreter.locals['spam']), 100000)
+        lines = self.pages[0].splitlines()
+        # peak: 781.3 KiB, net: 781.3 KiB
+        self.assertEqual(lines[0].split()[::3], ['peak:', 'net:'])
+        peak = float(lines[0].split()[1])
+        self.assertTrue(700 < peak < 1000, lines[0])
+        self.assertEqual(lines[1], '')
+        self.assertTrue(lines[2].startswith('<input>:1: size=781 KiB'),
+                        lines[2])
+
+    def test_memit_keeps_tracing(self):
+        tracemalloc.start()
+        memory.memit('spam = 1')
+        self.assertTrue(tracemalloc.is_tracing())
+
+    def test_memit_usage(self):
+        with fake_app.captured_stdout() as output:
+            memory.memit('-l 5 ')
+        self.assertEqual(output.getvalue(),
+                         'Usage: %memit [-l limit] statement\n')
+
+    def test_heap_bad_grouping(self):
+        with fake_app.captured_stdout() as output:
+            memory.heap('-g spam')
+        self.assertEqual(output.getvalue(), 'Usage: %heap [-l limit] '
+                         '[-g lineno|filename|traceback]\n')
+        # Tracing isn't started either
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_heap(self):
+        with fake_app.captured_stdout() as output:
+            memory.heap('')
+        self.assertTrue(output.getvalue().startswith('Tracing allocations '
+                                                     'from now on'))
+        self.assertTrue(tracemalloc.is_tracing())
+        self.assertEqual(self.pages, [])
+
+        self.run_input('spam = [None] * 100000\n')
+        memory.heap('')
+        lines = self.pages[0].splitlines()
+        self.assertTrue(lines[0].startswith('traced: '))
+        self.assertEqual(lines[1:3], ['', 'Top allocation sites:'])
+        self.assertTrue(lines[3].startswith('<input-1>:1: size=781 KiB'),
+                        lines[3])
+        self.assertEqual(lines[4], '    spam = [None] * 100000')
+        self.assertFalse('Changes since the last %heap:' in lines)
+
+        self.run_input('eggs = [None] * 200000\n')
+        memory.heap('-l 1 -g filename')
+        lines = self.pages[1].splitlines()
+        self.assertEqual(lines[3].split(':')[0], '<input-2>')
+        changes = lines.index('Changes since the last %heap:')
+        self.assertTrue(lines[changes + 1].startswith('<input-2>:0: '
+                                                      'size=156'),
+                        lines[changes + 1])
+        self.assertTrue(' (+156' in lines[changes + 1])
+        self.assertTrue(lines[changes + 2].startswith('... and '))
+
+        memory.heap_stop()
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertEqual(memory.last_snapshot, None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+import mmap
+import sys
+import unittest
+
+from bpython.test import fake_app
+
+fake_app.install()
+from plugins import namespace
+fake_app.uninstall()
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class ndarray(object):
+    """Looks like a numpy array to the size handlers."""
+
+    __module__ = 'numpy'
+
+    def __init__(self, nbytes, base=None):
+        self.nbytes = nbytes
+        self.base = base
+
+
+class TestDeepSize(unittest.TestCase):
+    def test_containers(self):
+        inner = [1.5, 2.5]
+        outer = [inner, inner, 'spam']
+        expected = (sys.getsizeof(outer, 0) + sys.getsizeof(inner, 0) +
+                    2 * sys.getsizeof(1.5) + sys.getsizeof('spam'))
+        self.assertEqual(namespace.deep_size(outer), (expected, True))
+
+    def test_cycle(self):
+        spam = []
+        spam.append(spam)
+        self.assertEqual(namespace.deep_size(spam),
+                         (sys.getsizeof(spam, 0), True))
+
+    def test_deep_nesting(self):
+        spam = []
+        for _ in range(100000):
+            spam = [spam]
+        size, complete = namespace.deep_size(spam, time_limit=60)
+        self.assertTrue(complete)
+        self.assertEqual(size, 100000 * sys.getsizeof([[]], 0) +
+                         sys.getsizeof([], 0))
+
+    def test_time_limit(self):
+        spam = [[i] for i in range(5000)]
+        size, complete = namespace.deep_size(spam, time_limit=0)
+        self.assertFalse(complete)
+        self.assertTrue(0 < size < namespace.deep_size(spam)[0])
+
+    def test_not_traversed(self):
+        # Functions and classes are shared, not charged to a variable
+        spam = [unittest, len, namespace.deep_size, TestDeepSize]
+        self.assertEqual(namespace.deep_size(spam),
+                         (sys.getsizeof(spam, 0), True))
+
+    def test_memoryview(self):
+        data = b'x' * 10000
+        view = memoryview(data)
+        self.assertEqual(namespace.deep_size(view),
+                         (sys.getsizeof(view, 0) + sys.getsizeof(data), True))
+
+    def test_mmap(self):
+        data = mmap.mmap(-1, 4096)
+        try:
+            self.assertEqual(namespace.deep_size(data),
+                             (sys.getsizeof(data, 0) + 4096, True))
+        finally:
+            data.close()
+
+    def test_array_handler(self):
+        owner = ndarray(800)
+        view = ndarray(400, base=owner)
+        self.assertEqual(namespace.size_and_referents(owner),
+                         (sys.getsizeof(owner, 0) + 800, []))
+        self.assertEqual(namespace.size_and_referents(view),
+                         (sys.getsizeof(view, 0), [owner]))
+
+    @unittest.skipIf(numpy is None, 'numpy is not available')
+    def test_numpy(self):
+        array = numpy.zeros(1000)
+        size, complete = namespace.deep_size(array[10:])
+        self.assertTrue(complete)
+        self.assertTrue(size >= array.nbytes)
+        self.assertEqual(size, namespace.deep_size(array)[0] +
+                         sys.getsizeof(array[10:], 0))
+
+
+class TestWho(unittest.TestCase):
+    def setUp(self):
+        self.app = fake_app.install()
+        self.app.interpreter.runsource(
+            'import os\n'
+            'from os.path import join\n'
+            '_hidden = 1\n'
+            'spam = [[1, 2], [3, 4]]\n'
+            'eggs = "eggs"\n'
+            'ham = {}\n', symbol='exec')
+        self.app.interpreter.locals['len'] = len
+        self.pages = []
+        self.page = namespace.page
+        namespace.page = self.pages.append
+
+    def tearDown(self):
+        namespace.page = self.page
+        fake_app.uninstall()
+
+    def run_command(self, command, line=''):
+        with fake_app.captured_stdout() as output:
+            command(line)
+        return output.getvalue()
+
+    def test_who(self):
+        self.assertEqual(self.run_command(namespace.who), '')
+        self.assertEqual(self.pages, ['eggs  ham  join  spam\n'])
+
+    def test_who_types(self):
+        self.run_command(namespace.who, 'list dict')
+        self.assertEqual(self.pages, ['ham  spam\n'])
+
+    def test_no_variables(self):
+        self.assertEqual(self.run_command(namespace.who, 'set'),
+                         'No variables.\n')
+        self.assertEqual(self.run_command(namespace.whos, 'set'),
+                         'No variables.\n')
+        self.assertEqual(self.pages, [])
+
+    def test_whos(self):
+        self.run_command(namespace.whos)
+        lines = self.pages[0].splitlines()
+        self.assertEqual(lines[0].split(), ['Variable', 'Type', 'Size',
+                                            'Deep', 'size', 'Data'])
+        self.assertEqual([line.split()[:2] for line in lines[2:]],
+                         [['eggs', 'str'], ['ham', 'dict'],
+                          ['join', 'function'], ['spam', 'list']])
+        self.assertTrue(lines[-1].endswith('[[1, 2], [3, 4]]'))
+
+    def test_whos_sort(self):
+        self.run_command(namespace.whos, '-s deep list str')
+        lines = self.pages[0].splitlines()
+        self.assertEqual([line.split()[0] for line in lines[2:]],
+                         ['spam', 'eggs'])
+        self.run_command(namespace.whos, '-s type')
+        lines = self.pages[1].splitlines()
+        self.assertEqual([line.split()[1] for line in lines[2:]],
+                         ['dict', 'function', 'list', 'str'])
+
+    def test_unknown_sort_key(self):
+        self.assertEqual(self.run_command(namespace.whos, '-s spam'),
+                         'Unknown sort key spam, use one of: deep, name, '
+                         'size, type\n')
+        self.assertEqual(self.pages, [])
+
+    def test_incomplete_deep_size(self):
+        deep_size = namespace.deep_size
+        namespace.deep_size = lambda obj: deep_size(obj, time_limit=0)
+        self.app.interpreter.locals['spam'] = [[i] for i in range(5000)]
+        try:
+            self.run_command(namespace.whos, 'list')
+        finally:
+            namespace.deep_size = deep_size
+        # The deep size is only a lower bound
+        self.assertTrue(' >' in self.pages[0].splitlines()[2])
+
+
+if __name__ == '__main__':
+    unittest.main()
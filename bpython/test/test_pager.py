@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from bpython import pager, screen
+
+
+# Copies the data paged to the file given
+PAGER = """
+import shutil, sys
+stdin = getattr(sys.stdin, 'buffer', sys.stdin)
+with open(sys.argv[1], 'wb') as f:
+    shutil.copyfileobj(stdin, f)
+"""
+
+
+class TestPage(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.output = os.path.join(self.path, 'paged')
+        script = os.path.join(self.path, 'pager.py')
+        with open(script, 'w') as f:
+            f.write(PAGER)
+        self.environ = os.environ.get('PAGER')
+        os.environ['PAGER'] = ' '.join([sys.executable, script, self.output])
+        screen.install()
+
+    def tearDown(self):
+        screen.uninstall()
+        if self.environ is None:
+            del os.environ['PAGER']
+        else:
+            os.environ['PAGER'] = self.environ
+        shutil.rmtree(self.path)
+
+    def paged(self):
+        with open(self.output, 'rb') as f:
+            return f.read()
+
+    def test_text(self):
+        pager.page(u'sp\xe4m\n')
+        encoding = sys.__stdout__.encoding or 'utf-8'
+        self.assertEqual(self.paged(),
+                         u'sp\xe4m\n'.encode(encoding, 'replace'))
+
+    def test_bytes(self):
+        pager.page(b'spam\xff\n')
+        self.assertEqual(self.paged(), b'spam\xff\n')
+
+    def test_missing_pager(self):
+        os.environ['PAGER'] = os.path.join(self.path, 'no-such-pager')
+        output = []
+        page_internal = pager.page_internal
+        pager.page_internal = output.append
+        try:
+            pager.page(u'spam')
+        finally:
+            pager.page_internal = page_internal
+        self.assertEqual(output, [u'spam'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+import pickle
+import sys
+import threading
+import unittest
+
+from bpython import parallel, screen
+from bpython._py3compat import PY3
+from bpython.test import fake_app
+
+
+SOURCE = """
+import math
+
+k = 10
+
+def f(x):
+    return g(x) + math.floor(x)
+
+g = lambda x: x * k
+
+def counter(start):
+    def count(x):
+        return start + x
+    return count
+"""
+
+
+# Keyword-only arguments and annotations are Python 3 syntax
+SOURCE_PY3 = """
+class Spam(object):
+    pass
+
+def h(x, *, k=1) -> Spam:
+    return x * k
+
+def annotated(x: int, y: 'eggs' = 2) -> g:
+    return g(x) + y
+"""
+
+
+def interactive(source=''):
+    """Return a namespace like the REPL's, whose functions don't pickle."""
+    namespace = {'__name__': '__main__'}
+    exec(compile(SOURCE + source, '<input>', 'exec'), namespace)
+    return namespace
+
+
+def roundtrip(func):
+    data = pickle.loads(pickle.dumps(parallel.dump_function(func)))
+    return parallel.load_function(data)
+
+
+class TestShipping(unittest.TestCase):
+    def test_globals(self):
+        f = roundtrip(interactive()['f'])
+        self.assertEqual(f(2), 22)
+        self.assertEqual(sorted(name for name in f.__globals__
+                                if not name.startswith('__')),
+                         ['g', 'k', 'math'])
+
+    def test_closure(self):
+        count = roundtrip(interactive()['counter'](5))
+        self.assertEqual(count(1), 6)
+
+    def test_attributes(self):
+        f = interactive()['f']
+        f.calls = 3
+        f.helper = interactive()['g']
+        f.lock = threading.Lock()
+        f = roundtrip(f)
+        self.assertEqual(f.calls, 3)
+        self.assertEqual(f.helper(2), 20)
+        # Attributes that don't pickle are left out
+        self.assertFalse(hasattr(f, 'lock'))
+
+    @unittest.skipIf(not PY3, 'needs Python 3 syntax')
+    def test_keyword_only_defaults(self):
+        h = roundtrip(interactive(SOURCE_PY3)['h'])
+        self.assertEqual(h(2), 2)
+        self.assertEqual(h(2, k=3), 6)
+
+    @unittest.skipIf(not PY3, 'needs Python 3 syntax')
+    def test_annotations(self):
+        namespace = interactive(SOURCE_PY3)
+        annotated = roundtrip(namespace['annotated'])
+        self.assertEqual(annotated(1), 12)
+        self.assertEqual(annotated.__annotations__['x'], int)
+        self.assertEqual(annotated.__annotations__['y'], 'eggs')
+        self.assertEqual(annotated.__annotations__['return'](1), 10)
+        # Classes of the REPL don't pickle, and are left out
+        self.assertEqual(roundtrip(namespace['h']).__annotations__, {})
+
+    def test_not_interactive(self):
+        self.assertEqual(parallel.dump_function(len),
+                         (('value', len), {}))
+
+
+class TestImap(unittest.TestCase):
+    def test_order(self):
+        pool, chunks = parallel.imap_chunks(interactive()['g'],
+                                            list(range(10)), 2, 3)
+        try:
+            results = [x for chunk in chunks for x in chunk]
+        finally:
+            pool.terminate()
+            pool.join()
+        self.assertEqual(results, [x * 10 for x in range(10)])
+
+    @unittest.skipIf(not PY3, 'needs Python 3 syntax')
+    def test_keyword_only_defaults(self):
+        pool, chunks = parallel.imap_chunks(interactive(SOURCE_PY3)['h'],
+                                            [1, 2], 1, 1)
+        try:
+            results = [x for chunk in chunks for x in chunk]
+        finally:
+            pool.terminate()
+            pool.join()
+        self.assertEqual(results, [1, 2])
+
+    def test_chunk_size(self):
+        self.assertEqual(parallel.chunk_size(100, 2), 13)
+        self.assertEqual(parallel.chunk_size(0, 4), 1)
+
+
+class FakeStatusbar(object):
+    def __init__(self):
+        self.progress_shown = []
+
+    def progress(self, done, total, s=''):
+        self.progress_shown.append((done, total, s))
+
+    def refresh(self):
+        pass
+
+
+class TestPmap(unittest.TestCase):
+    """Run %pmap as the REPL does, through the interpreter."""
+
+    def setUp(self):
+        self.app = fake_app.install(interactive())
+        screen.install()
+        self.app.clirepl = lambda: None
+        self.app.clirepl.scr = screen.initscr()
+        self.app.statusbar = FakeStatusbar()
+        from plugins import parallel as plugin
+        self.interp = self.app.interpreter
+        self.interp.register_command('%pmap', plugin.pmap, raw=True)
+        self.shown = []
+        self.displayhook = sys.displayhook
+        sys.displayhook = self.shown.append
+
+    def tearDown(self):
+        sys.displayhook = self.displayhook
+        screen.uninstall()
+        fake_app.uninstall()
+
+    def test_results_are_shown(self):
+        self.interp.runcommand('%pmap -n 2 -c 3 g range(10)')
+        self.assertEqual(self.shown, [[x * 10 for x in range(10)]])
+        self.assertEqual(self.app.statusbar.progress_shown[0],
+                         (0, 10, '%pmap '))
+
+    def test_usage(self):
+        with fake_app.captured_stdout() as output:
+            self.interp.runcommand('%pmap g')
+        self.assertTrue(output.getvalue().startswith('Usage: %pmap'))
+        self.assertEqual(self.shown, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
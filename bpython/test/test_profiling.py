@@ -0,0 +1,102 @@
+import os
+import pstats
+import shutil
+import tempfile
+import unittest
+
+from bpython.test import fake_app
+
+fake_app.install()
+from plugins import profiling
+fake_app.uninstall()
+
+
+SOURCE = """
+def spam(n):
+    return sum(eggs(i) for i in range(n))
+
+def eggs(i):
+    return i * 2
+"""
+
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self):
+        self.app = fake_app.install()
+        self.app.interpreter.runsource(SOURCE, symbol='exec')
+        self.pages = []
+        self.page = profiling.page
+        profiling.page = self.pages.append
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        profiling.page = self.page
+        profiling.last_stats = None
+        fake_app.uninstall()
+        shutil.rmtree(self.path)
+
+    def prun(self, line):
+        with fake_app.captured_stdout() as output:
+            profiling.prun(line)
+        return output.getvalue()
+
+    def test_prun(self):
+        self.assertEqual(self.prun('spam(10)'), '')
+        self.assertEqual(len(self.pages), 1)
+        self.assertTrue('Ordered by: cumulative time' in self.pages[0])
+        self.assertTrue('(eggs)' in self.pages[0])
+
+    def test_sort_key(self):
+        self.prun('-s ncalls spam(10)')
+        self.assertTrue('Ordered by: call count' in self.pages[0])
+        # The functions called most come first
+        lines = self.pages[0].splitlines()
+        header = [i for (i, l) in enumerate(lines) if 'ncalls' in l][0]
+        self.assertEqual(lines[header + 2].split()[0], '10')
+        self.assertTrue(lines[header + 2].endswith('(eggs)'))
+
+    def test_unknown_sort_key(self):
+        output = self.prun('-s spam spam(10)')
+        self.assertTrue(output.startswith('Unknown sort key spam, use one '
+                                          'of: '))
+        self.assertEqual(self.pages, [])
+        self.assertEqual(profiling.last_stats, None)
+
+    def test_limit(self):
+        self.prun('-l 1 spam(10)')
+        self.assertTrue('due to restriction <1>' in self.pages[0])
+
+    def test_dump(self):
+        filename = os.path.join(self.path, 'spam.pstats')
+        output = self.prun('-D %s spam(10)' % (filename, ))
+        self.assertEqual(output, 'Profile written to %s\n' % (filename, ))
+        functions = [name for (_, _, name) in pstats.Stats(filename).stats]
+        self.assertTrue('spam' in functions)
+        self.assertTrue('eggs' in functions)
+
+    def test_failing_statement(self):
+        self.assertRaises(ZeroDivisionError, self.prun, '1 / 0')
+        # What ran is still shown
+        self.assertEqual(len(self.pages), 1)
+
+    def test_usage(self):
+        self.assertTrue(self.prun('-s calls ').startswith('Usage: %prun'))
+
+    def test_callers(self):
+        with fake_app.captured_stdout() as output:
+            profiling.prun_callers('eggs')
+        self.assertEqual(output.getvalue(),
+                         'Nothing profiled yet, use %prun first.\n')
+
+        self.prun('spam(10)')
+        profiling.prun_callers('eggs')
+        callers = self.pages[-1]
+        self.assertTrue("restriction <'<input-1>:5\\\\(eggs\\\\)'>"
+                        in callers)
+        line = [l for l in callers.splitlines() if '<-' in l][0]
+        self.assertTrue(line.startswith('<input-1>:5(eggs)'))
+        self.assertTrue(line.endswith('<input-1>:3(<genexpr>)'))
+
+
+if __name__ == '__main__':
+    unittest.main()
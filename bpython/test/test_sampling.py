@@ -0,0 +1,139 @@
+import threading
+import unittest
+
+from bpython import screen
+from bpython.test import fake_app
+
+fake_app.install()
+from plugins import sampling
+fake_app.uninstall()
+
+
+SOURCE = """
+def wait(event):
+    event.wait()
+"""
+
+
+def make_code(name, filename='<input-1>'):
+    namespace = {}
+    exec(compile('def %s(): pass' % (name, ), filename, 'exec'), namespace)
+    return namespace[name].__code__
+
+
+class FakeRepl(object):
+    def __init__(self):
+        self.scr = self
+
+    def touchwin(self):
+        pass
+
+    def refresh(self):
+        pass
+
+
+class TestShowLive(unittest.TestCase):
+    def setUp(self):
+        self.app = fake_app.install()
+        sampling.sampler = sampling.Sampler()
+        # Sampled stacks with more functions than fit on the screen
+        for i in range(30):
+            stack = (make_code('spam'), make_code('eggs%d' % (i, )))
+            sampling.sampler.counts[('MainThread', stack)] = 30 - i
+        sampling.sampler.samples = 500
+
+    def tearDown(self):
+        sampling.sampler = None
+        screen.uninstall()
+        fake_app.uninstall()
+
+    def show(self, rows, columns=60):
+        self.screen = screen.install(rows, columns)
+        self.app.gethw = lambda: (rows, columns)
+        self.app.newwin = screen.newwin
+        # Keep what was shown, rather than redraw the REPL
+        self.app.clirepl = FakeRepl()
+        self.screen.feed('q')
+        sampling.show_live(sampling.LIMIT, sampling.REFRESH)
+        return self.screen.lines()
+
+    def test_fills_window(self):
+        lines = self.show(12)
+        self.assertTrue(lines[0].startswith('500 samples at 100 Hz, 465 '
+                                            'stacks, 1 threads'))
+        self.assertEqual(lines[2].split(), ['Self', 'Total', 'Function'])
+        self.assertTrue(lines[3].endswith('eggs0 (<input-1>:1)'))
+        self.assertTrue(lines[8].endswith('eggs5 (<input-1>:1)'))
+        self.assertEqual(lines[9:], ['', 'Press any key to return.', ''])
+
+    def test_limit(self):
+        lines = self.show(40)
+        self.assertEqual(lines[3 + sampling.LIMIT:3 + sampling.LIMIT + 2],
+                         ['', 'Press any key to return.'])
+
+    def test_tiny_screen(self):
+        lines = self.show(4)
+        self.assertEqual(len([line for line in lines if line]), 2)
+
+    def test_narrow_screen(self):
+        lines = self.show(12, 20)
+        self.assertTrue(all(len(line) < 20 for line in lines))
+
+
+class TestSampler(unittest.TestCase):
+    def test_thread_names(self):
+        namespace = {}
+        exec(compile(SOURCE, '<input-1>', 'exec'), namespace)
+        event = threading.Event()
+        thread = threading.Thread(target=namespace['wait'], args=(event, ),
+                                  name='spam')
+        thread.start()
+        try:
+            sampler = sampling.Sampler()
+            sampler.sample()
+        finally:
+            event.set()
+            thread.join()
+        (name, stack), = [key for key in sampler.counts
+                          if 'wait' in [code.co_name for code in key[1]]]
+        self.assertEqual(name, 'spam')
+        self.assertEqual(sampler.samples, 1)
+
+
+class TestTop(unittest.TestCase):
+    def setUp(self):
+        fake_app.install()
+
+    def tearDown(self):
+        sampling.top_stop()
+        fake_app.uninstall()
+
+    def test_bad_rate(self):
+        for line in ['-r 0', '-r -5', '-i 0']:
+            with fake_app.captured_stdout() as output:
+                sampling.top(line)
+            self.assertEqual(output.getvalue(), 'The rate and the refresh '
+                             'interval have to be above 0.\n')
+            self.assertEqual(sampling.sampler, None)
+
+    def test_options_before_sampling(self):
+        for line in ['-f stacks.txt', '-l 5 -i 2']:
+            with fake_app.captured_stdout() as output:
+                sampling.top(line)
+            self.assertTrue(output.getvalue().startswith('Nothing sampled '
+                                                         'yet'))
+            self.assertEqual(sampling.sampler, None)
+
+    def test_start_and_stop(self):
+        with fake_app.captured_stdout() as output:
+            sampling.top('-r 50')
+        self.assertTrue(output.getvalue().startswith('Sampling at 50 Hz'))
+        sampler = sampling.sampler
+        self.assertTrue(sampler.is_alive())
+        sampling.top_stop()
+        self.assertFalse(sampler.is_alive())
+        self.assertEqual(sampling.sampler, None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import curses
+import unittest
+
+from bpython import screen
+
+
+class TestWindow(unittest.TestCase):
+    def setUp(self):
+        self.screen = screen.Screen(5, 10)
+        self.win = screen.Window(self.screen, 4, 10, 0, 0)
+
+    def test_addstr(self):
+        self.win.addstr('spam\neggs')
+        self.assertEqual(self.win.getyx(), (1, 4))
+        self.win.addstr(3, 2, 'ham')
+        self.win.refresh()
+        self.assertEqual(self.screen.lines(),
+                         ['spam', 'eggs', '', '  ham', ''])
+
+    def test_wrap_and_scroll(self):
+        self.win.scrollok(True)
+        self.win.addstr('x' * 25 + '\n\n')
+        self.win.refresh()
+        self.assertEqual(self.screen.lines(),
+                         ['x' * 10, 'xxxxx', '', '', ''])
+        self.win.scrollok(False)
+        self.assertRaises(curses.error, self.win.addstr, '\n' * 4)
+
+    def test_wide_characters(self):
+        self.win.addstr(u'\u3042x')
+        self.assertEqual(self.win.getyx(), (0, 3))
+
+    def test_counts(self):
+        self.win.addstr('spam')
+        self.win.refresh()
+        stats = self.screen.stats()
+        self.assertEqual(stats['cells'], 4)
+        self.assertEqual(stats['updates'], 1)
+        self.assertEqual(self.screen.calls['addstr'], 1)
+        # Nothing changed, nothing to send
+        self.win.touchwin()
+        self.win.refresh()
+        self.assertEqual(self.screen.stats()['bytes'], stats['bytes'])
+
+    def test_overlapping_windows(self):
+        other = screen.Window(self.screen, 1, 4, 1, 1)
+        self.win.addstr(1, 0, 'spam eggs')
+        self.win.noutrefresh()
+        other.addstr('HAM')
+        other.refresh()
+        self.assertEqual(self.screen.lines()[1], 'sHAM eggs')
+
+
+class TestInput(unittest.TestCase):
+    def setUp(self):
+        self.screen = screen.Screen()
+        self.win = screen.Window(self.screen, 0, 0, 0, 0)
+
+    def test_keys(self):
+        self.screen.feed(['a', 'KEY_UP', '\x7f'])
+        self.assertEqual(self.win.getkey(), 'a')
+        self.assertEqual(self.win.getkey(), 'KEY_UP')
+        self.assertEqual(self.win.getch(), 127)
+        self.assertRaises(screen.EndOfInput, self.win.getkey)
+
+    def test_nodelay(self):
+        self.win.nodelay(True)
+        self.assertEqual(self.win.getch(), -1)
+        self.assertRaises(curses.error, self.win.getkey)
+
+    def test_keyname(self):
+        self.assertEqual(screen.keyname(1), b'^A')
+        self.assertEqual(screen.keyname(136), b'M-^H')
+        self.assertEqual(screen.keyname(curses.KEY_F1), b'KEY_F(1)')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import unittest
+
+from bpython.test import fake_app
+
+fake_app.install()
+from plugins import timing
+from plugins.helpers import CommandError, parse_options
+fake_app.uninstall()
+
+
+class TestStatistics(unittest.TestCase):
+    def test_median(self):
+        self.assertEqual(timing.median([3, 1, 2]), 2)
+        self.assertEqual(timing.median([4, 1, 3, 2]), 2.5)
+        self.assertEqual(timing.median([5]), 5)
+
+    def test_stdev(self):
+        self.assertEqual(timing.stdev([1.0]), 0.0)
+        self.assertEqual(timing.stdev([2.0, 2.0, 2.0]), 0.0)
+        self.assertAlmostEqual(timing.stdev([1.0, 2.0, 3.0, 4.0]),
+                               1.2909944, places=6)
+
+    def test_outliers(self):
+        times = [1.0, 1.1, 0.9, 1.0, 1.05, 0.95, 5.0]
+        self.assertEqual(timing.outliers(times), [6])
+        # Fast runs are never outliers
+        self.assertEqual(timing.outliers(times[:-1] + [0.01]), [])
+
+    def test_no_deviation(self):
+        self.assertEqual(timing.outliers([1.0, 1.0, 1.0, 2.0]), [])
+
+    def test_timing(self):
+        result = timing.Timing(10, [10.0, 11.0, 9.0, 10.0, 50.0])
+        self.assertEqual(result.times, [1.0, 1.1, 0.9, 1.0, 5.0])
+        self.assertEqual(result.min, 0.9)
+        self.assertEqual(result.median, 1.0)
+        self.assertEqual(result.outliers, [4])
+        self.assertTrue(str(result).startswith('10 loops, 5 runs: min 900 '
+                                               'msec, median 1 sec'))
+        self.assertTrue(str(result).endswith('\noutliers: run 5 (5 sec)'))
+
+    def test_format_time(self):
+        self.assertEqual(timing.format_time(2.5), '2.5 sec')
+        self.assertEqual(timing.format_time(0.0123), '12.3 msec')
+        self.assertEqual(timing.format_time(4e-6), '4 usec')
+        self.assertEqual(timing.format_time(5e-8), '50 nsec')
+
+
+class FakeTimer(object):
+    """Advance by `step` seconds for every loop run."""
+
+    def __init__(self, step, time_loop):
+        self.step = step
+        self.now = 0.0
+        self.numbers = []
+        self._time_loop = time_loop
+
+    def time_loop(self, inner, number):
+        self.numbers.append(number)
+        return self._time_loop(inner, number)
+
+    def __call__(self):
+        return self.now
+
+
+class TestCalibrate(unittest.TestCase):
+    def setUp(self):
+        self.app = fake_app.install()
+        self.time_loop = timing.time_loop
+        self.timer = FakeTimer(0.003, self.time_loop)
+        self.default_timer = timing._timeit.default_timer
+        timing.time_loop = self.timer.time_loop
+        timing._timeit.default_timer = self.timer
+        self.app.interpreter.locals['timer'] = self.timer
+        self.inner = timing.compile_timer('timer.now += timer.step',
+                                          self.app.interpreter.locals)
+
+    def tearDown(self):
+        timing.time_loop = self.time_loop
+        timing._timeit.default_timer = self.default_timer
+        timing.results.clear()
+        fake_app.uninstall()
+
+    def test_time_loop(self):
+        self.assertAlmostEqual(self.time_loop(self.inner, 4), 0.012)
+
+    def test_calibrate(self):
+        number, t = timing.calibrate(self.inner)
+        self.assertEqual(self.timer.numbers, [1, 2, 5, 10, 20, 50, 100])
+        self.assertEqual(number, 100)
+        self.assertAlmostEqual(t, 0.3)
+
+    def test_timeit(self):
+        with fake_app.captured_stdout() as output:
+            timing.timeit('timer.now += timer.step')
+        self.assertEqual(self.timer.numbers,
+                         [1, 2, 5, 10, 20, 50, 100] + [100] * 6)
+        self.assertEqual(output.getvalue().split(':')[0],
+                         '100 loops, 7 runs')
+        self.assertEqual(len(timing.results['timer.now += timer.step']), 1)
+
+    def test_timeit_options(self):
+        with fake_app.captured_stdout() as output:
+            timing.timeit('-n 3 -r 2 timer.now += timer.step')
+            timing.timeit('-n 3 -r 2 timer.now += 2 * timer.step')
+        self.assertEqual(self.timer.numbers, [3] * 4)
+        self.assertTrue('previous run' not in output.getvalue())
+        with fake_app.captured_stdout() as output:
+            timing.timeit('-n 3 -r 2 timer.now += timer.step')
+        self.assertTrue(output.getvalue().endswith(
+            'previous run: median 3 msec (+0.0%)\n'))
+
+    def test_bad_options(self):
+        self.assertRaises(CommandError, timing.timeit, '-n ten pass')
+
+
+class TestParseOptions(unittest.TestCase):
+    def test_defaults(self):
+        self.assertEqual(parse_options('x + 1', dict(n=0, t=1.5)),
+                         (dict(n=0, t=1.5), 'x + 1'))
+
+    def test_conversion(self):
+        options, rest = parse_options(' -n 10 -t2  x - 1 ', dict(n=0, t=1.5))
+        self.assertEqual(options, dict(n=10, t=2.0))
+        self.assertEqual(type(options['t']), float)
+        self.assertEqual(rest, 'x - 1')
+
+    def test_unknown_option(self):
+        # Unknown options start the statement, like negative numbers do
+        self.assertEqual(parse_options('-x 1 + y', dict(n=0)),
+                         (dict(n=0), '-x 1 + y'))
+
+    def test_bad_value(self):
+        try:
+            parse_options('-n ten x', dict(n=0))
+        except CommandError as e:
+            self.assertEqual(str(e), "-n takes int, not 'ten'")
+        else:
+            self.fail('CommandError not raised')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -24,9 +24,16 @@
 # THE SOFTWARE.
 
 import locale
+import os
 import sys
-import multiprocessing
-import pickle
+import signal
+from collections import OrderedDict
+try:
+    from os import scandir
+except ImportError:
+    scandir = None
+
+from bpython import latency
 
 
 class TimeOutException(Exception): pass
@@ -41,6 +48,50 @@ def debug(s):
     bpython.running.clirepl.interact.notify(str(s))
 
 
+class LRUCache(OrderedDict):
+    """A dict that holds at most `maxsize` items. When it is full, the least
+    recently used item is dropped."""
+
+    def __init__(self, maxsize=128):
+        OrderedDict.__init__(self)
+        self.maxsize = maxsize
+
+    def __getitem__(self, key):
+        value = OrderedDict.__getitem__(self, key)
+        # Move the key to the end
+        OrderedDict.__delitem__(self, key)
+        OrderedDict.__setitem__(self, key, value)
+        return value
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __setitem__(self, key, value):
+        if key in self:
+            OrderedDict.__delitem__(self, key)
+        OrderedDict.__setitem__(self, key, value)
+        while len(self) > self.maxsize:
+            self.popitem(last=False)
+
+
+def iter_directory(path):
+    """Yield (name, is_directory) for all entries of a directory. With
+    `os.scandir()` the type of an entry is usually known from the directory
+    listing itself, so no extra stat() calls are needed."""
+    if scandir is not None:
+        for entry in scandir(path):
+            try:
+                yield entry.name, entry.is_dir()
+            except EnvironmentError:
+                continue
+    else:
+        for name in os.listdir(path):
+            yield name, os.path.isdir(os.path.join(path, name))
+
+
 class Dummy(object):
     def __repr__(self):
         return self.repr
@@ -48,6 +99,9 @@ class Dummy(object):
 
 
 def _dumps(obj):
+    # pickle and multiprocessing are imported when first needed, as bpython
+    # starts without either
+    import pickle
     try:
         result = pickle.dumps(obj, pickle.HIGHEST_PROTOCOL)
     except pickle.PicklingError:
@@ -60,11 +114,15 @@ def _dumps(obj):
 
 
 def _loads(data):
+    import pickle
     return pickle.loads(data)
 
 
 def isolate(func):
     def child_func(*args, **kwargs):
+        # curses' handler would restore the terminal the parent still uses
+        # when the child is terminated
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
         in_ = args[0]
         try:
             data = _dumps(func(*args[1], **kwargs))
@@ -76,6 +134,7 @@ def isolate(func):
             in_.close()
 
     def inner(*args, **kwargs):
+        import multiprocessing
         out, in_ = multiprocessing.Pipe()
         _stdout = sys.stdout
         _stderr = sys.stderr
@@ -84,14 +143,21 @@ def isolate(func):
         sys.stderr = sys.__stderr__
         sys.stdin = sys.__stdin__
         try:
-            process = multiprocessing.Process(target=child_func, args=(in_, args), kwargs=kwargs)
-            process.start()
-            process.join(0.2)
-            if process.exitcode == 0 and out.poll(0.1):
-                result = _loads(out.recv_bytes())
-            else:
-                process.terminate()
-                result = TimeOutException()
+            with latency.span('isolate'):
+                start = latency.clock()
+                process = multiprocessing.Process(target=child_func, args=(in_, args), kwargs=kwargs)
+                process.start()
+                process.join(0.2)
+                if process.exitcode == 0 and out.poll(0.1):
+                    result = _loads(out.recv_bytes())
+                else:
+                    process.terminate()
+                    result = TimeOutException()
+                # Lifetime of the subprocess, on a track of its own
+                latency.recorder.trace('isolate(%s)' % (func.__name__, ),
+                                       start, latency.clock() - start,
+                                       pid=process.pid,
+                                       args=dict(exitcode=process.exitcode))
             if isinstance(result, Exception):
                 raise result
         finally: